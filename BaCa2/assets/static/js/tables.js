@@ -360,6 +360,7 @@ function initTable(
         ajax,
         dataSourceUrl,
         dataSource,
+        serverSide,
         linkFormatString,
         cols,
         defaultSorting,
@@ -392,6 +393,11 @@ function initTable(
     else
         tableParams['data'] = dataSource;
 
+    if (ajax && serverSide) {
+        tableParams['serverSide'] = true;
+        tableParams['searchDelay'] = 400;
+    }
+
     if (defaultSorting)
         tableParams['order'] = [[defaultOrderCol, defaultOrder]];
     else
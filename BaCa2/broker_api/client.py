@@ -0,0 +1,162 @@
+"""Contains the HTTP client used for communication with the broker."""
+
+import logging
+import os
+from threading import Lock
+from typing import List
+
+from django.conf import settings
+
+import baca2PackageManager.broker_communication as brcom
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerClient:
+    """
+    HTTP client sending messages to the broker. All requests go through a single keep-alive
+    session with a pool of connections, so consecutive messages don't pay for connection setup.
+    Optionally, many messages can be sent in one request to the broker batch endpoint.
+    """
+
+    #: Status code returned when connection to the broker fails
+    CONNECTION_ERROR = -1
+    #: Status code returned when broker response is broken
+    BROKEN_RESPONSE = -2
+    #: Status code returned when broker does not respond in time
+    TIMEOUT = -3
+
+    def __init__(self,
+                 connect_timeout: float = None,
+                 read_timeout: float = None,
+                 pool_size: int = None,
+                 batch_url: str = settings.BROKER_BATCH_URL,
+                 batch_size: int = None,
+                 use_batches: bool = None):
+        """
+        :param connect_timeout: (in seconds) timeout of establishing connection, defaults to
+            ``BROKER_CLIENT_POLICY.connect_timeout`` (optional)
+        :type connect_timeout: float
+        :param read_timeout: (in seconds) timeout of waiting for the response, defaults to
+            ``BROKER_CLIENT_POLICY.read_timeout`` (optional)
+        :type read_timeout: float
+        :param pool_size: amount of kept-alive connections, defaults to
+            ``BROKER_CLIENT_POLICY.pool_size`` (optional)
+        :type pool_size: int
+        :param batch_url: url of the broker batch endpoint, defaults to ``BROKER_BATCH_URL``
+            (optional)
+        :type batch_url: str
+        :param batch_size: maximum amount of messages in one batch request, defaults to
+            ``BROKER_CLIENT_POLICY.batch_size`` (optional)
+        :type batch_size: int
+        :param use_batches: if True, messages should be sent in batches, defaults to
+            ``BROKER_CLIENT_POLICY.batch_enabled`` (optional)
+        :type use_batches: bool
+        """
+        policy = settings.BROKER_CLIENT_POLICY
+        self.timeout = (connect_timeout or policy.connect_timeout,
+                        read_timeout or policy.read_timeout)
+        self.batch_url = batch_url
+        self.batch_size = batch_size or policy.batch_size
+        self.use_batches = policy.batch_enabled if use_batches is None else use_batches
+
+        pool_size = pool_size or policy.pool_size
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'content-type': 'application/json'})
+
+    @property
+    def batch_enabled(self) -> bool:
+        """
+        :return: True if messages should be sent in batches (batch mode is turned on and batch
+            endpoint is configured), False otherwise
+        :rtype: bool
+        """
+        return self.use_batches and bool(self.batch_url)
+
+    def post(self, url: str, data: str) -> int:
+        """
+        Posts serialized JSON data to the broker.
+
+        :param url: url of broker
+        :type url: str
+        :param data: serialized JSON data
+        :type data: str
+
+        :return: HTTP status code or a negative number if an error occurred
+        :rtype: int
+        """
+        try:
+            response = self.session.post(url, data=data, timeout=self.timeout)
+        except requests.exceptions.Timeout:
+            return self.TIMEOUT
+        except requests.exceptions.ConnectionError:
+            return self.CONNECTION_ERROR
+        except requests.exceptions.ChunkedEncodingError:
+            return self.BROKEN_RESPONSE
+        return response.status_code
+
+    def send(self, url: str, message: brcom.BacaToBroker) -> int:
+        """
+        Sends a single message to the broker.
+
+        :param url: url of broker
+        :type url: str
+        :param message: message to be sent
+        :type message: brcom.BacaToBroker
+
+        :return: HTTP status code or a negative number if an error occurred
+        :rtype: int
+        """
+        return self.post(url, message.model_dump_json())
+
+    def send_batch(self, messages: List[brcom.BacaToBroker]) -> int:
+        """
+        Sends many messages to the broker batch endpoint as one JSON list.
+
+        :param messages: messages to be sent (at most ``batch_size``)
+        :type messages: List[brcom.BacaToBroker]
+
+        :return: HTTP status code or a negative number if an error occurred
+        :rtype: int
+
+        :raises ValueError: if batch endpoint is not configured or batch is too big
+        """
+        if not self.batch_url:
+            raise ValueError('Broker batch endpoint is not configured.')
+        if len(messages) > self.batch_size:
+            raise ValueError(f'Batch of {len(messages)} messages exceeds limit '
+                             f'of {self.batch_size}.')
+        data = '[' + ','.join(message.model_dump_json() for message in messages) + ']'
+        return self.post(self.batch_url, data)
+
+    def close(self) -> None:
+        """
+        Closes all pooled connections.
+        """
+        self.session.close()
+
+
+_client: BrokerClient | None = None
+_client_pid: int | None = None
+_client_lock = Lock()
+
+
+def get_broker_client() -> BrokerClient:
+    """
+    Returns broker client shared by the whole process. New client is created after fork, so
+    worker processes never share pooled connections.
+
+    :return: shared broker client
+    :rtype: BrokerClient
+    """
+    global _client, _client_pid
+    with _client_lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = BrokerClient()
+            _client_pid = os.getpid()
+        return _client
@@ -0,0 +1,216 @@
+"""Contains the worker sending queued submits to the broker."""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
+from typing import Any, Callable, List
+
+from django.conf import settings
+from django.db import connections
+
+from broker_api.client import get_broker_client
+from broker_api.models import BrokerSubmit
+from core.choices import ResultStatus
+
+logger = logging.getLogger(__name__)
+
+
+class DispatchWorker:
+    """
+    Sends submits queued by :py:meth:`BrokerSubmitManager.enqueue` to the broker. Every cycle the
+    worker claims a batch of ready submits (see :py:meth:`BrokerSubmitManager.claim_queued`) and
+    sends them using a bounded pool of threads - one by one, or in batch requests if broker client
+    batch mode is enabled (see :py:class:`broker_api.client.BrokerClient`). Failed submits are
+    queued again with exponential backoff by :py:meth:`BrokerSubmit.register_dispatch_result`.
+
+    Several workers can run at the same time - claimed rows are locked with ``SKIP LOCKED``, so no
+    submit is sent twice.
+    """
+
+    def __init__(self,
+                 max_concurrency: int = None,
+                 batch_size: int = None,
+                 course_batch_size: int = None,
+                 broker_url: str = settings.BROKER_URL,
+                 broker_password: str = settings.BROKER_PASSWORD):
+        """
+        :param max_concurrency: how many submits can be sent at the same time, defaults to
+            ``BROKER_DISPATCH_POLICY.max_concurrency`` (optional)
+        :type max_concurrency: int
+        :param batch_size: how many submits can be claimed in one cycle, defaults to
+            ``BROKER_DISPATCH_POLICY.batch_size`` (optional)
+        :type batch_size: int
+        :param course_batch_size: how many submits of one course can be claimed in one cycle,
+            defaults to ``BROKER_DISPATCH_POLICY.course_batch_size`` (optional)
+        :type course_batch_size: int
+        :param broker_url: url of broker
+        :type broker_url: str
+        :param broker_password: password for broker
+        :type broker_password: str
+        """
+        policy = settings.BROKER_DISPATCH_POLICY
+        self.max_concurrency = max_concurrency or policy.max_concurrency
+        self.batch_size = batch_size or policy.batch_size
+        self.course_batch_size = course_batch_size or policy.course_batch_size
+        self.broker_url = broker_url
+        self.broker_password = broker_password
+        self.client = get_broker_client()
+
+    def _dispatch(self, broker_submit: BrokerSubmit) -> bool:
+        """
+        Sends a single claimed submit. Unexpected errors end the submit with an error, so it does
+        not block the queue.
+
+        :param broker_submit: claimed submit
+        :type broker_submit: BrokerSubmit
+
+        :return: True if submit was sent, False otherwise
+        :rtype: bool
+        """
+        try:
+            return broker_submit.dispatch(self.broker_url, self.broker_password)
+        except Exception as e:
+            self._fail(broker_submit, e)
+            return False
+
+    def _dispatch_batch(self, broker_submits: List[BrokerSubmit]) -> int:
+        """
+        Sends claimed submits in one batch request (see :py:meth:`BrokerClient.send_batch`).
+        Submits whose message cannot be created end with an error. If the batch request fails
+        unexpectedly, submits of the batch are queued again with backoff.
+
+        :param broker_submits: claimed submits
+        :type broker_submits: List[BrokerSubmit]
+
+        :return: amount of sent submits
+        :rtype: int
+        """
+        messages = []
+        batch = []
+        for broker_submit in broker_submits:
+            try:
+                messages.append(broker_submit.create_message(self.broker_password))
+                batch.append(broker_submit)
+            except Exception as e:
+                self._fail(broker_submit, e)
+        if not batch:
+            return 0
+
+        try:
+            code = self.client.send_batch(messages)
+        except Exception as e:
+            logger.exception(f'Dispatch of a batch of {len(batch)} submits failed: {e}')
+            code = -1
+
+        sent = 0
+        for broker_submit in batch:
+            try:
+                sent += broker_submit.register_dispatch_result(code)
+            except Exception as e:
+                logger.exception(f'Cannot register dispatch of {broker_submit.broker_id}: {e}')
+                self._retry(broker_submit)
+        return sent
+
+    @staticmethod
+    def _fail(broker_submit: BrokerSubmit, error: Exception) -> None:
+        """
+        Ends claimed submit with an error after unexpected dispatch failure, so it does not block
+        the queue.
+
+        :param broker_submit: claimed submit
+        :type broker_submit: BrokerSubmit
+        :param error: error raised during dispatch
+        :type error: Exception
+        """
+        logger.exception(f'Dispatch of {broker_submit.broker_id} failed: {error}')
+        broker_submit.update_status(BrokerSubmit.StatusEnum.ERROR)
+        try:
+            broker_submit.submit.end_with_error(ResultStatus.INT,
+                                                f'Cannot sent message to broker: {error}')
+        except Exception as end_error:
+            logger.error(f'Cannot end submit {broker_submit.broker_id} with error: {end_error}')
+
+    @staticmethod
+    def _retry(broker_submit: BrokerSubmit) -> None:
+        """
+        Puts claimed submit back into the dispatch queue with backoff, as after a failed dispatch
+        attempt. If even that fails, the submit is requeued later as stale (see
+        :py:meth:`BrokerSubmitManager.requeue_stale`).
+
+        :param broker_submit: claimed submit
+        :type broker_submit: BrokerSubmit
+        """
+        try:
+            broker_submit.register_dispatch_result(-1)
+        except Exception as e:
+            logger.error(f'Cannot requeue submit {broker_submit.broker_id}: {e}')
+
+    @staticmethod
+    def _in_thread(func: Callable, *args) -> Any:
+        """
+        Runs given function in a worker thread and closes database connections opened by it.
+
+        :param func: function to be run
+        :type func: Callable
+
+        :return: result of the function
+        """
+        try:
+            return func(*args)
+        finally:
+            connections.close_all()
+
+    def run_once(self) -> tuple[int, int]:
+        """
+        Runs a single dispatch cycle.
+
+        :return: tuple (claimed, sent) with amounts of claimed and successfully sent submits
+        :rtype: tuple[int, int]
+        """
+        requeued = BrokerSubmit.objects.requeue_stale(
+            settings.BROKER_DISPATCH_POLICY.processing_timeout
+        )
+        if requeued:
+            logger.warning(f'Requeued {requeued} submits stuck in processing.')
+
+        claimed = BrokerSubmit.objects.claim_queued(self.batch_size, self.course_batch_size)
+        if not claimed:
+            return 0, 0
+
+        start = monotonic()
+        if self.client.batch_enabled:
+            func = self._dispatch_batch
+            jobs = [claimed[i:i + self.client.batch_size]
+                    for i in range(0, len(claimed), self.client.batch_size)]
+        else:
+            func = self._dispatch
+            jobs = claimed
+
+        if self.max_concurrency == 1:
+            sent = sum(func(job) for job in jobs)
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                sent = sum(executor.map(lambda job: self._in_thread(func, job), jobs))
+
+        logger.info(f'Dispatched {sent}/{len(claimed)} submits '
+                    f'in {monotonic() - start:.2f} s.')
+        return len(claimed), sent
+
+    def run(self, poll_interval: float = None, max_cycles: int = None) -> None:
+        """
+        Runs dispatch cycles until interrupted. If the queue is empty, worker waits
+        ``poll_interval`` seconds before checking it again.
+
+        :param poll_interval: (in seconds) wait time for an empty queue, defaults to
+            ``BROKER_DISPATCH_POLICY.poll_interval`` (optional)
+        :type poll_interval: float
+        :param max_cycles: if given, worker stops after this amount of cycles (optional)
+        :type max_cycles: int
+        """
+        poll_interval = poll_interval or settings.BROKER_DISPATCH_POLICY.poll_interval
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            claimed, _ = self.run_once()
+            cycles += 1
+            if not claimed:
+                sleep(poll_interval)
@@ -0,0 +1,57 @@
+from time import monotonic
+
+from django.core.management.base import BaseCommand
+
+import baca2PackageManager.broker_communication as brcom
+import requests
+from broker_api.client import BrokerClient
+from broker_api.mock import BrokerStandIn
+
+
+class Command(BaseCommand):
+    help = 'Measures broker client throughput against a local broker stand-in'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=500,
+                            help='How many messages are sent in every mode')
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help='Response delay of the broker stand-in (in seconds)')
+        parser.add_argument('--batch-size', type=int, default=50,
+                            help='How many messages are sent in one batch request')
+
+    def handle(self, *args, **options):
+        messages = [
+            brcom.BacaToBroker(pass_hash=brcom.make_hash('benchmark', str(i)),
+                               submit_id=str(i),
+                               package_path='/packages/benchmark',
+                               commit_id='1',
+                               submit_path=f'/submits/{i}.cpp')
+            for i in range(options['messages'])
+        ]
+
+        with BrokerStandIn(latency=options['latency']) as stand_in:
+            client = BrokerClient(batch_url=stand_in.batch_url,
+                                  batch_size=options['batch_size'])
+
+            def unpooled():
+                for message in messages:
+                    requests.post(stand_in.url, headers={'content-type': 'application/json'},
+                                  data=message.model_dump_json())
+
+            def pooled():
+                for message in messages:
+                    client.send(stand_in.url, message)
+
+            def batched():
+                for i in range(0, len(messages), client.batch_size):
+                    client.send_batch(messages[i:i + client.batch_size])
+
+            for name, func in (('unpooled', unpooled), ('pooled', pooled), ('batched', batched)):
+                stand_in.reset()
+                start = monotonic()
+                func()
+                elapsed = monotonic() - start
+                self.stdout.write(f'{name:>8}: {len(stand_in.received)} messages in '
+                                  f'{stand_in.requests} requests, {elapsed:.2f} s '
+                                  f'({len(stand_in.received) / elapsed:.0f} msg/s)')
+            client.close()
@@ -0,0 +1,36 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from broker_api.dispatch import DispatchWorker
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Sends queued submits to broker'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run a single dispatch cycle and exit')
+        parser.add_argument('--concurrency', type=int, default=None,
+                            help='How many submits can be sent at the same time')
+        parser.add_argument('--batch-size', type=int, default=None,
+                            help='How many submits can be claimed in one cycle')
+
+    def handle(self, *args, **options):
+        worker = DispatchWorker(max_concurrency=options['concurrency'],
+                                batch_size=options['batch_size'])
+        if options['once']:
+            claimed, sent = worker.run_once()
+            if claimed:
+                logger.info(f'Sent {sent} of {claimed} queued submits.')
+            else:
+                logger.debug('No submits to send.')
+            return
+
+        logger.info('Starting broker dispatch worker.')
+        try:
+            worker.run()
+        except KeyboardInterrupt:
+            logger.info('Broker dispatch worker stopped.')
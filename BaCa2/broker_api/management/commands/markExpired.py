@@ -1,9 +1,7 @@
 import logging
-from datetime import timedelta
 
 from django.conf import settings
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 
 from broker_api.models import BrokerSubmit
 
@@ -16,15 +14,9 @@ class Command(BaseCommand):
     retry_timeout: float = settings.BROKER_RETRY_POLICY.expiration_timeout
 
     def handle(self, *args, **options):
-        data = BrokerSubmit.objects.filter(
-            status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
-            update_date__lte=timezone.now() - timedelta(seconds=self.retry_timeout)
-        )
-        for submit in data:
-            if submit.update_date <= timezone.now() - timedelta(seconds=self.retry_timeout):
-                submit.update_status(BrokerSubmit.StatusEnum.EXPIRED)
-
-        if data:
-            logger.info(f'Marked {len(data)} submits as expired.')
+        expired = BrokerSubmit.objects.mark_expired(self.retry_timeout)
+
+        if expired:
+            logger.info(f'Marked {expired} submits as expired.')
         else:
             logger.debug('No submits to mark as expired.')
@@ -4,7 +4,6 @@ from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from broker_api.models import BrokerSubmit
-from core.choices import ResultStatus
 
 logger = logging.getLogger(__name__)
 
@@ -16,20 +15,9 @@ class Command(BaseCommand):
     retry_limit: int = settings.BROKER_RETRY_POLICY.resend_max_retries
 
     def handle(self, *args, **options):
-        data = BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.EXPIRED)
-        submits_resent = 0
-        submits_exceeded = 0
-        for submit in data:
-            if submit.retry_amount < self.retry_limit:
-                if submit.status == BrokerSubmit.StatusEnum.EXPIRED:
-                    submit.resend()
-                    submits_resent += 1
-            else:
-                submit.submit.end_with_error(ResultStatus.INT, 'Retry limit exceeded')
-                submit.update_status(BrokerSubmit.StatusEnum.ERROR)
-                submits_exceeded += 1
-
-        if submits_resent > 0:
+        submits_resent, submits_exceeded = BrokerSubmit.objects.resend_expired(self.retry_limit)
+
+        if submits_resent or submits_exceeded:
             logger.info(f'Resent {submits_resent} submits, '
                         f'{submits_exceeded} exceeded retry limit.')
         else:
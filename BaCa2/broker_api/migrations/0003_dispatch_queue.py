@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-16 17:49
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('broker_api', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='brokersubmit',
+            name='next_attempt_date',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='brokersubmit',
+            name='send_attempts',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='brokersubmit',
+            index=models.Index(fields=['status', 'next_attempt_date'],
+                               name='broker_submit_queue_idx'),
+        ),
+    ]
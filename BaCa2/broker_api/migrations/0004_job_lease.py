@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-16 18:09
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('broker_api', '0003_dispatch_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('holder', models.CharField(blank=True, default='', max_length=255)),
+                ('expires_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('last_run_date', models.DateTimeField(blank=True, null=True)),
+                ('last_run_duration', models.FloatField(default=0)),
+                ('last_run_rows', models.IntegerField(default=0)),
+                ('run_count', models.IntegerField(default=0)),
+                ('total_rows', models.BigIntegerField(default=0)),
+            ],
+        ),
+    ]
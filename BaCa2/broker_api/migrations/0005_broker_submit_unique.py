@@ -0,0 +1,34 @@
+# Generated by Django 5.0.14 on 2026-10-16 19:44
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def remove_duplicates(apps, schema_editor):
+    broker_submit_model = apps.get_model('broker_api', 'BrokerSubmit')
+    duplicates = (broker_submit_model.objects
+                  .values('course', 'submit_id')
+                  .annotate(last=Max('pk'), count=models.Count('pk'))
+                  .filter(count__gt=1))
+    for duplicate in duplicates:
+        broker_submit_model.objects.filter(
+            course=duplicate['course'],
+            submit_id=duplicate['submit_id'],
+        ).exclude(pk=duplicate['last']).delete()
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('broker_api', '0004_job_lease'),
+        ('main', '0005_course_database_registry'),
+        ('package', '0006_package_metadata'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='brokersubmit',
+            constraint=models.UniqueConstraint(fields=('course', 'submit_id'),
+                                               name='broker_submit_unique'),
+        ),
+    ]
@@ -1,12 +1,18 @@
+import json
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
 from random import choice, randint, uniform
-from typing import Iterable, Tuple
+from threading import Lock, Thread
+from time import sleep
+from typing import Iterable, List, Tuple
 
 from django.conf import settings
 
+import baca2PackageManager.broker_communication as brcom
 from core.choices import EMPTY_FINAL_STATUSES, HALF_EMPTY_FINAL_STATUSES, ResultStatus
 from course.models import Result, Submit, Test
 from main.models import Course
+from pydantic import ValidationError
 from util.models_registry import ModelsRegistry
 
 
@@ -139,3 +145,111 @@ class BrokerMock:
                                        'no results available - cant generate results')
         if self.generate_results:
             self.generate_fake_results()
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        stand_in = self.server.stand_in
+        body = self.rfile.read(int(self.headers.get('content-length', 0)))
+        try:
+            data = json.loads(body)
+            if self.path.rstrip('/') == stand_in.BATCH_PATH:
+                messages = [brcom.BacaToBroker.model_validate(item) for item in data]
+            else:
+                messages = [brcom.BacaToBroker.model_validate(data)]
+        except (ValueError, TypeError, ValidationError):
+            self.respond(400)
+            return
+
+        if stand_in.latency:
+            sleep(stand_in.latency)
+        stand_in.register(messages)
+        self.respond(stand_in.status_code)
+
+    def respond(self, code: int):
+        self.send_response(code)
+        self.send_header('content-length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class BrokerStandIn:
+    """
+    Local stand-in for the broker HTTP API. It accepts single messages on any path and lists of
+    messages on :py:attr:`BATCH_PATH`, records ids of received submits and answers with a fixed
+    status code after a fixed latency. Used to test and benchmark broker communication offline;
+    no results are sent back.
+    """
+
+    BATCH_PATH = '/batch'
+
+    def __init__(self,
+                 host: str = '127.0.0.1',
+                 port: int = 0,
+                 latency: float = 0.0,
+                 status_code: int = 200):
+        """
+        :param host: host to listen on
+        :type host: str
+        :param port: port to listen on, 0 picks a free port
+        :type port: int
+        :param latency: (in seconds) delay of every response
+        :type latency: float
+        :param status_code: HTTP status code of every response
+        :type status_code: int
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.status_code = status_code
+        self.received: List[str] = []
+        self.requests = 0
+        self._lock = Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        return f'http://{self.host}:{self.port}/'
+
+    @property
+    def batch_url(self) -> str:
+        return f'http://{self.host}:{self.port}{self.BATCH_PATH}'
+
+    def register(self, messages: List[brcom.BacaToBroker]) -> None:
+        with self._lock:
+            self.requests += 1
+            self.received.extend(message.submit_id for message in messages)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.requests = 0
+            self.received = []
+
+    def start(self) -> 'BrokerStandIn':
+        self._server = ThreadingHTTPServer((self.host, self.port), _StandInHandler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self.port = self._server.server_address[1]
+        self._thread = Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+    def __enter__(self) -> 'BrokerStandIn':
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.stop()
@@ -1,12 +1,17 @@
 import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from itertools import zip_longest
 from time import sleep
+from typing import List
 
 from django.conf import settings
 from django.db import models, transaction
+from django.db.models import F, Min
 from django.utils import timezone
 
 import baca2PackageManager.broker_communication as brcom
-import requests
+from broker_api.client import get_broker_client
 from core.choices import ResultStatus
 from course.models import Result, Submit
 from course.routing import InCourse
@@ -18,9 +23,214 @@ logger = logging.getLogger(__name__)
 
 
 class BrokerSubmitManager(models.Manager):
-    ...
     # TODO: move class methods from BrokerSubmit to BrokerSubmitManager
 
+    @transaction.atomic
+    def enqueue(self,
+                course: Course,
+                submit_id: int,
+                package_instance: PackageInstance) -> 'BrokerSubmit':
+        """
+        Creates new submit and puts it into the dispatch queue. Submit will be sent to broker by
+        the dispatch worker (see ``dispatchSubmits`` command). If the submit is already tracked
+        (e.g. it was queued by :py:func:`course.manager.resend_pending_submits` in the meantime),
+        the existing broker submit is returned.
+
+        :param course: course of this submit
+        :type course: Course
+        :param submit_id: id of this submit
+        :type submit_id: int
+        :param package_instance: package instance of this submit
+        :type package_instance: PackageInstance
+
+        :return: queued submit
+        :rtype: BrokerSubmit
+        """
+        broker_submit, _ = self.get_or_create(course=course,
+                                              submit_id=submit_id,
+                                              defaults={
+                                                  'package_instance': package_instance,
+                                                  'status': BrokerSubmit.StatusEnum.NEW,
+                                              })
+        return broker_submit
+
+    def enqueue_many(self,
+                     course: Course,
+                     submits: List[tuple[int, int]]) -> List['BrokerSubmit']:
+        """
+        Puts many submits of one course into the dispatch queue with a single insert (see
+        :py:func:`course.manager.resend_pending_submits`). Submits which are already tracked are
+        skipped.
+
+        :param course: course of the submits
+        :type course: Course
+        :param submits: list of tuples (submit_id, package_instance_id)
+        :type submits: List[tuple[int, int]]
+
+        :return: queued submits (without primary keys)
+        :rtype: List[BrokerSubmit]
+        """
+        return self.bulk_create([
+            self.model(course=course,
+                       submit_id=submit_id,
+                       package_instance_id=package_instance_id,
+                       status=BrokerSubmit.StatusEnum.NEW)
+            for submit_id, package_instance_id in submits
+        ], ignore_conflicts=True)
+
+    @transaction.atomic
+    def claim_queued(self, limit: int, course_limit: int) -> List['BrokerSubmit']:
+        """
+        Claims queued submits ready to be sent and marks them as processing. Submits are taken
+        from courses in round-robin order (oldest queues first), at most ``course_limit`` per
+        course, so one course with a long queue does not block others. Rows locked by another
+        worker are skipped.
+
+        :param limit: maximum amount of claimed submits
+        :type limit: int
+        :param course_limit: maximum amount of claimed submits from one course
+        :type course_limit: int
+
+        :return: claimed submits
+        :rtype: List[BrokerSubmit]
+        """
+        now = timezone.now()
+        queued = self.filter(status=BrokerSubmit.StatusEnum.NEW, next_attempt_date__lte=now)
+        courses = (
+            queued
+            .values('course')
+            .annotate(oldest=Min('next_attempt_date'))
+            .order_by('oldest')
+        )
+        course_queues = [
+            list(queued
+                 .filter(course=course['course'])
+                 .order_by('next_attempt_date')
+                 .select_for_update(skip_locked=True)[:course_limit])
+            for course in courses
+        ]
+        claimed = [broker_submit
+                   for round_robin in zip_longest(*course_queues)
+                   for broker_submit in round_robin
+                   if broker_submit is not None][:limit]
+
+        self.filter(pk__in=[broker_submit.pk for broker_submit in claimed]).update(
+            status=BrokerSubmit.StatusEnum.PROCESSING,
+            update_date=now
+        )
+        for broker_submit in claimed:
+            broker_submit.status = BrokerSubmit.StatusEnum.PROCESSING
+            broker_submit.update_date = now
+        return claimed
+
+    def requeue_stale(self, timeout: float) -> int:
+        """
+        Puts submits stuck in processing (e.g. after worker crash) back into the dispatch queue.
+
+        :param timeout: (in seconds) how long submit has to be processed to be considered stale
+        :type timeout: float
+
+        :return: amount of requeued submits
+        :rtype: int
+        """
+        return self.filter(
+            status=BrokerSubmit.StatusEnum.PROCESSING,
+            update_date__lte=timezone.now() - timedelta(seconds=timeout)
+        ).update(status=BrokerSubmit.StatusEnum.NEW,
+                 next_attempt_date=timezone.now(),
+                 update_date=timezone.now())
+
+    def mark_expired(self, timeout: float) -> int:
+        """
+        Marks submits awaiting broker response for longer than ``timeout`` as expired, using a
+        single update.
+
+        :param timeout: (in seconds) how long submit can await response
+        :type timeout: float
+
+        :return: amount of expired submits
+        :rtype: int
+        """
+        now = timezone.now()
+        return self.filter(
+            status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
+            update_date__lte=now - timedelta(seconds=timeout)
+        ).update(status=BrokerSubmit.StatusEnum.EXPIRED, update_date=now)
+
+    def resend_expired(self, retry_limit: int) -> tuple[int, int]:
+        """
+        Resends expired submits. Expired submits are claimed with ``SKIP LOCKED``, so sweeps
+        running in several processes never handle the same submit twice. Submits which were
+        resent less than ``retry_limit`` times are put back into the dispatch queue (or sent
+        right away if the dispatch queue is disabled), others end with an error - with a single
+        update per course database.
+
+        :param retry_limit: maximum amount of resends of one submit
+        :type retry_limit: int
+
+        :return: tuple (resent, exceeded) with amounts of resent submits and submits which
+            exceeded the retry limit
+        :rtype: tuple[int, int]
+        """
+        now = timezone.now()
+        queue_enabled = settings.BROKER_DISPATCH_POLICY.enabled
+        with transaction.atomic():
+            claimed = list(
+                self.filter(status=BrokerSubmit.StatusEnum.EXPIRED)
+                .select_for_update(skip_locked=True, of=('self',))
+                .values_list('pk', 'retry_amount', 'course__short_name', 'submit_id')
+            )
+            to_resend = [pk for pk, retries, _, _ in claimed if retries < retry_limit]
+            exceeded = [pk for pk, retries, _, _ in claimed if retries >= retry_limit]
+
+            if queue_enabled:
+                resent = self.filter(pk__in=to_resend).update(
+                    status=BrokerSubmit.StatusEnum.NEW,
+                    retry_amount=F('retry_amount') + 1,
+                    send_attempts=0,
+                    next_attempt_date=now,
+                    update_date=now
+                )
+            else:
+                resent = self.filter(pk__in=to_resend).update(
+                    status=BrokerSubmit.StatusEnum.PROCESSING,
+                    update_date=now
+                )
+            self.filter(pk__in=exceeded).update(status=BrokerSubmit.StatusEnum.ERROR,
+                                                update_date=now)
+
+        exceeded_per_course = defaultdict(list)
+        for _, retries, course_name, submit_id in claimed:
+            if retries >= retry_limit:
+                exceeded_per_course[course_name].append(submit_id)
+        for course_name, submit_ids in exceeded_per_course.items():
+            with InCourse(course_name):
+                Submit.objects.end_with_errors(submit_ids,
+                                               ResultStatus.INT,
+                                               'Retry limit exceeded')
+
+        if not queue_enabled:
+            for broker_submit in self.filter(pk__in=to_resend).select_related('course'):
+                broker_submit.resend()
+        return resent, len(exceeded)
+
+    def delete_errors(self, timeout: float) -> int:
+        """
+        Deletes submits which ended with an error more than ``timeout`` seconds ago, using a
+        single delete.
+
+        :param timeout: (in seconds) how long error submits are kept
+        :type timeout: float
+
+        :return: amount of deleted submits
+        :rtype: int
+        """
+        deleted, _ = self.filter(
+            status=BrokerSubmit.StatusEnum.ERROR,
+            update_date__lte=timezone.now() - timedelta(seconds=timeout)
+        ).delete()
+        return deleted
+
 
 class BrokerSubmit(models.Model):
     """Model for storing information about submits sent to broker."""
@@ -48,6 +258,21 @@ class BrokerSubmit(models.Model):
     update_date = models.DateTimeField(default=timezone.now)
     #: amount of times this submit was resent to broker
     retry_amount = models.IntegerField(default=0)
+    #: date after which queued submit can be sent by the dispatch worker
+    next_attempt_date = models.DateTimeField(default=timezone.now)
+    #: amount of failed dispatch attempts of queued submit
+    send_attempts = models.IntegerField(default=0)
+
+    #: The manager for the BrokerSubmit model.
+    objects = BrokerSubmitManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['course', 'submit_id'], name='broker_submit_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_date'], name='broker_submit_queue_idx'),
+        ]
 
     def __repr__(self):
         return f'BrokerSubmit({self.broker_id})'
@@ -82,35 +307,40 @@ class BrokerSubmit(models.Model):
         """
         return brcom.make_hash(password, self.broker_id)
 
-    def send_submit(self, url: str, password: str) -> tuple[brcom.BacaToBroker, int]:
+    def create_message(self, password: str) -> brcom.BacaToBroker:
         """
-        Sends submit to broker.
+        Creates message describing this submit for broker.
 
-        :param url: url of broker
-        :type url: str
         :param password: password for broker
         :type password: str
 
-        :return: tuple (message, status_code) where message is message sent to broker and
-            status_code is an HTTP status code or a negative number if an error occurred
-        :rtype: tuple[brcom.BacaToBroker, int]
+        :return: message to be sent to broker
+        :rtype: brcom.BacaToBroker
         """
-        message = brcom.BacaToBroker(
+        return brcom.BacaToBroker(
             pass_hash=self.hash_password(password),
             submit_id=self.broker_id,
             package_path=str(self.package_instance.package_source.path),
             commit_id=self.package_instance.commit,
             submit_path=self.solution
         )
-        try:
-            r = requests.post(url, headers={'content-type': 'application/json'},
-                              data=message.model_dump_json())
-        except requests.exceptions.ConnectionError:
-            return message, -1
-        except requests.exceptions.ChunkedEncodingError:
-            return message, -2
-        else:
-            return message, r.status_code
+
+    def send_submit(self, url: str, password: str) -> tuple[brcom.BacaToBroker, int]:
+        """
+        Sends submit to broker using the shared broker client (see
+        :py:func:`broker_api.client.get_broker_client`).
+
+        :param url: url of broker
+        :type url: str
+        :param password: password for broker
+        :type password: str
+
+        :return: tuple (message, status_code) where message is message sent to broker and
+            status_code is an HTTP status code or a negative number if an error occurred
+        :rtype: tuple[brcom.BacaToBroker, int]
+        """
+        message = self.create_message(password)
+        return message, get_broker_client().send(url, message)
 
     @classmethod
     def send(cls,
@@ -161,6 +391,55 @@ class BrokerSubmit(models.Model):
         new_submit.update_status(cls.StatusEnum.AWAITING_RESPONSE)
         return new_submit
 
+    def dispatch(self,
+                 broker_url: str = settings.BROKER_URL,
+                 broker_password: str = settings.BROKER_PASSWORD) -> bool:
+        """
+        Makes a single attempt to send queued submit to broker (see
+        :py:meth:`register_dispatch_result`).
+
+        :param broker_url: url of broker
+        :type broker_url: str
+        :param broker_password: password for broker
+        :type broker_password: str
+
+        :return: True if submit was sent, False otherwise
+        :rtype: bool
+        """
+        _, code = self.send_submit(broker_url, broker_password)
+        return self.register_dispatch_result(code)
+
+    def register_dispatch_result(self, code: int) -> bool:
+        """
+        Updates queued submit after a dispatch attempt. If the attempt failed, submit is queued
+        again with exponential backoff, and after ``BROKER_DISPATCH_POLICY.max_attempts``
+        failures it ends with an error.
+
+        :param code: HTTP status code of the attempt or a negative number if an error occurred
+        :type code: int
+
+        :return: True if submit was sent, False otherwise
+        :rtype: bool
+        """
+        policy = settings.BROKER_DISPATCH_POLICY
+        if code == 200:
+            self.send_attempts = 0
+            self.update_status(self.StatusEnum.AWAITING_RESPONSE)
+            return True
+
+        self.send_attempts += 1
+        if self.send_attempts >= policy.max_attempts:
+            self.update_status(self.StatusEnum.ERROR)
+            self.submit.end_with_error(ResultStatus.INT,
+                                       f'Cannot sent message to broker (error code: {code})')
+            logger.warning(f'Dispatch of {self.broker_id} failed {self.send_attempts} times.')
+            return False
+
+        backoff = min(policy.backoff_base * 2 ** (self.send_attempts - 1), policy.backoff_max)
+        self.next_attempt_date = timezone.now() + timedelta(seconds=backoff)
+        self.update_status(self.StatusEnum.NEW)
+        return False
+
     def resend(self,
                broker_url: str = settings.BROKER_URL,
                broker_password: str = settings.BROKER_PASSWORD):
@@ -267,3 +546,89 @@ class BrokerSubmit(models.Model):
         self.status = new_status
         self.update_date = timezone.now()
         self.save()
+
+
+class JobLeaseManager(models.Manager):
+
+    def acquire(self, name: str, holder: str, duration: float) -> bool:
+        """
+        Tries to acquire (or renew) the lease of a scheduled job. Lease can be acquired if it is
+        free, expired or already held by the same holder. Acquisition is a single conditional
+        update, so only one process can win it.
+
+        :param name: name of the job
+        :type name: str
+        :param holder: identifier of the process acquiring the lease
+        :type holder: str
+        :param duration: (in seconds) how long the lease is valid
+        :type duration: float
+
+        :return: True if lease was acquired, False if it is held by another process
+        :rtype: bool
+        """
+        now = timezone.now()
+        self.bulk_create([self.model(name=name, expires_at=now)], ignore_conflicts=True)
+        return bool(self.filter(
+            models.Q(expires_at__lte=now) | models.Q(holder=holder),
+            name=name
+        ).update(holder=holder, expires_at=now + timedelta(seconds=duration)))
+
+    def record_run(self,
+                   name: str,
+                   holder: str,
+                   started: datetime,
+                   duration: float,
+                   rows: int) -> None:
+        """
+        Saves statistics of a finished job run.
+
+        :param name: name of the job
+        :type name: str
+        :param holder: identifier of the process which ran the job
+        :type holder: str
+        :param started: start date of the run
+        :type started: datetime
+        :param duration: (in seconds) duration of the run
+        :type duration: float
+        :param rows: amount of rows touched by the run
+        :type rows: int
+        """
+        self.filter(name=name, holder=holder).update(
+            last_run_date=started,
+            last_run_duration=duration,
+            last_run_rows=rows,
+            run_count=F('run_count') + 1,
+            total_rows=F('total_rows') + rows
+        )
+
+
+class JobLease(models.Model):
+    """
+    Lease of a scheduled broker job (see :py:mod:`broker_api.scheduler`). Only the process holding
+    a valid lease runs the job, so jobs are not duplicated when many server workers start their
+    own schedulers. Statistics of the last run are stored alongside the lease.
+    """
+
+    #: name of the job
+    name = models.CharField(max_length=64, unique=True)
+    #: identifier of the process holding the lease (``host:pid``)
+    holder = models.CharField(max_length=255, blank=True, default='')
+    #: date after which the lease can be taken over by another process
+    expires_at = models.DateTimeField(default=timezone.now)
+
+    #: start date of the last run
+    last_run_date = models.DateTimeField(null=True, blank=True)
+    #: (in seconds) duration of the last run
+    last_run_duration = models.FloatField(default=0)
+    #: amount of rows touched by the last run
+    last_run_rows = models.IntegerField(default=0)
+    #: amount of finished runs
+    run_count = models.IntegerField(default=0)
+    #: amount of rows touched by all runs
+    total_rows = models.BigIntegerField(default=0)
+
+    #: The manager for the JobLease model.
+    objects = JobLeaseManager()
+
+    def __str__(self):
+        return f'JobLease({self.name}, {self.holder})'
@@ -1,30 +1,99 @@
 """Contains the scheduler for the broker_api app."""
 
+import logging
+import os
+import socket
+from functools import wraps
+from time import monotonic
+from typing import Callable
+
 from django.conf import settings
-from django.core.management import call_command
+from django.utils import timezone
 
 from apscheduler.schedulers.background import BackgroundScheduler
 
+logger = logging.getLogger(__name__)
+
 scheduler = BackgroundScheduler()
 
 
+def lease_holder() -> str:
+    """
+    :return: identifier of the current process used as job lease holder
+    :rtype: str
+    """
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def leased_job(name: str, interval: float) -> Callable:
+    """
+    Decorator making a scheduled job run only in the process holding its lease (see
+    :py:class:`broker_api.models.JobLease`). The holder renews the lease on every run, so
+    other processes take the job over only if the holder stops running it for longer than
+    ``BROKER_RETRY_POLICY.job_lease_grace_period``. Duration and amount of rows touched by every
+    run are recorded.
+
+    :param name: name of the job
+    :type name: str
+    :param interval: (in minutes) interval between job runs
+    :type interval: float
+
+    :return: decorator for a job returning amount of touched rows
+    :rtype: Callable
+    """
+    lease_duration = interval * 60 + settings.BROKER_RETRY_POLICY.job_lease_grace_period
+
+    def decorator(func: Callable[[], int]) -> Callable[[], int | None]:
+        @wraps(func)
+        def wrapper() -> int | None:
+            from broker_api.models import JobLease
+
+            holder = lease_holder()
+            if not JobLease.objects.acquire(name, holder, lease_duration):
+                logger.debug(f'Job {name} skipped - lease is held by another process.')
+                return None
+
+            started = timezone.now()
+            start = monotonic()
+            rows = func()
+            duration = monotonic() - start
+            JobLease.objects.record_run(name, holder, started, duration, rows)
+            logger.debug(f'Job {name} touched {rows} rows in {duration:.2f} s.')
+            return rows
+
+        return wrapper
+
+    return decorator
+
+
 @scheduler.scheduled_job('interval',
                          minutes=settings.BROKER_RETRY_POLICY.retry_check_interval)
-def check_model_updates():
+@leased_job('check_model_updates', settings.BROKER_RETRY_POLICY.retry_check_interval)
+def check_model_updates() -> int:
     """Looks for submits that need to be resent to broker, marks them expired and resends them."""
-    call_command('markExpired')
-    call_command('resendToBroker')
+    from broker_api.models import BrokerSubmit
+
+    policy = settings.BROKER_RETRY_POLICY
+    expired = BrokerSubmit.objects.mark_expired(policy.expiration_timeout)
+    resent, exceeded = BrokerSubmit.objects.resend_expired(policy.resend_max_retries)
+    return expired + resent + exceeded
 
 
 @scheduler.scheduled_job('interval',
                          minutes=settings.BROKER_RETRY_POLICY.deletion_check_interval)
-def delete_old_errors():
+@leased_job('delete_old_errors', settings.BROKER_RETRY_POLICY.deletion_check_interval)
+def delete_old_errors() -> int:
     """Deletes errors that are older than BrokerRetryPolicy.error_deletion_time."""
-    call_command('deleteErrors')
+    from broker_api.models import BrokerSubmit
+
+    return BrokerSubmit.objects.delete_errors(settings.BROKER_RETRY_POLICY.deletion_timeout)
 
 
 @scheduler.scheduled_job('interval',
                          minutes=settings.BROKER_RETRY_POLICY.untracked_check_interval)
-def send_untracked():
+@leased_job('send_untracked', settings.BROKER_RETRY_POLICY.untracked_check_interval)
+def send_untracked() -> int:
     """Checks for submits that were not tracked by the broker api app and sends them."""
-    call_command('sendUntracked')
+    from course.manager import resend_pending_submits
+
+    return resend_pending_submits()
@@ -4,12 +4,21 @@ from datetime import datetime, timedelta
 from http import server
 from threading import Lock, Thread
 from typing import Any
+from unittest.mock import patch
 
 from django.conf import settings
 from django.core.management import call_command
 from django.test import Client, TestCase
+from django.utils import timezone
 
+from broker_api.client import BrokerClient
+from broker_api.dispatch import DispatchWorker
+from broker_api.mock import BrokerStandIn
+from broker_api.models import JobLease
+from broker_api.scheduler import lease_holder, leased_job
 from broker_api.views import *
+from core.choices import ResultStatus
+from course.manager import resend_pending_submits
 from course.models import Result, Round, Submit, Task
 from course.routing import InCourse
 from main.models import Course, User
@@ -274,7 +283,7 @@ class General(TestCase):
                                         status=BrokerSubmit.StatusEnum.ERROR,
                                         update_date=datetime.now() - timedelta(
                                             settings.BROKER_RETRY_POLICY.deletion_timeout))
-        for i in range(10):
+        for i in range(10, 20):
             BrokerSubmit.objects.create(course=self.course,
                                         submit_id=i,
                                         package_instance=self.pkg_instance,
@@ -294,7 +303,7 @@ class General(TestCase):
                                         status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
                                         update_date=datetime.now() - timedelta(
                                             settings.BROKER_RETRY_POLICY.expiration_timeout))
-        for i in range(10):
+        for i in range(10, 20):
             BrokerSubmit.objects.create(course=self.course,
                                         submit_id=i,
                                         package_instance=self.pkg_instance,
@@ -306,6 +315,11 @@ class General(TestCase):
         self.assertEqual(10, BrokerSubmit.objects.filter(
             status=BrokerSubmit.StatusEnum.EXPIRED).count())
 
+    @staticmethod
+    def resend_expired():
+        call_command('resendToBroker')
+        DispatchWorker(max_concurrency=1, broker_url='http://127.0.0.1:8180/').run_once()
+
     def test_resendToBroker(self):
         for i in range(10):
             src_code = settings.SUBMITS_DIR / '1234.cpp'
@@ -320,14 +334,14 @@ class General(TestCase):
                 BrokerSubmit.send(self.course, submit_id,
                                   self.pkg_instance, broker_password=settings.BROKER_PASSWORD)
 
-        call_command('resendToBroker')
+        self.resend_expired()
         self.assertEqual(10, BrokerSubmit.objects.filter(
             status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE).count())
         for _ in range(settings.BROKER_RETRY_POLICY.resend_max_retries):
             BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
                                         submit_id__gte=5).update(
                 status=BrokerSubmit.StatusEnum.EXPIRED)
-            call_command('resendToBroker')
+            self.resend_expired()
             self.assertEqual(10, BrokerSubmit.objects.filter(
                 status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE).count())
             self.assertEqual(0, BrokerSubmit.objects.filter(
@@ -335,7 +349,7 @@ class General(TestCase):
         BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
                                     submit_id__gte=5).update(
             status=BrokerSubmit.StatusEnum.EXPIRED)
-        call_command('resendToBroker')
+        self.resend_expired()
         self.assertEqual(5, BrokerSubmit.objects.filter(
             status=BrokerSubmit.StatusEnum.ERROR).count())
 
@@ -388,6 +402,8 @@ class OnlineTest(TestCase):
                                                   auto_send=False)
             submit.save()
             broker_submit = submit.send()
+        DispatchWorker(max_concurrency=1).run_once()
+        broker_submit.refresh_from_db()
 
         start = datetime.now()
 
@@ -404,3 +420,360 @@ class OnlineTest(TestCase):
             self.assertTrue(submit.score == 0)
             results = Result.objects.all()
             self.assertGreater(len(results), 0)
+
+
+class AcceptingBrokerHandler(server.BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('content-length')))
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class DispatchQueueTest(TestCase):
+    course = None
+    other_course = None
+    pkg_instance = None
+    task = None
+    user = None
+
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.course = Course.objects.create_course(name=f'dispatch {datetime.now().timestamp()}')
+        cls.other_course = Course.objects.create_course(
+            name=f'dispatch other {datetime.now().timestamp()}'
+        )
+        cls.pkg_instance = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        cls.user = User.objects.create_user(password='user1',
+                                            email=f'test{datetime.now().timestamp()}@test.pl')
+
+        with InCourse(cls.course.short_name):
+            round_ = Round.objects.create_round(start_date=datetime.now(),
+                                                deadline_date=datetime.now() + timedelta(days=1))
+            cls.task = Task.objects.create_task(
+                task_name='Dispatched task',
+                package_instance=cls.pkg_instance,
+                round_=round_,
+                points=10,
+                initialise_task=False,
+            )
+
+    @classmethod
+    def tearDownClass(cls) -> None:
+        Course.objects.delete_course(cls.course)
+        Course.objects.delete_course(cls.other_course)
+        pkg_src = cls.pkg_instance.package_source
+        cls.pkg_instance.delete()
+        pkg_src.delete()
+        cls.user.delete()
+
+    def setUp(self) -> None:
+        self.enterContext(patch.object(settings.BROKER_DISPATCH_POLICY, 'enabled', True))
+
+    def tearDown(self) -> None:
+        BrokerSubmit.objects.all().delete()
+        with InCourse(self.course.short_name):
+            Submit.objects.all().delete()
+
+    def create_submit(self, auto_send: bool = False) -> Submit:
+        with InCourse(self.course.short_name):
+            return Submit.objects.create_submit(source_code='1234.cpp',
+                                                task=self.task,
+                                                user=self.user,
+                                                auto_send=auto_send)
+
+    def test_create_submit_enqueues(self):
+        submit = self.create_submit(auto_send=True)
+        broker_submit = BrokerSubmit.objects.get(course=self.course, submit_id=submit.pk)
+        self.assertEqual(broker_submit.status, BrokerSubmit.StatusEnum.NEW)
+        self.assertEqual(broker_submit.send_attempts, 0)
+
+    def test_claim_is_fair_between_courses(self):
+        for i in range(6):
+            BrokerSubmit.objects.enqueue(self.course, i, self.pkg_instance)
+        for i in range(2):
+            BrokerSubmit.objects.enqueue(self.other_course, i, self.pkg_instance)
+
+        claimed = BrokerSubmit.objects.claim_queued(limit=4, course_limit=3)
+        self.assertEqual([s.course_id for s in claimed],
+                         [self.course.pk, self.other_course.pk] * 2)
+        self.assertEqual(4, BrokerSubmit.objects.filter(
+            status=BrokerSubmit.StatusEnum.PROCESSING).count())
+
+        claimed = BrokerSubmit.objects.claim_queued(limit=10, course_limit=3)
+        self.assertEqual([s.course_id for s in claimed], [self.course.pk] * 3)
+
+    def test_failed_dispatch_backoff(self):
+        submit = self.create_submit()
+        broker_submit = BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+        worker = DispatchWorker(max_concurrency=1, broker_url='http://127.0.0.1:1/')
+
+        self.assertEqual((1, 0), worker.run_once())
+        broker_submit.refresh_from_db()
+        self.assertEqual(broker_submit.status, BrokerSubmit.StatusEnum.NEW)
+        self.assertEqual(broker_submit.send_attempts, 1)
+        self.assertGreater(broker_submit.next_attempt_date, timezone.now())
+        self.assertEqual((0, 0), worker.run_once())
+
+        BrokerSubmit.objects.filter(pk=broker_submit.pk).update(
+            send_attempts=settings.BROKER_DISPATCH_POLICY.max_attempts - 1,
+            next_attempt_date=timezone.now()
+        )
+        self.assertEqual((1, 0), worker.run_once())
+        broker_submit.refresh_from_db()
+        self.assertEqual(broker_submit.status, BrokerSubmit.StatusEnum.ERROR)
+        with InCourse(self.course.short_name):
+            submit.refresh_from_db()
+            self.assertEqual(submit.submit_status, ResultStatus.INT)
+
+    def test_successful_dispatch(self):
+        broker = server.HTTPServer(('127.0.0.1', 8181), AcceptingBrokerHandler)
+        thread = Thread(target=broker.serve_forever)
+        thread.start()
+        try:
+            submits = [self.create_submit() for _ in range(3)]
+            for submit in submits:
+                BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+            worker = DispatchWorker(max_concurrency=1, broker_url='http://127.0.0.1:8181/')
+            self.assertEqual((3, 3), worker.run_once())
+        finally:
+            broker.shutdown()
+            broker.server_close()
+            thread.join()
+        self.assertEqual(3, BrokerSubmit.objects.filter(
+            status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE).count())
+
+    def test_batch_dispatch(self):
+        submits = [self.create_submit() for _ in range(5)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+
+        with BrokerStandIn() as broker:
+            worker = DispatchWorker(max_concurrency=1, broker_url=broker.url)
+            worker.client = BrokerClient(batch_url=broker.batch_url, batch_size=2,
+                                         use_batches=True)
+            self.assertEqual((5, 5), worker.run_once())
+            worker.client.close()
+
+        self.assertEqual(3, broker.requests)
+        self.assertCountEqual(broker.received,
+                              [s.broker_id for s in BrokerSubmit.objects.all()])
+        self.assertEqual(5, BrokerSubmit.objects.filter(
+            status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE).count())
+
+    def test_failed_batch_dispatch(self):
+        submits = [self.create_submit() for _ in range(3)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+
+        with BrokerStandIn(status_code=500) as broker:
+            worker = DispatchWorker(max_concurrency=1, broker_url=broker.url)
+            worker.client = BrokerClient(batch_url=broker.batch_url, use_batches=True)
+            self.assertEqual((3, 0), worker.run_once())
+            worker.client.close()
+
+        self.assertEqual(1, broker.requests)
+        self.assertEqual(3, BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.NEW,
+                                                        send_attempts=1).count())
+
+    def test_batch_dispatch_error(self):
+        submits = [self.create_submit() for _ in range(3)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+
+        worker = DispatchWorker(max_concurrency=1)
+        worker.client = BrokerClient(batch_url='http://127.0.0.1:1/batch', batch_size=2,
+                                     use_batches=True)
+        with patch.object(worker.client, 'send_batch', side_effect=RuntimeError('broken')):
+            self.assertEqual((3, 0), worker.run_once())
+        worker.client.close()
+
+        self.assertEqual(3, BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.NEW,
+                                                        send_attempts=1).count())
+        self.assertFalse(BrokerSubmit.objects.filter(
+            next_attempt_date__lte=timezone.now()).exists())
+
+    def test_mark_expired(self):
+        submits = [self.create_submit() for _ in range(3)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+        timeout = settings.BROKER_RETRY_POLICY.expiration_timeout
+        BrokerSubmit.objects.update(status=BrokerSubmit.StatusEnum.AWAITING_RESPONSE,
+                                    update_date=timezone.now() - timedelta(seconds=timeout + 1))
+        BrokerSubmit.objects.filter(submit_id=submits[0].pk).update(update_date=timezone.now())
+
+        self.assertEqual(2, BrokerSubmit.objects.mark_expired(timeout))
+        self.assertEqual(0, BrokerSubmit.objects.mark_expired(timeout))
+        self.assertEqual(2, BrokerSubmit.objects.filter(
+            status=BrokerSubmit.StatusEnum.EXPIRED).count())
+
+    def test_resend_expired(self):
+        retry_limit = settings.BROKER_RETRY_POLICY.resend_max_retries
+        submits = [self.create_submit() for _ in range(4)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+        BrokerSubmit.objects.update(status=BrokerSubmit.StatusEnum.EXPIRED)
+        BrokerSubmit.objects.filter(submit_id__in=[s.pk for s in submits[2:]]).update(
+            retry_amount=retry_limit
+        )
+
+        call_command('resendToBroker')
+        resent = BrokerSubmit.objects.filter(status=BrokerSubmit.StatusEnum.NEW)
+        self.assertCountEqual([s.pk for s in submits[:2]],
+                              resent.values_list('submit_id', flat=True))
+        self.assertTrue(all(s.retry_amount == 1 for s in resent))
+        self.assertEqual(2, BrokerSubmit.objects.filter(
+            status=BrokerSubmit.StatusEnum.ERROR).count())
+        with InCourse(self.course.short_name):
+            for submit in submits:
+                submit.refresh_from_db()
+            self.assertEqual([ResultStatus.PND] * 2 + [ResultStatus.INT] * 2,
+                             [submit.submit_status for submit in submits])
+            self.assertEqual('Retry limit exceeded', submits[3].error_msg)
+
+        self.assertEqual((0, 0), BrokerSubmit.objects.resend_expired(retry_limit))
+
+    def test_delete_errors(self):
+        submits = [self.create_submit() for _ in range(3)]
+        for submit in submits:
+            BrokerSubmit.objects.enqueue(self.course, submit.pk, self.pkg_instance)
+        timeout = settings.BROKER_RETRY_POLICY.deletion_timeout
+        BrokerSubmit.objects.update(status=BrokerSubmit.StatusEnum.ERROR,
+                                    update_date=timezone.now() - timedelta(seconds=timeout + 1))
+        BrokerSubmit.objects.filter(submit_id=submits[0].pk).update(update_date=timezone.now())
+
+        self.assertEqual(2, BrokerSubmit.objects.delete_errors(timeout))
+        self.assertEqual(1, BrokerSubmit.objects.count())
+
+    def test_resend_pending_submits(self):
+        submits = [self.create_submit() for _ in range(4)]
+        BrokerSubmit.objects.enqueue(self.course, submits[0].pk, self.pkg_instance)
+        with InCourse(self.course.short_name):
+            submits[1].end_with_error(ResultStatus.INT, 'error')
+
+        self.assertEqual(2, resend_pending_submits(silent=True, min_age=0))
+        self.assertCountEqual(
+            [submit.pk for submit in (submits[0], submits[2], submits[3])],
+            BrokerSubmit.objects.filter(course=self.course).values_list('submit_id', flat=True)
+        )
+        self.assertTrue(all(broker_submit.package_instance_id == self.pkg_instance.pk
+                            for broker_submit in BrokerSubmit.objects.all()))
+        self.assertEqual(0, resend_pending_submits(silent=True, min_age=0))
+
+    def test_resend_pending_submits_min_age(self):
+        submits = [self.create_submit() for _ in range(2)]
+        with InCourse(self.course.short_name):
+            Submit.objects.filter(pk=submits[0].pk).update(
+                submit_date=timezone.now() - timedelta(seconds=120)
+            )
+
+        self.assertEqual(1, resend_pending_submits(silent=True, min_age=60))
+        self.assertEqual([submits[0].pk],
+                         list(BrokerSubmit.objects.values_list('submit_id', flat=True)))
+
+    def test_enqueue_tracked_submit(self):
+        submits = [self.create_submit() for _ in range(3)]
+        broker_submit = BrokerSubmit.objects.enqueue(self.course, submits[0].pk,
+                                                     self.pkg_instance)
+        self.assertEqual(broker_submit,
+                         BrokerSubmit.objects.enqueue(self.course, submits[0].pk,
+                                                      self.pkg_instance))
+
+        BrokerSubmit.objects.enqueue_many(
+            self.course,
+            [(submit.pk, self.pkg_instance.pk) for submit in submits]
+        )
+        self.assertCountEqual([submit.pk for submit in submits],
+                              BrokerSubmit.objects.values_list('submit_id', flat=True))
+
+class BrokerClientTest(TestCase):
+
+    @staticmethod
+    def create_message(submit_id: str) -> BacaToBroker:
+        return BacaToBroker(pass_hash=make_hash(settings.BROKER_PASSWORD, submit_id),
+                            submit_id=submit_id,
+                            package_path='/packages/test',
+                            commit_id='1',
+                            submit_path=f'/submits/{submit_id}.cpp')
+
+    def setUp(self) -> None:
+        self.broker = BrokerStandIn().start()
+        self.client = BrokerClient(batch_url=self.broker.batch_url, batch_size=3)
+
+    def tearDown(self) -> None:
+        self.client.close()
+        self.broker.stop()
+
+    def test_send(self):
+        for i in range(4):
+            self.assertEqual(200, self.client.send(self.broker.url, self.create_message(str(i))))
+        self.assertEqual(['0', '1', '2', '3'], self.broker.received)
+        self.assertEqual(4, self.broker.requests)
+
+    def test_send_batch(self):
+        messages = [self.create_message(str(i)) for i in range(3)]
+        self.assertEqual(200, self.client.send_batch(messages))
+        self.assertEqual(['0', '1', '2'], self.broker.received)
+        self.assertEqual(1, self.broker.requests)
+
+    def test_send_batch_too_big(self):
+        messages = [self.create_message(str(i)) for i in range(4)]
+        with self.assertRaises(ValueError):
+            self.client.send_batch(messages)
+        self.assertEqual(0, self.broker.requests)
+
+    def test_send_batch_not_configured(self):
+        client = BrokerClient(batch_url=None, use_batches=True)
+        self.assertFalse(client.batch_enabled)
+        with self.assertRaises(ValueError):
+            client.send_batch([self.create_message('0')])
+
+    def test_error_codes(self):
+        self.broker.status_code = 500
+        self.assertEqual(500, self.client.send(self.broker.url, self.create_message('0')))
+        self.assertEqual(BrokerClient.CONNECTION_ERROR,
+                         self.client.send('http://127.0.0.1:1/', self.create_message('0')))
+
+    def test_timeout(self):
+        self.broker.latency = 0.5
+        client = BrokerClient(read_timeout=0.1)
+        self.assertEqual(BrokerClient.TIMEOUT,
+                         client.send(self.broker.url, self.create_message('0')))
+        client.close()
+
+
+class JobLeaseTest(TestCase):
+
+    def test_acquire(self):
+        self.assertTrue(JobLease.objects.acquire('job', 'host:1', 60))
+        self.assertFalse(JobLease.objects.acquire('job', 'host:2', 60))
+        self.assertTrue(JobLease.objects.acquire('job', 'host:1', 60))
+        self.assertTrue(JobLease.objects.acquire('other job', 'host:2', 60))
+
+        JobLease.objects.filter(name='job').update(expires_at=timezone.now())
+        self.assertTrue(JobLease.objects.acquire('job', 'host:2', 60))
+        self.assertEqual('host:2', JobLease.objects.get(name='job').holder)
+
+    def test_leased_job(self):
+        runs = []
+
+        @leased_job('counted job', 1)
+        def job():
+            runs.append(1)
+            return 3
+
+        self.assertEqual(3, job())
+        self.assertEqual(3, job())
+        lease = JobLease.objects.get(name='counted job')
+        self.assertEqual(lease_holder(), lease.holder)
+        self.assertEqual(2, lease.run_count)
+        self.assertEqual(3, lease.last_run_rows)
+        self.assertEqual(6, lease.total_rows)
+        self.assertIsNotNone(lease.last_run_date)
+
+        JobLease.objects.filter(name='counted job').update(holder='other:1')
+        self.assertIsNone(job())
+        self.assertEqual(2, len(runs))
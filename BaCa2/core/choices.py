@@ -50,6 +50,17 @@ INTERNAL_ERROR_STATUSES = [
 ]
 
 
+class JobStatus(models.TextChoices):
+    PND = 'PND', _('Pending')
+    RUN = 'RUN', _('Running')
+    DON = 'DON', _('Done')
+    ERR = 'ERR', _('Failed')
+    CNL = 'CNL', _('Cancelled')
+
+
+FINISHED_JOB_STATUSES = [JobStatus.DON, JobStatus.ERR, JobStatus.CNL]
+
+
 class PermissionCheck(models.TextChoices):
     INDV = 'individual', _('Individual Permissions')
     GRP = 'group', _('Group-level Permissions')
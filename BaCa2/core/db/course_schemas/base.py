@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.db.backends.postgresql import base
+
+from core.db.manager import DB
+from core.exceptions import RoutingError
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    Connection to the database shared by course schemas (``schema`` course database backend).
+    One connection (per thread) serves all courses - before a query is executed, ``search_path``
+    of the connection is switched to the schema of the course chosen by
+    :py:class:`course.routing.InCourse`.
+
+    The schema is set only if it differs from the one set before. Rolled back transactions (and
+    savepoints) may restore the previous ``search_path``, so the set schema is forgotten on
+    rollback and set again before the next query.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        #: Schema set as ``search_path`` of the connection (None if not set or unknown).
+        self.course_schema = None
+        self.execute_wrappers.append(self._switch_schema)
+
+    def get_new_connection(self, conn_params):
+        self.course_schema = None
+        return super().get_new_connection(conn_params)
+
+    def _rollback(self):
+        self.course_schema = None
+        return super()._rollback()
+
+    def _savepoint_rollback(self, sid):
+        self.course_schema = None
+        return super()._savepoint_rollback(sid)
+
+    def forget_schema(self, schema: str) -> None:
+        """
+        It makes the connection set ``search_path`` again if it is set to the given schema. It
+        should be used when the schema is deleted.
+
+        :param schema: Name of the schema.
+        :type schema: str
+        """
+        if self.course_schema == schema.lower():
+            self.course_schema = None
+
+    def _switch_schema(self, execute, sql, params, many, context):
+        """
+        Execute wrapper setting ``search_path`` of the connection to the schema of the current
+        course.
+
+        :raises RoutingError: If no course is chosen.
+        """
+        try:
+            db_name = settings.CURRENT_DB.get()
+        except LookupError:
+            raise RoutingError(
+                "No DB chosen. Remember to use 'with InCourse', while accessing course instance.")
+        # schemas are created with unquoted names, so they are stored in lower case
+        schema = DB(db_name).key.lower()
+        if schema != self.course_schema:
+            with self.wrap_database_errors, self.connection.cursor() as cursor:
+                cursor.execute(f'SET search_path TO {self.ops.quote_name(schema)}')
+            self.course_schema = schema
+        return execute(sql, params, many, context)
@@ -1,8 +1,12 @@
 import copy
 import json
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from threading import Lock
+from time import monotonic
+from typing import Dict, List, Tuple
 
 import psycopg2
 
@@ -15,6 +19,9 @@ WHERE pg_stat_activity.datname = '%s'
   AND pid <> pg_backend_pid();
 """
 
+#: Postgres query checking if a database exists
+DB_EXISTS = "SELECT 1 FROM pg_database WHERE datname = '%s';"
+
 
 class DB:
     """
@@ -98,6 +105,18 @@ class DBManager:
 
     RESERVED_DB_KEYS = {'default', 'postgres', 'template0', 'template1'}
 
+    #: Maximum number of remembered unknown database names.
+    MAX_REMEMBERED_MISSES = 1024
+
+    #: Every course has its own database.
+    DATABASE_BACKEND = 'database'
+    #: Every course has its own schema inside one shared database.
+    SCHEMA_BACKEND = 'schema'
+    BACKENDS = (DATABASE_BACKEND, SCHEMA_BACKEND)
+
+    #: Database engine of the connection shared by course schemas.
+    SCHEMA_ENGINE = 'core.db.course_schemas'
+
     class SQLInjectionError(Exception):
         """
         An exception raised when SQL injection is detected.
@@ -112,11 +131,18 @@ class DBManager:
                  db_host: str = 'localhost',
                  databases: dict = None,
                  default_db_key: str = 'default',
-                 add_default: bool = True, ):
+                 add_default: bool = True,
+                 course_db_settings: dict = None,
+                 backend: str = DATABASE_BACKEND,
+                 schema_db_name: str = 'baca2_courses',
+                 schema_alias: str = 'course_schemas',
+                 migration_workers: int = 1,
+                 miss_ttl: float = 5.0):
         """
         It initializes the DBManager object.
 
-        :param cache_file: The file where the database settings are stored.
+        :param cache_file: The file where the database settings are exported (optional - the
+            databases are registered in the default database, see :py:meth:`load_registry`).
         :type cache_file: Path
         :param default_settings: The default settings for new databases.
         :type default_settings: dict
@@ -133,7 +159,29 @@ class DBManager:
         :type default_db_key: str
         :param add_default: Whether to add the default database to the runtime databases.
         :type add_default: bool
+        :param course_db_settings: Settings overriding the default settings for course databases
+            (e.g. persistent connection settings).
+        :type course_db_settings: dict
+        :param backend: Storage of course data - ``database`` (database per course) or ``schema``
+            (schema per course in the ``schema_db_name`` database). With the ``schema`` backend
+            queries of all courses are sent through one shared connection (see
+            :py:meth:`runtime_alias`), course aliases are used only to migrate course schemas.
+        :type backend: str
+        :param schema_db_name: The name of the database shared by course schemas (used only by
+            the ``schema`` backend).
+        :type schema_db_name: str
+        :param schema_alias: The database alias of the connection shared by course schemas (used
+            only by the ``schema`` backend).
+        :type schema_alias: str
+        :param migration_workers: Number of course databases migrated at the same time by
+            ``migrate_all``.
+        :type migration_workers: int
+        :param miss_ttl: (in seconds) How long an unknown database name is remembered as unknown,
+            before the registry is checked for it again.
+        :type miss_ttl: float
         """
+        if backend not in self.BACKENDS:
+            raise ValueError(f'Unknown course database backend: {backend}.')
         self.cache_file = cache_file
         self.default_settings = default_settings
         self.root_user = root_user
@@ -143,6 +191,15 @@ class DBManager:
         if self.databases is None:
             self.databases = {}
         self.default_db_key = default_db_key
+        self.course_db_settings = course_db_settings or {}
+        self.backend = backend
+        self.schema_db_name = schema_db_name
+        self.schema_alias = schema_alias
+        self.migration_workers = migration_workers
+        self.miss_ttl = miss_ttl
+        #: Version of the registry loaded by this process (None if not loaded yet).
+        self.registry_version = None
+        self._misses: Dict[str, float] = {}
         self.databases_access_lock = Lock()
         self.db_root_access_lock = Lock()
         self.cache_lock = Lock()
@@ -150,18 +207,23 @@ class DBManager:
         if add_default:
             default = DB(self.default_db_key, self.default_settings, key_is_name=True)
             self.databases['default'] = default.to_dict()
+        if self.uses_schemas:
+            self.databases[self.schema_alias] = self._schema_connection_settings()
 
         logger.info('DBManager initialized.')
 
-    def _raw_root_connection(self):
+    def _raw_root_connection(self, database: str = 'postgres'):
         """
         It creates a raw connection to the database server as the root user
 
+        :param database: The database to connect to.
+        :type database: str
+
         :return: A connection to the postgres database.
         """
         try:
             conn = psycopg2.connect(
-                database='postgres',
+                database=database,
                 user=self.root_user,
                 password=self.root_password,
                 host=self.db_host
@@ -192,17 +254,139 @@ class DBManager:
             raise self.SQLInjectionError(
                 'Database name exceeds maximum length. Potential SQL injection.')
 
-        if db_name.lower() in self.RESERVED_DB_KEYS:
+        if db_name.lower() in self.RESERVED_DB_KEYS or db_name == self.schema_alias:
             raise self.SQLInjectionError(
                 'Reserved database name detected. Potential SQL injection.')
 
         # if is_sql_injection(db_name)['is_sqli']:
         #     raise self.SQLInjectionError('SQL injection detected.')
 
+    @property
+    def uses_schemas(self) -> bool:
+        """
+        :return: True if courses are stored as schemas of one shared database.
+        :rtype: bool
+        """
+        return self.backend == self.SCHEMA_BACKEND
+
+    def is_course_db(self, db_key: str) -> bool:
+        """
+        :param db_key: The database alias.
+        :type db_key: str
+        :return: True if the alias belongs to a course (not to the default database or to the
+            connection shared by course schemas).
+        :rtype: bool
+        """
+        return db_key != 'default' and not (self.uses_schemas and db_key == self.schema_alias)
+
+    def runtime_alias(self, db_name: str) -> str:
+        """
+        :param db_name: The name of the course database.
+        :type db_name: str
+        :return: The database alias used to query the course - the course alias, or the alias of
+            the connection shared by course schemas (with the ``schema`` backend).
+        :rtype: str
+        """
+        return self.schema_alias if self.uses_schemas else db_name
+
+    def _schema_connection_settings(self) -> dict:
+        """
+        It returns connection settings of the connection shared by course schemas. Its
+        ``search_path`` is switched to the schema of the current course before queries (see
+        :py:class:`core.db.course_schemas.base.DatabaseWrapper`).
+
+        :return: The connection settings.
+        :rtype: dict
+        """
+        db = DB(self.schema_db_name, self.default_settings, key_is_name=True)
+        return db.to_dict() | self.course_db_settings | {'ENGINE': self.SCHEMA_ENGINE}
+
+    def _course_settings(self, db: DB) -> dict:
+        """
+        It returns connection settings of a course database. With the ``schema`` backend the
+        connection points to the shared database and its ``search_path`` is set to the course
+        schema - such connections are used only by migrations.
+
+        :param db: The course database.
+        :type db: DB
+
+        :return: The connection settings.
+        :rtype: dict
+        """
+        db_settings = db.to_dict() | self.course_db_settings
+        if self.uses_schemas:
+            db_settings['NAME'] = self.schema_db_name
+            db_settings['OPTIONS'] = db_settings.get('OPTIONS', {}) | {
+                'options': f'-c search_path={db.key}'
+            }
+        return db_settings
+
+    def _create_schema_db(self) -> None:
+        """
+        It creates the database shared by course schemas, if it does not exist.
+        """
+        conn = self._raw_root_connection()
+        cursor = conn.cursor()
+        try:
+            cursor.execute(DB_EXISTS % self.schema_db_name)
+            if cursor.fetchone() is None:
+                cursor.execute(' CREATE DATABASE %s; ' % self.schema_db_name)
+                logger.info(f'Database {self.schema_db_name} for course schemas created.')
+        finally:
+            conn.close()
+
+    def _create_course_storage(self, db: DB) -> None:
+        """
+        It (re)creates the database or schema of a course.
+
+        :param db: The course database.
+        :type db: DB
+        """
+        if self.uses_schemas:
+            self._create_schema_db()
+            conn = self._raw_root_connection(self.schema_db_name)
+            sql = [' DROP SCHEMA IF EXISTS %s CASCADE; ' % db.key,
+                   ' CREATE SCHEMA %s AUTHORIZATION %s; ' % (db.key, db.settings['USER'])]
+        else:
+            conn = self._raw_root_connection()
+            sql = [' DROP DATABASE IF EXISTS %s; ' % db.key,
+                   ' CREATE DATABASE %s; ' % db.key]
+        cursor = conn.cursor()
+        try:
+            for statement in sql:
+                cursor.execute(statement)
+        except Exception as e:
+            logger.error(f'Error executing SQL commands: {str(e)}')
+        finally:
+            conn.close()
+
+    def _drop_course_storage(self, db: DB) -> None:
+        """
+        It drops the database or schema of a course.
+
+        :param db: The course database.
+        :type db: DB
+        """
+        if self.uses_schemas:
+            conn = self._raw_root_connection(self.schema_db_name)
+            sql = [' DROP SCHEMA IF EXISTS %s CASCADE; ' % db.key]
+        else:
+            conn = self._raw_root_connection()
+            sql = [CLOSE_ALL_DB_CONNECTIONS % db.key,
+                   ' DROP DATABASE IF EXISTS %s; ' % db.key]
+        cursor = conn.cursor()
+        try:
+            for statement in sql:
+                cursor.execute(statement)
+        except Exception as e:
+            logger.error(f'Error deleting database: {str(e)}')
+        finally:
+            conn.close()
+
     def create_db(self, db_name: str, **kwargs) -> None:
         """
-        It creates a new database, adds it to the settings file and to the runtime database
-        connections.
+        It creates a new database (or schema, depending on the backend), adds it to the settings
+        file and to the runtime database connections.
 
         :param db_name: The name of the database to create
         :type db_name: str
@@ -215,25 +399,14 @@ class DBManager:
                 raise ValueError(f'DB {db_name} already exists.')
 
             with self.db_root_access_lock:
-                conn = self._raw_root_connection()
-                cursor = conn.cursor()
-
-                drop_if_exist = ' DROP DATABASE IF EXISTS %s; '
-                sql = ' CREATE DATABASE %s; '
+                self._create_course_storage(db)
 
-                try:
-                    cursor.execute(drop_if_exist % db.key)
-                    cursor.execute(sql % db.key)
-                except Exception as e:
-                    logger.error(f'Error executing SQL commands: {str(e)}')
-
-                finally:
-                    conn.close()
-
-                self.databases.setdefault(db.name, db.to_dict())
+                self.databases.setdefault(db.name, self._course_settings(db))
+                self._misses.pop(db.name, None)
 
                 with self.cache_lock:
                     self.save_cache(with_locks=False)
+        self._update_registry(db.name, kwargs)
         logger.info(f'Database {db_name} created.')
 
     def migrate_db(self, db_name: str, migrate_all: bool = False) -> None:
@@ -262,14 +435,94 @@ class DBManager:
                      verbosity=0)
         logger.info(f'Database {db_name} migrated.')
 
-    def migrate_all(self):
+    def pending_migrations(self, db_names: List[str]) -> List[str]:
+        """
+        It returns databases which are not at the latest migration. Migrations known to django are
+        compared with the ``django_migrations`` table of every database (one query per database).
+        Databases which cannot be checked are treated as pending.
+
+        :param db_names: The names of the databases to check.
+        :type db_names: List[str]
+
+        :return: The names of the databases with unapplied migrations.
+        :rtype: List[str]
+        """
+        from django.db import connections
+        from django.db.migrations.loader import MigrationLoader
+        from django.db.migrations.recorder import MigrationRecorder
+
+        known = set(MigrationLoader(None, ignore_no_migrations=True).graph.nodes)
+        pending = []
+        for db_name in db_names:
+            try:
+                applied = MigrationRecorder(connections[db_name]).applied_migrations()
+                if known - set(applied):
+                    pending.append(db_name)
+            except Exception as e:
+                logger.warning(f'Cannot check migrations of database {db_name}: {str(e)}')
+                pending.append(db_name)
+            finally:
+                connections[db_name].close()
+        return pending
+
+    def migrate_all(self, workers: int = None) -> 'MigrationReport':
         """
-        It migrates all the databases to the latest version.
+        It migrates all the databases to the latest version. Databases already at the latest
+        migration are skipped, the rest is migrated by a pool of up to ``workers`` processes.
+        Failures are collected in the report - one failed database does not stop the others.
+
+        :param workers: Number of databases migrated at the same time, defaults to
+            ``migration_workers`` (optional)
+        :type workers: int
+
+        :return: The report of migrated, skipped and failed databases.
+        :rtype: MigrationReport
         """
+        from django.db import connections
+
+        workers = workers or self.migration_workers
         with self.databases_access_lock:
-            for db_key in self.databases.keys():
-                if db_key != 'default':
-                    self.migrate_db(db_key, migrate_all=True)
+            databases = {db_key: copy.deepcopy(db_settings)
+                         for db_key, db_settings in self.databases.items()
+                         if self.is_course_db(db_key)}
+
+        report = MigrationReport()
+        start = monotonic()
+        pending = self.pending_migrations(list(databases.keys()))
+        report.skipped = [db_key for db_key in databases if db_key not in pending]
+
+        def collect(db_name: str, duration: float, error: str | None) -> None:
+            if error is None:
+                report.migrated[db_name] = duration
+                logger.info(f'[{len(report.migrated) + len(report.failed)}/{len(pending)}] '
+                            f'Database {db_name} migrated in {duration:.2f} s.')
+            else:
+                report.failed[db_name] = error
+                logger.error(f'[{len(report.migrated) + len(report.failed)}/{len(pending)}] '
+                             f'Migration of database {db_name} failed: {error}')
+
+        if workers <= 1 or len(pending) <= 1:
+            for db_name in pending:
+                collect(*_migrate_course_db(db_name, databases[db_name]))
+        else:
+            # Course connections are closed before forking. The default connection is left open -
+            # workers set inherited connections aside (see _init_migration_worker).
+            for db_name in databases:
+                if db_name in connections:
+                    connections[db_name].close()
+            with ProcessPoolExecutor(max_workers=min(workers, len(pending)),
+                                     initializer=_init_migration_worker) as executor:
+                futures = [executor.submit(_migrate_course_db, db_name, databases[db_name])
+                           for db_name in pending]
+                for future, db_name in zip(futures, pending):
+                    try:
+                        collect(*future.result())
+                    except Exception as e:
+                        collect(db_name, 0, str(e))
+
+        report.duration = monotonic() - start
+        logger.info(str(report))
+        return report
 
     def delete_db(self, db_name: str) -> None:
         """
@@ -280,34 +533,147 @@ class DBManager:
         """
         self.detect_sql_injection(db_name)
         db = DB(db_name, self.default_settings)
-        self.parse_cache()
+        self.load_registry()
 
         with self.databases_access_lock:
             if db.name not in self.databases:
                 raise ValueError(f'DB {db_name} does not exist.')
 
             self.databases.pop(db.name, None)
+            self._forget_connection(db.name)
+            if self.uses_schemas:
+                self._forget_schema(db.key)
 
             with self.cache_lock:
                 self.save_cache(with_locks=False)
 
             with self.db_root_access_lock:
-                conn = self._raw_root_connection()
-                cursor = conn.cursor()
-                try:
-                    cursor.execute(CLOSE_ALL_DB_CONNECTIONS % db.key)
-                    cursor.execute(' DROP DATABASE IF EXISTS %s; ' % db.key)
-                except Exception as e:
-                    logger.error(f'Error deleting database: {str(e)}')
-                finally:
-                    conn.close()
+                self._drop_course_storage(db)
+        self._update_registry(db.name, removed=True)
         logger.info(f'Database {db_name} deleted.')
 
+    @staticmethod
+    def _forget_connection(db_name: str) -> None:
+        """
+        It closes the connection of the current thread to the deleted database and removes it from
+        the course connection pool.
+
+        :param db_name: The name of the deleted database.
+        :type db_name: str
+        """
+        from django.conf import settings
+        from django.db import connections
+
+        if db_name in connections:
+            connections[db_name].close()
+        settings.COURSE_DB_POOL.forget(db_name)
+
+    def _forget_schema(self, schema: str) -> None:
+        """
+        It makes the connection of the current thread shared by course schemas forget the deleted
+        schema.
+
+        :param schema: The name of the deleted schema.
+        :type schema: str
+        """
+        from django.db import connections
+
+        if self.schema_alias in connections:
+            connections[self.schema_alias].forget_schema(schema)
+
+    @staticmethod
+    def _update_registry(db_name: str, db_settings: dict = None, removed: bool = False) -> None:
+        """
+        It registers the database in (or removes it from) the registry in the default database.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+        :param db_settings: Custom settings of the database, ignored if the database is removed.
+        :type db_settings: dict
+        :param removed: Whether the database was removed.
+        :type removed: bool
+        """
+        from django.db import DatabaseError
+
+        from main.models import CourseDatabase
+
+        try:
+            if removed:
+                CourseDatabase.objects.unregister(db_name)
+            else:
+                CourseDatabase.objects.register(db_name, db_settings)
+        except DatabaseError as e:
+            logger.error(f'Error updating course database registry: {str(e)}')
+
+    def load_registry(self, force: bool = False) -> bool:
+        """
+        It loads the databases registered in the default database into the runtime databases.
+        The registry is read only if its version changed since the last load (one query
+        otherwise). Databases are only added - a database deleted by another process stays
+        known until restart, and accessing it fails on connection. If the registry is not
+        available (e.g. not migrated yet), runtime databases are not changed.
+
+        :param force: Whether to reload the registry even if its version did not change.
+        :type force: bool
+
+        :return: True if the registry was reloaded.
+        :rtype: bool
+        """
+        from django.db import DatabaseError
+
+        from main.models import CourseDatabase
+
+        try:
+            version = CourseDatabase.objects.registry_version()
+            if not force and version == self.registry_version:
+                return False
+            version, registered = CourseDatabase.objects.snapshot()
+        except DatabaseError as e:
+            logger.warning(f'Course database registry not available: {str(e)}')
+            return False
+
+        with self.databases_access_lock:
+            for db_name, db_settings in registered.items():
+                db = DB(db_name, self.default_settings, **db_settings)
+                self.databases.setdefault(db.name, self._course_settings(db))
+            self.registry_version = version
+            self._misses.clear()
+        logger.info(f'Databases loaded from registry (version {version}).')
+        return True
+
+    def db_exists(self, db_name: str) -> bool:
+        """
+        It checks if the database is available. Unknown names trigger a registry reload (if its
+        version changed) and are remembered as unknown for ``miss_ttl`` seconds, so repeated
+        requests for a non-existent database don't query the registry.
+
+        :param db_name: The name of the database.
+        :type db_name: str
+
+        :return: True if the database is registered.
+        :rtype: bool
+        """
+        if db_name in self.databases:
+            return self.is_course_db(db_name)
+        if self._misses.get(db_name, 0) > monotonic():
+            return False
+
+        self.load_registry()
+        if db_name in self.databases:
+            return True
+        if len(self._misses) >= self.MAX_REMEMBERED_MISSES:
+            self._misses.clear()
+        self._misses[db_name] = monotonic() + self.miss_ttl
+        return False
+
     def parse_cache(self) -> None:
         """
-        It parses the cache file and loads the databases into the runtime databases.
-        Best to be called on django app startup to load the databases from the cache file.
+        It parses the cache file and loads the databases into the runtime databases. Used on
+        startup, before the registry in the default database is available (see
+        :py:meth:`load_registry`).
         """
+        if self.cache_file is None:
+            return
         with self.cache_lock:
             try:
                 with self.cache_file.open('r') as f:
@@ -322,13 +688,14 @@ class DBManager:
             with self.databases_access_lock:
                 for db_name, db_settings in cache.items():
                     db = DB.from_json(db_settings, db_name=db_name)
-                    self.databases.setdefault(db.name, db.to_dict())
+                    self.databases.setdefault(db.name, self._course_settings(db))
 
         logger.info('Databases loaded from cache.')
 
     def save_cache(self, with_locks: bool = True) -> None:
         """
-        It saves the runtime databases into the cache file.
+        It exports the runtime databases into the cache file (if it is set). The file is replaced
+        atomically, so readers never see a partially written file.
 
         :param with_locks: Whether to use locks when accessing the databases.
         :type with_locks: bool
@@ -339,9 +706,101 @@ class DBManager:
         else:
             databases = copy.deepcopy(self.databases)
 
-        databases.pop('default', None)
+        if self.cache_file is None:
+            return
+        databases = {db_key: db_settings for db_key, db_settings in databases.items()
+                     if self.is_course_db(db_key)}
         try:
-            self.cache_file.write_text(json.dumps(databases, indent=4))
+            tmp_file = self.cache_file.with_name(f'{self.cache_file.name}.{os.getpid()}.tmp')
+            tmp_file.write_text(json.dumps(databases, indent=4))
+            os.replace(tmp_file, self.cache_file)
             logger.info('Databases saved to cache.')
         except Exception as e:
             logger.error(f'Error saving databases to cache: {str(e)}')
+
+
+class MigrationReport:
+    """
+    A class to represent the result of :py:meth:`DBManager.migrate_all`.
+    """
+
+    def __init__(self):
+        #: Migrated databases with migration time (in seconds).
+        self.migrated: Dict[str, float] = {}
+        #: Databases already at the latest migration.
+        self.skipped: List[str] = []
+        #: Databases which failed to migrate with error messages.
+        self.failed: Dict[str, str] = {}
+        #: (In seconds) Duration of the whole migration.
+        self.duration: float = 0
+
+    @property
+    def ok(self) -> bool:
+        """
+        :return: True if no database failed to migrate.
+        :rtype: bool
+        """
+        return not self.failed
+
+    def __str__(self):
+        return (f'Migrated {len(self.migrated)} databases, skipped {len(self.skipped)} '
+                f'up to date, {len(self.failed)} failed in {self.duration:.2f} s.')
+
+
+#: Connections inherited by a forked migration worker, kept so they are never closed by the worker
+_inherited_connections = []
+
+
+def _init_migration_worker() -> None:
+    """
+    It prepares a migration worker process. Processes started with ``spawn`` (e.g. on windows)
+    have to set up django, forked processes inherit it.
+
+    Forked processes also inherit open connections of the parent process. Using them would mix
+    queries of both processes on the same socket, and closing them would end the parent's
+    sessions - so they are set aside and the worker opens its own connections.
+    """
+    import django
+    from django.apps import apps
+    from django.db import connections
+
+    if not apps.apps_ready:
+        django.setup()
+        return
+
+    for connection in connections.all(initialized_only=True):
+        if connection.connection is not None:
+            _inherited_connections.append(connection.connection)
+            connection.connection = None
+
+
+def _migrate_course_db(db_name: str, db_settings: dict) -> Tuple[str, float, str | None]:
+    """
+    It migrates a single course database. Used by :py:meth:`DBManager.migrate_all` (also in
+    worker processes), so it never raises.
+
+    :param db_name: The name of the database to migrate.
+    :type db_name: str
+    :param db_settings: Connection settings of the database.
+    :type db_settings: dict
+
+    :return: Tuple (db_name, duration, error) - error is None if migration succeeded.
+    :rtype: Tuple[str, float, str | None]
+    """
+    from django.conf import settings
+    from django.core.management import call_command
+    from django.db import connections
+
+    start = monotonic()
+    settings.DATABASES.setdefault(db_name, db_settings)
+    try:
+        call_command('migrate',
+                     database=db_name,
+                     interactive=False,
+                     skip_checks=True,
+                     verbosity=0)
+        return db_name, monotonic() - start, None
+    except Exception as e:
+        return db_name, monotonic() - start, str(e)
+    finally:
+        connections[db_name].close()
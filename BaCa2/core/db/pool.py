@@ -0,0 +1,135 @@
+import logging
+from collections import OrderedDict
+from threading import local
+from time import monotonic
+from typing import Iterable, List
+
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+
+class CourseConnectionPool:
+    """
+    It keeps track of persistent connections to course databases opened by the current thread
+    (django keeps one connection per database alias per thread). Course databases are created at
+    runtime, so with persistent connections (``CONN_MAX_AGE > 0``) every course ever visited would
+    keep its connection open. The pool caps the number of open course connections - the least
+    recently used ones are closed when the cap is exceeded - and closes connections which were
+    idle for too long.
+
+    Connections inside an atomic block are never closed.
+    """
+
+    def __init__(self,
+                 max_connections: int,
+                 idle_timeout: float,
+                 excluded_aliases: Iterable[str] = ('default',)):
+        """
+        It initializes the CourseConnectionPool object.
+
+        :param max_connections: Maximum number of open course connections per thread.
+        :type max_connections: int
+        :param idle_timeout: (in seconds) How long a connection can be unused before it is closed.
+        :type idle_timeout: float
+        :param excluded_aliases: Database aliases not managed by the pool.
+        :type excluded_aliases: Iterable[str]
+        """
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.excluded_aliases = set(excluded_aliases)
+        self._local = local()
+
+    @property
+    def _last_used(self) -> OrderedDict:
+        """
+        :return: Aliases used by the current thread, ordered from the least recently used, with
+            time of their last use.
+        :rtype: OrderedDict
+        """
+        if not hasattr(self._local, 'last_used'):
+            self._local.last_used = OrderedDict()
+        return self._local.last_used
+
+    @property
+    def aliases(self) -> List[str]:
+        """
+        :return: Course database aliases tracked in the current thread, ordered from the least
+            recently used.
+        :rtype: List[str]
+        """
+        return list(self._last_used.keys())
+
+    def touch(self, alias: str) -> None:
+        """
+        It marks the database alias as used and closes the least recently used connections if
+        the cap is exceeded.
+
+        :param alias: The database alias.
+        :type alias: str
+        """
+        if alias in self.excluded_aliases:
+            return
+        last_used = self._last_used
+        last_used[alias] = monotonic()
+        last_used.move_to_end(alias)
+
+        for lru_alias in list(last_used.keys()):
+            if len(last_used) <= self.max_connections:
+                break
+            if lru_alias != alias:
+                self.close(lru_alias)
+
+    def close(self, alias: str) -> bool:
+        """
+        It closes the connection of the current thread to the database and stops tracking it.
+
+        :param alias: The database alias.
+        :type alias: str
+
+        :return: True if the connection was closed (or not opened), False if it is in use.
+        :rtype: bool
+        """
+        if alias in connections:
+            connection = connections[alias]
+            if connection.in_atomic_block:
+                return False
+            connection.close()
+        self._last_used.pop(alias, None)
+        return True
+
+    def forget(self, alias: str) -> None:
+        """
+        It stops tracking the database alias without closing the connection. It should be used
+        when the database is deleted.
+
+        :param alias: The database alias.
+        :type alias: str
+        """
+        self._last_used.pop(alias, None)
+
+    def close_idle(self, **kwargs) -> int:
+        """
+        It closes connections of the current thread which were not used for longer than
+        ``idle_timeout``. It can be connected to the ``request_finished`` signal.
+
+        :return: The number of closed connections.
+        :rtype: int
+        """
+        deadline = monotonic() - self.idle_timeout
+        closed = 0
+        for alias, used in list(self._last_used.items()):
+            if used > deadline:
+                break
+            if self.close(alias):
+                closed += 1
+        if closed:
+            logger.debug(f'Closed {closed} idle course database connections.')
+        return closed
+
+    def close_all(self) -> None:
+        """
+        It closes all course connections of the current thread.
+        """
+        for alias in self.aliases:
+            self.close(alias)
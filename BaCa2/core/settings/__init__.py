@@ -38,6 +38,7 @@ include(
     'login.py',
     'packages.py',
     'broker.py',
+    'jobs.py',
     'static_files.py',
     'usos.py',
     'email.py',
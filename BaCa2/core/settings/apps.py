@@ -21,6 +21,7 @@ INSTALLED_APPS = [
     'course',
     'package',
     'util',
+    'jobs',
 ]
 
 MIDDLEWARE = [
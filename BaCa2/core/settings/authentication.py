@@ -21,3 +21,8 @@ AUTHENTICATION_BACKENDS = [
 ]
 
 AUTH_USER_MODEL = 'main.User'
+
+# (In seconds) how long course permission matrices (user's course role and its permissions) are
+# cached between requests - they are also invalidated on every change of course roles (in all
+# processes sharing the 'course_permissions' cache, see CACHES)
+COURSE_PERMISSION_CACHE_TTL = 30.0
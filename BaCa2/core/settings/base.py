@@ -1,3 +1,5 @@
+import os
+
 BACA2_VERSION = '1.4.3-beta'
 
 ROOT_URLCONF = 'core.urls'
@@ -10,4 +12,22 @@ TIME_FORMAT = '%H:%M'
 
 SITE_ID = 1
 
+# Directory of the course permissions cache - file based, so it is shared by all processes of one
+# host (e.g. gunicorn workers). Course permission matrices are invalidated through it (see
+# main.models.CoursePermissionCache).
+CACHE_DIR = os.getenv('BACA2_CACHE_DIR')
+if not CACHE_DIR:
+    CACHE_DIR = BASE_DIR / 'cache'  # noqa: F821
+_auto_create_dirs.add_dir(CACHE_DIR)  # noqa: F821
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'course_permissions': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': CACHE_DIR,
+    },
+}
+
 # STORAGES = {}
@@ -3,6 +3,8 @@ import os
 MOCK_BROKER = False
 
 BROKER_URL = os.getenv('BROKER_URL')
+# Optional broker endpoint accepting lists of submits (used only in batch mode)
+BROKER_BATCH_URL = os.getenv('BROKER_BATCH_URL')
 BROKER_TIMEOUT = 600  # seconds
 
 SUBMITS_DIR = BASE_DIR / 'submits'  # noqa: F821
@@ -29,6 +31,9 @@ class BrokerRetryPolicy:
 
     # (In minutes) how often system should perform a check for untracked pending submits
     untracked_check_interval = 30.0
+    # (In seconds) how old should pending submits be before they are resent as untracked (younger
+    # submits may still be sent by the request that created them)
+    untracked_min_age = 60.0
 
     # (In minutes) specify how old should error submits be before they are deleted
     deletion_timeout = 60.0 * 24
@@ -37,6 +42,57 @@ class BrokerRetryPolicy:
 
     # Auto start broker daemons
     auto_start = True
+    # (In seconds) how long after its interval a job lease can be taken over by another process
+    # (only the process holding the lease runs scheduled broker jobs)
+    job_lease_grace_period = 60.0
 
 
 BROKER_RETRY_POLICY = BrokerRetryPolicy()
+
+
+class BrokerClientPolicy:
+    """Broker HTTP client settings"""
+    # (In seconds) timeouts of establishing connection and waiting for the broker response
+    connect_timeout = 3.05
+    read_timeout = 10.0
+
+    # How many keep-alive connections to the broker are kept open (per process)
+    pool_size = 16
+
+    # If True (and BROKER_BATCH_URL is set), many submits are sent to the broker in one request
+    batch_enabled = False
+    # Maximum amount of submits sent in one batch request
+    batch_size = 50
+
+
+BROKER_CLIENT_POLICY = BrokerClientPolicy()
+
+
+class BrokerDispatchPolicy:
+    """Asynchronous broker dispatch queue settings (see ``dispatchSubmits`` command)"""
+    # If True, new submits are queued and sent to the broker by the dispatch worker, instead of
+    # being sent inside the request that created them. Should be enabled only if the
+    # ``dispatchSubmits`` worker is deployed - queued submits are never sent without it.
+    enabled = False
+
+    # How many submits can be sent to the broker at the same time
+    max_concurrency = 8
+    # How many queued submits can be claimed by the worker in one cycle
+    batch_size = 32
+    # How many queued submits of one course can be claimed in one cycle (per-course fairness)
+    course_batch_size = 8
+    # (In seconds) how long the worker waits before checking an empty queue again
+    poll_interval = 1.0
+
+    # (In seconds) delay after the first failed attempt, doubled after every next failure
+    backoff_base = 2.0
+    # (In seconds) maximum delay between two attempts
+    backoff_max = 60.0 * 5
+    # how many failed attempts are allowed before the submit ends with an error
+    max_attempts = 8
+
+    # (In seconds) how long a claimed submit can stay in processing before it is queued again
+    processing_timeout = 60.0 * 2
+
+
+BROKER_DISPATCH_POLICY = BrokerDispatchPolicy()
@@ -2,6 +2,7 @@ import os
 from contextvars import ContextVar
 
 from core.db.manager import DBManager
+from core.db.pool import CourseConnectionPool
 
 DB_BACKUP_DIR = BASE_DIR / 'backup'  # noqa: F821
 _auto_create_dirs.add_dir(DB_BACKUP_DIR)  # noqa: F821
@@ -31,6 +32,33 @@ DEFAULT_DB_SETTINGS = {
     'ATOMIC_REQUESTS': False
 }
 
+
+class CourseDBConnectionPolicy:
+    """Connection settings of course databases"""
+    # (In seconds) how long a course database connection is reused (0 - closed after each request)
+    conn_max_age = 60.0 * 10
+    # If True, reused connections are checked before every request
+    health_checks = True
+
+    # Maximum number of open course database connections per worker thread - the least recently
+    # used connections are closed first
+    max_connections = 16
+    # (In seconds) course database connections unused for this long are closed after a request
+    idle_timeout = 60.0
+
+
+COURSE_DB_CONNECTION_POLICY = CourseDBConnectionPolicy()
+
+# Storage of course data: 'database' (database per course) or 'schema' (schema per course, inside
+# the COURSE_SCHEMA_DB_NAME database - all courses are queried through one shared connection)
+COURSE_DB_BACKEND = os.getenv('BACA2_COURSE_DB_BACKEND', DBManager.DATABASE_BACKEND)
+COURSE_SCHEMA_DB_NAME = os.getenv('BACA2_COURSE_SCHEMA_DB_NAME', 'baca2_courses')
+# (In seconds) how long an unknown course database name is remembered, before the course
+# database registry is checked for it again
+COURSE_DB_REGISTRY_MISS_TTL = 5.0
+# How many course databases (or schemas) are migrated at the same time by separate processes
+COURSE_DB_MIGRATION_WORKERS = int(os.getenv('BACA2_COURSE_DB_MIGRATION_WORKERS', 4))
+
 DATABASES = {}
 
 DB_MANAGER = DBManager(
@@ -41,9 +69,24 @@ DB_MANAGER = DBManager(
     db_host=DEFAULT_DB_HOST,
     databases=DATABASES,
     default_db_key=DEFAULT_DB_KEY,
+    course_db_settings={
+        'CONN_MAX_AGE': COURSE_DB_CONNECTION_POLICY.conn_max_age,
+        'CONN_HEALTH_CHECKS': COURSE_DB_CONNECTION_POLICY.health_checks,
+    },
+    backend=COURSE_DB_BACKEND,
+    schema_db_name=COURSE_SCHEMA_DB_NAME,
+    migration_workers=COURSE_DB_MIGRATION_WORKERS,
+    miss_ttl=COURSE_DB_REGISTRY_MISS_TTL,
 )
+# Course databases are registered in the default database (see DBManager.load_registry) - the
+# cache file is an export, used only until the registry is loaded on startup
 DB_MANAGER.parse_cache()
 
+COURSE_DB_POOL = CourseConnectionPool(
+    max_connections=COURSE_DB_CONNECTION_POLICY.max_connections,
+    idle_timeout=COURSE_DB_CONNECTION_POLICY.idle_timeout,
+)
+
 # DB routing for courses
 DATABASE_ROUTERS = ['course.routing.ContextCourseRouter']
 CURRENT_DB = ContextVar('CURRENT_DB')
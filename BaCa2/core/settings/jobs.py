@@ -0,0 +1,15 @@
+class BackgroundJobsPolicy:
+    """Background jobs settings (see ``runJobs`` command)"""
+    # If True, long operations are queued as jobs and run by the job worker, instead of being run
+    # inside the request that started them. If False, jobs are run as soon as they are queued.
+    # Should be enabled only if the ``runJobs`` worker is deployed - queued jobs are never run
+    # without it.
+    enabled = False
+    # (In seconds) how long the worker waits before checking an empty queue again
+    poll_interval = 1.0
+    # (In seconds) how long a running job can go without reporting progress before it is
+    # considered abandoned by its worker and marked as failed
+    stale_timeout = 60.0 * 30
+
+
+BACKGROUND_JOBS_POLICY = BackgroundJobsPolicy()
@@ -1,7 +1,8 @@
 import os
-from typing import Dict
 
 import baca2PackageManager as pkg
+from core.tools.blob_store import BlobStore
+from core.tools.package_cache import PackageCache
 
 PACKAGES_DIR = os.getenv('PACKAGES_DIR')   # noqa: F821
 if not PACKAGES_DIR:
@@ -18,12 +19,45 @@ if not TASK_DESCRIPTIONS_DIR:
     TASK_DESCRIPTIONS_DIR = BASE_DIR / 'task_descriptions'   # noqa: F821
 _auto_create_dirs.add_dir(TASK_DESCRIPTIONS_DIR)   # noqa: F821
 
+# Rendered task descriptions, shared by all worker processes (see RenderedMarkupCache)
+RENDERED_DESCRIPTIONS_DIR = os.getenv('RENDERED_DESCRIPTIONS_DIR')   # noqa: F821
+if not RENDERED_DESCRIPTIONS_DIR:
+    RENDERED_DESCRIPTIONS_DIR = BASE_DIR / 'rendered_descriptions'   # noqa: F821
+_auto_create_dirs.add_dir(RENDERED_DESCRIPTIONS_DIR)   # noqa: F821
+
 ATTACHMENTS_DIR = os.getenv('ATTACHMENTS_DIR')  # noqa: F821
 if not ATTACHMENTS_DIR:
     ATTACHMENTS_DIR = BASE_DIR / 'attachments'  # noqa: F821
 _auto_create_dirs.add_dir(ATTACHMENTS_DIR)  # noqa: F821
 
+# Content-addressed store of package files - should be on the same file system as PACKAGES_DIR
+# and MEDIA_ROOT, so that files can be hardlinked to blobs (see BlobStore)
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR')  # noqa: F821
+if not BLOB_STORE_DIR:
+    BLOB_STORE_DIR = BASE_DIR / 'blobs'  # noqa: F821
+_auto_create_dirs.add_dir(BLOB_STORE_DIR)  # noqa: F821
+
+# config files are saved in place by the package manager, so they are never shared
+BLOBS = BlobStore(BLOB_STORE_DIR, mutable_names=('config.yml',))
+
 pkg.set_base_dir(PACKAGES_DIR)
 pkg.add_supported_extensions('cpp')
 
-PACKAGES: Dict[str, pkg.Package] = {}
+
+class PackageCachePolicy:
+    """Cache of parsed packages (separate in every worker process)"""
+    # Maximum number of cached packages - the least recently used packages are evicted first
+    max_packages = int(os.getenv('BACA2_PACKAGE_CACHE_SIZE', 256))
+    # (In bytes) Maximum estimated memory of cached packages (None - not limited)
+    max_memory = 128 * 1024 * 1024
+    # If True, the most recently created packages are loaded on startup (with gunicorn's
+    # preload_app, workers share them through copy-on-write)
+    warm_up = True
+
+
+PACKAGE_CACHE_POLICY = PackageCachePolicy()
+
+PACKAGES = PackageCache(
+    max_packages=PACKAGE_CACHE_POLICY.max_packages,
+    max_memory=PACKAGE_CACHE_POLICY.max_memory,
+)
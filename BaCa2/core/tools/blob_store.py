@@ -0,0 +1,217 @@
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from typing import Iterable, Tuple
+
+from .misc import random_id
+
+logger = logging.getLogger(__name__)
+
+
+class BlobStore:
+    """
+    Content-addressed store of files. Every unique file content (blob) is stored once, under the
+    sha256 digest of the content, and files with the same content are hardlinks to the blob. Blobs
+    no longer linked from anywhere outside the store (their link count dropped to 1) are removed
+    by :meth:`collect_garbage`.
+
+    Files linked to blobs share their content, so they have to be replaced, never written in
+    place. Files whose names are in ``mutable_names`` (e.g. package config files, saved in place
+    by the package manager) are always copied instead.
+
+    Hardlinks work only within one file system - if linking fails, files are copied.
+    """
+
+    #: size of chunks in which files are hashed
+    CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, root: Path, mutable_names: Iterable[str] = ()) -> None:
+        """
+        :param root: Directory in which blobs are stored.
+        :type root: Path
+        :param mutable_names: Names of files which are never linked to blobs (optional)
+        :type mutable_names: Iterable[str]
+        """
+        self.root = Path(root)
+        self.mutable_names = frozenset(mutable_names)
+
+    @classmethod
+    def digest(cls, path: Path) -> str:
+        """
+        :param path: Path to the file.
+        :type path: Path
+        :return: sha256 digest of the file content.
+        :rtype: str
+        """
+        sha = hashlib.sha256()
+        with open(path, 'rb') as file:
+            while chunk := file.read(cls.CHUNK_SIZE):
+                sha.update(chunk)
+        return sha.hexdigest()
+
+    def blob_path(self, digest: str) -> Path:
+        """
+        :param digest: Digest of the blob.
+        :type digest: str
+        :return: Path of the blob (blobs are sharded by the first bytes of the digest).
+        :rtype: Path
+        """
+        return self.root / digest[:2] / digest[2:4] / digest
+
+    def add(self, path: Path) -> Path:
+        """
+        It stores the content of a file in the store. If a blob with the same content is already
+        stored, the file is replaced with a hardlink to it, otherwise the file becomes the blob.
+
+        :param path: Path to the file.
+        :type path: Path
+        :return: Path of the blob (the file itself if it could not be stored).
+        :rtype: Path
+        """
+        return self._store(Path(path))[1]
+
+    def dedupe_tree(self, directory: Path) -> int:
+        """
+        It stores all files of a directory tree in the store, replacing files with hardlinks to
+        already stored blobs. Empty files and files with mutable names are skipped.
+
+        :param directory: The directory.
+        :type directory: Path
+        :return: (In bytes) Disk space freed by replacing files with links.
+        :rtype: int
+        """
+        freed = 0
+        for path in self._files(directory):
+            stat = path.stat()
+            if stat.st_nlink == 1 and self._store(path)[2]:
+                freed += stat.st_size
+        return freed
+
+    def materialize(self, source: Path, target: Path) -> Path:
+        """
+        It creates a copy of a directory tree, in which files are hardlinks to blobs of the
+        source files (stored in the store if needed). Files with mutable names are copied.
+
+        :param source: The source directory.
+        :type source: Path
+        :param target: The target directory (must not exist).
+        :type target: Path
+        :return: The target directory.
+        :rtype: Path
+        """
+        def link(src: str, dst: str) -> None:
+            if Path(src).name in self.mutable_names or os.path.getsize(src) == 0:
+                shutil.copy2(src, dst)
+                return
+            try:
+                os.link(self.add(Path(src)), dst)
+            except OSError:
+                shutil.copy2(src, dst)
+
+        shutil.copytree(source, target, copy_function=link)
+        return Path(target)
+
+    def link(self, path: Path, directory: Path) -> Path:
+        """
+        It links a file into a directory, at a path derived from its content - files with the same
+        content and name are linked at the same path.
+
+        :param path: Path to the file.
+        :type path: Path
+        :param directory: The directory.
+        :type directory: Path
+        :return: Path of the link (``<directory>/<digest>/<file name>``).
+        :rtype: Path
+        """
+        digest, blob, _ = self._store(Path(path))
+        target = Path(directory) / digest / Path(path).name
+        if target.exists():
+            return target
+        target.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            self._replace_with_link(blob, target)
+        except OSError:
+            shutil.copy2(blob, target)
+        return target
+
+    def collect_garbage(self) -> Tuple[int, int]:
+        """
+        It removes blobs which are not linked from anywhere outside the store.
+
+        :return: Number of removed blobs and (in bytes) their total size.
+        :rtype: Tuple[int, int]
+        """
+        removed = freed = 0
+        for blob in self._files(self.root):
+            stat = blob.stat()
+            if stat.st_nlink > 1:
+                continue
+            blob.unlink()
+            removed += 1
+            freed += stat.st_size
+        for directory in sorted(self.root.glob('*/*'), reverse=True) + list(self.root.glob('*')):
+            if directory.is_dir() and not any(directory.iterdir()):
+                directory.rmdir()
+        logger.info(f'Removed {removed} unused blobs ({freed} bytes).')
+        return removed, freed
+
+    def _files(self, directory: Path) -> Iterable[Path]:
+        """
+        :param directory: The directory.
+        :type directory: Path
+        :return: Regular, non-empty files of the directory tree, except files with mutable names.
+        :rtype: Iterable[Path]
+        """
+        for root, _, files in os.walk(directory):
+            for name in files:
+                path = Path(root) / name
+                if name in self.mutable_names or path.is_symlink():
+                    continue
+                if path.stat().st_size > 0:
+                    yield path
+
+    def _store(self, path: Path) -> Tuple[str, Path, bool]:
+        """
+        :param path: Path to the file to be stored.
+        :type path: Path
+        :return: Digest of the file, path of the blob (the file itself if it could not be stored)
+            and whether the file was replaced with a link to an already stored blob.
+        :rtype: Tuple[str, Path, bool]
+        """
+        digest = self.digest(path)
+        blob = self.blob_path(digest)
+        try:
+            if not blob.exists():
+                blob.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(path, blob)
+                    return digest, blob, False
+                except FileExistsError:
+                    pass
+            if os.path.samefile(path, blob):
+                return digest, blob, False
+            self._replace_with_link(blob, path)
+        except OSError as e:
+            logger.warning(f'File {path} not stored in blob store: {e}')
+            return digest, path, False
+        return digest, blob, True
+
+    @staticmethod
+    def _replace_with_link(blob: Path, path: Path) -> None:
+        """
+        It atomically replaces a file with a hardlink to a blob.
+
+        :param blob: Path of the blob.
+        :type blob: Path
+        :param path: Path of the replaced file.
+        :type path: Path
+        """
+        tmp_path = path.with_name(f'.{path.name}.{random_id()}')
+        os.link(blob, tmp_path)
+        try:
+            os.replace(tmp_path, path)
+        except OSError:
+            tmp_path.unlink(missing_ok=True)
+            raise
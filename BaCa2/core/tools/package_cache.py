@@ -0,0 +1,271 @@
+import logging
+import sys
+from collections import OrderedDict
+from threading import RLock
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Tuple
+
+from baca2PackageManager import Package
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_size(obj: Any, max_depth: int = 32) -> int:
+    """
+    Estimates memory used by an object, together with the containers and objects it refers to
+    (through their ``__dict__``). Every object is counted once.
+
+    :param obj: The object to be measured.
+    :type obj: Any
+    :param max_depth: Objects nested deeper than this are not counted.
+    :type max_depth: int
+    :return: Estimated size of the object in bytes.
+    :rtype: int
+    """
+    seen = set()
+    size = 0
+    stack = [(obj, 0)]
+    while stack:
+        current, depth = stack.pop()
+        if id(current) in seen or depth > max_depth:
+            continue
+        seen.add(id(current))
+        size += sys.getsizeof(current)
+
+        if isinstance(current, dict):
+            children = [*current.keys(), *current.values()]
+        elif isinstance(current, (list, tuple, set, frozenset)):
+            children = current
+        elif hasattr(current, '__dict__') and not isinstance(current, type):
+            children = [current.__dict__]
+        else:
+            continue
+        stack.extend((child, depth + 1) for child in children)
+    return size
+
+
+class PackageCache:
+    """
+    Cache of parsed packages (:class:`baca2PackageManager.Package` objects), keyed by package
+    instance keys. Reading a package parses its config files, so parsed packages are reused, but
+    the cache is bounded - when it holds more than ``max_packages`` packages, or their estimated
+    memory exceeds ``max_memory``, the least recently used packages are evicted.
+
+    The cache can be used from many threads. It keeps counters of hits, misses and evictions.
+    Every worker process has its own cache - packages loaded before workers are forked (see
+    :meth:`warm_up`) are shared by them through copy-on-write.
+    """
+
+    def __init__(self,
+                 max_packages: int,
+                 max_memory: int = None,
+                 estimate: Callable[[Package], int] = estimate_size):
+        """
+        It initializes the PackageCache object.
+
+        :param max_packages: Maximum number of cached packages.
+        :type max_packages: int
+        :param max_memory: (In bytes) Maximum estimated memory of cached packages, if None - not
+            limited (optional)
+        :type max_memory: int
+        :param estimate: Function estimating memory used by a package in bytes (optional)
+        :type estimate: Callable[[Package], int]
+        """
+        self.max_packages = max_packages
+        self.max_memory = max_memory
+        self.estimate = estimate
+        self._packages: OrderedDict[Hashable, Tuple[Package, int]] = OrderedDict()
+        self._memory = 0
+        self._lock = RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._packages
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._packages)
+
+    def __getitem__(self, key: Hashable) -> Package:
+        package = self.get(key)
+        if package is None:
+            raise KeyError(key)
+        return package
+
+    def __setitem__(self, key: Hashable, package: Package) -> None:
+        self.put(key, package)
+
+    def keys(self) -> List[Hashable]:
+        """
+        :return: Keys of cached packages, from the least recently used.
+        :rtype: List[Hashable]
+        """
+        with self._lock:
+            return list(self._packages.keys())
+
+    @property
+    def memory(self) -> int:
+        """
+        :return: (In bytes) Estimated memory used by cached packages.
+        :rtype: int
+        """
+        return self._memory
+
+    @property
+    def stats(self) -> Dict[str, int]:
+        """
+        :return: Counters of the cache - hits, misses, evictions, number of cached packages and
+            their estimated memory (in bytes).
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'packages': len(self._packages),
+                'memory': self._memory,
+            }
+
+    def get(self, key: Hashable, default: Package = None) -> Package | None:
+        """
+        :param key: Key of the package.
+        :type key: Hashable
+        :param default: Value returned if the package is not cached (optional)
+        :type default: Package
+        :return: Cached package (marked as the most recently used) or `default`.
+        :rtype: Package | None
+        """
+        with self._lock:
+            entry = self._packages.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._packages.move_to_end(key)
+            return entry[0]
+
+    def put(self, key: Hashable, package: Package) -> Package:
+        """
+        It caches a package (replacing the package cached with the same key) and evicts the least
+        recently used packages if the cache exceeds its bounds. The package put last is never
+        evicted.
+
+        :param key: Key of the package.
+        :type key: Hashable
+        :param package: The package to be cached.
+        :type package: Package
+        :return: The cached package.
+        :rtype: Package
+        """
+        size = self.estimate(package)
+        with self._lock:
+            self._remove(key)
+            self._packages[key] = (package, size)
+            self._memory += size
+            self._evict()
+        return package
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Package]) -> Package:
+        """
+        It returns a cached package, or loads and caches it if it is not cached. Packages are
+        loaded outside the lock - if two threads load the same package at once, the package
+        cached first is returned to both.
+
+        :param key: Key of the package.
+        :type key: Hashable
+        :param loader: Function loading the package.
+        :type loader: Callable[[], Package]
+        :return: The package.
+        :rtype: Package
+        """
+        package = self.get(key)
+        if package is not None:
+            return package
+        package = loader()
+        size = self.estimate(package)
+        with self._lock:
+            entry = self._packages.get(key)
+            if entry is not None:
+                self._packages.move_to_end(key)
+                return entry[0]
+            self._packages[key] = (package, size)
+            self._memory += size
+            self._evict()
+        return package
+
+    def pop(self, key: Hashable, default: Package = None) -> Package | None:
+        """
+        :param key: Key of the package.
+        :type key: Hashable
+        :param default: Value returned if the package is not cached (optional)
+        :type default: Package
+        :return: Removed package or `default`.
+        :rtype: Package | None
+        """
+        with self._lock:
+            entry = self._remove(key)
+        return default if entry is None else entry[0]
+
+    def clear(self) -> None:
+        """
+        It removes all packages from the cache and resets its counters.
+        """
+        with self._lock:
+            self._packages.clear()
+            self._memory = 0
+            self.hits = self.misses = self.evictions = 0
+
+    def warm_up(self, packages: Iterable[Tuple[Hashable, Callable[[], Package]]]) -> int:
+        """
+        It loads packages into the cache, until the cache is full. Called on startup - with
+        gunicorn's ``preload_app`` the packages are loaded once, before workers are forked.
+
+        :param packages: Keys and loaders of packages, from the most important.
+        :type packages: Iterable[Tuple[Hashable, Callable[[], Package]]]
+        :return: Number of loaded packages.
+        :rtype: int
+        """
+        loaded = 0
+        for key, loader in packages:
+            if len(self) >= self.max_packages:
+                break
+            if self.max_memory is not None and self._memory >= self.max_memory:
+                break
+            try:
+                package = loader()
+            except Exception as e:
+                logger.warning(f'Package {key} not loaded into cache: {e}')
+                continue
+            self.put(key, package)
+            loaded += 1
+        logger.info(f'Package cache warmed up with {loaded} packages ({self._memory} bytes).')
+        return loaded
+
+    def _remove(self, key: Hashable) -> Tuple[Package, int] | None:
+        """
+        :param key: Key of the package to be removed (the lock has to be held).
+        :type key: Hashable
+        :return: Removed cache entry (package and its size) or None.
+        :rtype: Tuple[Package, int] | None
+        """
+        entry = self._packages.pop(key, None)
+        if entry is not None:
+            self._memory -= entry[1]
+        return entry
+
+    def _evict(self) -> None:
+        """
+        It evicts the least recently used packages until the cache is within its bounds (the lock
+        has to be held). The most recently used package is never evicted.
+        """
+        while len(self._packages) > 1 and (
+            len(self._packages) > self.max_packages or
+            (self.max_memory is not None and self._memory > self.max_memory)
+        ):
+            key, (_, size) = self._packages.popitem(last=False)
+            self._memory -= size
+            self.evictions += 1
+            logger.debug(f'Package {key} evicted from cache.')
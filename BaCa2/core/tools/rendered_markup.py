@@ -0,0 +1,183 @@
+import hashlib
+import logging
+import os
+import shutil
+from pathlib import Path
+from tempfile import NamedTemporaryFile
+from threading import Lock
+from typing import Dict, Iterable
+
+from django.conf import settings
+
+from markdown import markdown
+from mdx_math import MathExtension
+
+logger = logging.getLogger(__name__)
+
+#: Suffix of Markdown files
+MARKDOWN_SUFFIX = '.md'
+
+
+def render_markdown(file_path: Path) -> str:
+    """
+    :param file_path: Path to the Markdown file.
+    :type file_path: Path
+    :return: HTML rendered from the Markdown file (with LaTeX math support).
+    :rtype: str
+    """
+    with file_path.open('r', encoding='utf-8') as file:
+        return markdown(file.read(), extensions=[MathExtension()])
+
+
+class RenderedMarkupCache:
+    """
+    File-backed cache of HTML rendered from Markdown files (task descriptions). Rendered files are
+    stored in the ``RENDERED_DESCRIPTIONS_DIR`` directory, so they are shared by all worker
+    processes. Entries are keyed by the path, modification time and size of the source file -
+    a changed source file is rendered again, and every package instance has its own files.
+
+    Renders of files from one source directory (e.g. documents of one package instance) are
+    stored in a separate subdirectory, removed with :meth:`discard` when the sources are deleted.
+
+    Hits and misses are counted separately in every process.
+    """
+
+    #: Version of the rendering - changing it invalidates all stored renders (e.g. when markdown
+    #: extensions change)
+    VERSION = 1
+
+    def __init__(self, directory: Path = None) -> None:
+        """
+        :param directory: Directory in which rendered files are stored. Default is
+            ``settings.RENDERED_DESCRIPTIONS_DIR``.
+        :type directory: Path
+        """
+        self._directory = directory
+        self._lock = Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def directory(self) -> Path:
+        """
+        :return: Directory in which rendered files are stored.
+        :rtype: Path
+        """
+        return Path(self._directory or settings.RENDERED_DESCRIPTIONS_DIR)
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        :return: Hits, misses and hit rate of the cache in the current process.
+        :rtype: Dict[str, float]
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {'hits': self.hits,
+                    'misses': self.misses,
+                    'hit_rate': self.hits / total if total else 0.0}
+
+    def group_path(self, source_dir: Path) -> Path:
+        """
+        :param source_dir: Directory containing Markdown files.
+        :type source_dir: Path
+        :return: Directory in which renders of files from the source directory are stored.
+        :rtype: Path
+        """
+        key = str(source_dir.resolve())
+        return self.directory / hashlib.sha256(key.encode()).hexdigest()[:32]
+
+    def render_path(self, file_path: Path) -> Path:
+        """
+        :param file_path: Path to the Markdown file.
+        :type file_path: Path
+        :return: Path under which the rendered file is stored.
+        :rtype: Path
+        """
+        file_path = file_path.resolve()
+        stat = file_path.stat()
+        key = f'{self.VERSION}:{file_path}:{stat.st_mtime_ns}:{stat.st_size}'
+        file_name = f'{hashlib.sha256(key.encode()).hexdigest()}.html'
+        return self.group_path(file_path.parent) / file_name
+
+    def get(self, file_path: Path) -> str:
+        """
+        :param file_path: Path to the Markdown file.
+        :type file_path: Path
+        :return: HTML rendered from the file - read from the cache, or rendered and stored if it
+            is not cached.
+        :rtype: str
+        """
+        render_path = self.render_path(file_path)
+        try:
+            content = render_path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            content = None
+
+        with self._lock:
+            if content is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if content is None:
+            content = render_markdown(file_path)
+            self._store(render_path, content)
+        return content
+
+    def warm(self, file_paths: Iterable[Path]) -> int:
+        """
+        It renders and stores Markdown files which are not cached yet.
+
+        :param file_paths: Paths to files - files other than Markdown are skipped.
+        :type file_paths: Iterable[Path]
+        :return: Number of rendered files.
+        :rtype: int
+        """
+        rendered = 0
+        for file_path in file_paths:
+            if file_path.suffix != MARKDOWN_SUFFIX:
+                continue
+            try:
+                render_path = self.render_path(file_path)
+                if not render_path.is_file():
+                    self._store(render_path, render_markdown(file_path))
+                    rendered += 1
+            except (OSError, ValueError) as e:
+                logger.warning(f'Description {file_path} not rendered: {e}')
+        return rendered
+
+    def discard(self, source_dir: Path) -> None:
+        """
+        It removes all stored renders of files from the source directory (also of their previous
+        versions).
+
+        :param source_dir: Directory containing Markdown files.
+        :type source_dir: Path
+        """
+        shutil.rmtree(self.group_path(source_dir), ignore_errors=True)
+
+    def _store(self, render_path: Path, content: str) -> None:
+        """
+        It atomically writes a rendered file, so other processes never read a partial file.
+        Failures are logged - the rendered content is still used by the current request.
+
+        :param render_path: Path under which the rendered file is stored.
+        :type render_path: Path
+        :param content: Rendered HTML.
+        :type content: str
+        """
+        try:
+            render_path.parent.mkdir(parents=True, exist_ok=True)
+            with NamedTemporaryFile('w',
+                                    encoding='utf-8',
+                                    dir=render_path.parent,
+                                    suffix='.tmp',
+                                    delete=False) as tmp_file:
+                tmp_file.write(content)
+            os.replace(tmp_file.name, render_path)
+        except OSError as e:
+            logger.warning(f'Rendered description not stored in {render_path}: {e}')
+
+
+#: Rendered Markdown cache shared by all markup displayers.
+rendered_markup = RenderedMarkupCache()
@@ -0,0 +1,100 @@
+import hashlib
+import os
+import posixpath
+import shutil
+from pathlib import Path
+
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+from .blob_store import BlobStore
+from .misc import random_id
+
+
+@deconstructible
+class ShardedHashStorage(FileSystemStorage):
+    """
+    File system storage which names files by the sha256 digest of their content, in directories
+    sharded by the first bytes of the digest (``<upload_to>/ab/cd/abcd...<suffix>``). Files with
+    the same content and suffix are stored once, so stored files are shared and must not be
+    deleted or modified while they are used.
+    """
+
+    def _save(self, name: str, content) -> str:
+        """
+        It writes the content to a temporary file (computing its digest on the way), and moves the
+        file into place - or drops it if a file with the same content is already stored.
+
+        :param name: Name generated by the file field (only its directory and suffix are used).
+        :type name: str
+        :param content: Content of the file.
+        :type content: django.core.files.File
+        :return: Name of the stored file.
+        :rtype: str
+        """
+        directory = posixpath.dirname(name)
+        tmp_dir = Path(self.path(directory))
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = tmp_dir / f'.upload-{random_id()}'
+        sha = hashlib.sha256()
+        try:
+            with open(tmp_path, 'xb') as file:
+                for chunk in content.chunks():
+                    sha.update(chunk)
+                    file.write(chunk)
+            return self._place(tmp_path, directory, sha.hexdigest(), Path(name).suffix, move=True)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+    def store(self, path: Path, upload_to: str, move: bool = False) -> str:
+        """
+        It stores a file from the local file system. Moved files are renamed into place (copied
+        only if the storage is on another file system).
+
+        :param path: Path to the file.
+        :type path: Path
+        :param upload_to: Directory (relative to the storage location) in which the file is stored.
+        :type upload_to: str
+        :param move: If True, the file is moved into the storage (or deleted if the same content
+            is already stored) instead of being copied.
+        :type move: bool
+        :return: Name of the stored file (to be assigned to a file field).
+        :rtype: str
+        """
+        path = Path(path)
+        if not path.is_file():
+            raise FileNotFoundError(f'File {path} does not exist')
+        name = self._place(path, upload_to, BlobStore.digest(path), path.suffix, move=move)
+        if move:
+            path.unlink(missing_ok=True)
+        return name
+
+    def _place(self, path: Path, directory: str, digest: str, suffix: str, move: bool) -> str:
+        """
+        :param path: Path to the file to be placed in the storage.
+        :type path: Path
+        :param directory: Directory (relative to the storage location) of the stored file.
+        :type directory: str
+        :param digest: sha256 digest of the file content.
+        :type digest: str
+        :param suffix: Suffix of the stored file name.
+        :type suffix: str
+        :param move: If True, the file is moved, otherwise copied.
+        :type move: bool
+        :return: Name of the stored file.
+        :rtype: str
+        """
+        name = posixpath.join(directory, digest[:2], digest[2:4], f'{digest}{suffix}')
+        target = Path(self.path(name))
+        if target.exists():
+            return name
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if move:
+            shutil.move(path, target)
+        else:
+            tmp_path = target.with_name(f'.{target.name}.{random_id()}')
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, target)
+        if self.file_permissions_mode is not None:
+            os.chmod(target, self.file_permissions_mode)
+        return name
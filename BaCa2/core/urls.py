@@ -20,6 +20,7 @@ urlpatterns = [
     path('broker_api/', include('broker_api.urls')),
     path('main/', include('main.urls')),
     path('course/<int:course_id>/', include('course.urls')),
+    path('jobs/', include('jobs.urls')),
 
     # --------------------------------------- Auxiliary ---------------------------------------- #
     path('field_validation', FieldValidationView.as_view(), name='field-validation'),
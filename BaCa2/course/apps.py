@@ -2,6 +2,7 @@ import logging
 
 from django.apps import AppConfig
 from django.conf import settings
+from django.core.signals import request_finished
 from django.utils.translation import gettext_lazy as _
 
 from course.manager import resend_pending_submits
@@ -18,7 +19,10 @@ class CourseConfig(AppConfig):
         It migrates all the tables in the database when app is loaded.
         """
 
+        settings.DB_MANAGER.load_registry()
         settings.DB_MANAGER.migrate_all()
+        request_finished.connect(settings.COURSE_DB_POOL.close_idle,
+                                 dispatch_uid='course_db_pool_close_idle')
         try:
             resend_pending_submits()
         except Exception as e:
@@ -0,0 +1,135 @@
+"""Background jobs of the course app (see :py:mod:`jobs`)."""
+
+import logging
+from pathlib import Path
+from typing import Any, Dict, List
+
+from django.utils.translation import gettext_lazy as _
+
+from core.tools.mailer import TemplateMailer
+from course.models import Round, Task
+from jobs.models import Job
+from jobs.registry import job_handler
+from main.models import User
+from package.models import PackageInstance
+
+logger = logging.getLogger(__name__)
+
+
+@job_handler('course.rejudge_task')
+def rejudge_task(job: Job, task_id: int) -> Dict[str, Any]:
+    """
+    Updates all legacy submits of a task to its newest version (see
+    :py:meth:`course.models.Task.update_submits`).
+
+    :param job: The running job.
+    :type job: Job
+    :param task_id: ID of the rejudged task.
+    :type task_id: int
+
+    :return: Amount of updated submits.
+    :rtype: Dict[str, Any]
+    """
+    task = Task.objects.get(pk=task_id)
+    job.set_total(task.legacy_submits_amount, message=str(_('Rejudging submits')))
+    task.update_submits(on_update=job.advance)
+    return {'submits': job.progress}
+
+
+@job_handler('course.rescore_round')
+def rescore_round(job: Job, round_id: int) -> Dict[str, Any]:
+    """
+    Rescores submits of all tasks of a round, task by task.
+
+    :param job: The running job.
+    :type job: Job
+    :param round_id: ID of the round.
+    :type round_id: int
+
+    :return: Amount of rescored tasks.
+    :rtype: Dict[str, Any]
+    """
+    tasks = list(Round.objects.get(pk=round_id).tasks)
+    job.set_total(len(tasks), message=str(_('Rescoring tasks')))
+    for task in tasks:
+        task.rescore_submits()
+        job.advance()
+    return {'tasks': len(tasks)}
+
+
+@job_handler('course.reupload_task')
+def reupload_task(job: Job, task_id: int, zip_file: str, user_id: int) -> Dict[str, Any]:
+    """
+    Creates a new package instance from an uploaded zip file and updates the task to use it. The
+    task update commits the job - it can be cancelled only before the update. If the job fails or
+    is cancelled, the new package instance is deleted. The zip file is always deleted.
+
+    :param job: The running job.
+    :type job: Job
+    :param task_id: ID of the re-uploaded task.
+    :type task_id: int
+    :param zip_file: Path to the uploaded package.
+    :type zip_file: str
+    :param user_id: ID of the user who uploaded the package.
+    :type user_id: int
+
+    :return: ID of the new version of the task.
+    :rtype: Dict[str, Any]
+    """
+    task = Task.objects.get(pk=task_id)
+    new_package_instance = None
+    try:
+        job.set_total(2, message=str(_('Creating package')))
+        new_package_instance = PackageInstance.objects.create_package_instance_from_zip(
+            package_source=task.package_instance.package_source,
+            zip_file=Path(zip_file),
+            permissions_from_instance=task.package_instance,
+            creator=user_id,
+        )
+        # cancellation is checked for the last time - the job is done once the task is updated
+        job.advance(message=str(_('Updating task')))
+        new_task = Task.objects.update_task(task, new_package_instance=new_package_instance)
+    except Exception:
+        if new_package_instance is not None:
+            try:
+                new_package_instance.delete(delete_files=True)
+            except Exception as e:
+                logger.error(f'Cannot delete package instance {new_package_instance.pk} '
+                             f'created by {job}: {e}')
+        raise
+    finally:
+        Path(zip_file).unlink(missing_ok=True)
+    return {'task_id': new_task.pk}
+
+
+@job_handler('course.add_members')
+def add_members(job: Job, role_id: int, members: List[Dict[str, str]]) -> Dict[str, Any]:
+    """
+    Adds members to the course of the job, creating missing users, and notifies them by email.
+
+    :param job: The running job.
+    :type job: Job
+    :param role_id: ID of the role assigned to the members.
+    :type role_id: int
+    :param members: Members to be added, with keys ``email``, ``first_name`` and ``last_name``.
+    :type members: List[Dict[str, str]]
+
+    :return: Amount of added members.
+    :rtype: Dict[str, Any]
+    """
+    course = job.course
+    job.set_total(len(members), message=str(_('Adding members')))
+    users_to_add = []
+    for member in members:
+        users_to_add.append(User.objects.get_or_create(**member))
+        job.advance()
+    course.add_members(users_to_add, role_id, ignore_errors=True)
+
+    mailer = TemplateMailer(
+        mail_to=[user.email for user in users_to_add],
+        subject=_('You have been added to a course'),
+        template='add_to_course',
+        context={'course_name': course.name}
+    )
+    mailer.send()
+    return {'members': len(users_to_add)}
@@ -0,0 +1,57 @@
+from time import perf_counter
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test.utils import CaptureQueriesContext
+
+from course.models import Round
+from course.routing import InCourse, course_aliases
+from main.models import Course
+
+
+class Command(BaseCommand):
+    help = 'Measures the overhead of entering a course context'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--course', type=str, default=None,
+                            help='Short name of the course used (first course by default)')
+        parser.add_argument('--calls', type=int, default=2000,
+                            help='How many times every operation is repeated')
+
+    def handle(self, *args, **options):
+        course = Course.objects.filter(short_name=options['course']) if options['course'] \
+            else Course.objects.order_by('id')
+        course = course.first()
+        if course is None:
+            raise CommandError('No course to benchmark on.')
+        with InCourse(course):
+            round_ = Round.objects.first()
+        calls = options['calls']
+
+        def enter_uncached():
+            for _ in range(calls):
+                course_aliases.clear()
+                with InCourse(course.id):
+                    pass
+
+        def enter_cached():
+            for _ in range(calls):
+                with InCourse(course.id):
+                    pass
+
+        def wrapped_property():
+            for _ in range(calls):
+                round_.is_open
+
+        benchmarks = [('uncached', enter_uncached), ('cached', enter_cached)]
+        if round_ is not None:
+            benchmarks.append(('property', wrapped_property))
+
+        for name, func in benchmarks:
+            with CaptureQueriesContext(connections['default']) as queries:
+                start = perf_counter()
+                func()
+                elapsed = perf_counter() - start
+            self.stdout.write(f'{name:>8}: {elapsed / calls * 1e6:.1f} us/call, '
+                              f'{len(queries) / calls:.2f} queries/call')
+        course_aliases.add(course.id, course.short_name)
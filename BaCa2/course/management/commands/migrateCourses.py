@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Migrates all course databases to the latest version'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='How many course databases are migrated at the same time')
+
+    def handle(self, *args, **options):
+        report = settings.DB_MANAGER.migrate_all(workers=options['workers'])
+
+        for db_name, duration in report.migrated.items():
+            self.stdout.write(f'{db_name}: migrated in {duration:.2f} s')
+        for db_name, error in report.failed.items():
+            self.stderr.write(f'{db_name}: failed - {error}')
+        self.stdout.write(str(report))
+        if not report.ok:
+            raise CommandError(f'{len(report.failed)} course databases failed to migrate.')
@@ -1,6 +1,9 @@
 import logging
+from datetime import timedelta
 
 from django.conf import settings
+from django.db import IntegrityError
+from django.utils import timezone
 
 from core.choices import ResultStatus
 
@@ -28,12 +31,23 @@ def delete_course(course_name: str):
     settings.DB_MANAGER.delete_db(course_name)
 
 
-def resend_pending_submits(silent: bool = False) -> int:
+def resend_pending_submits(silent: bool = False, min_age: float = None) -> int:
     """
-    This function resends all pending submits to broker
+    This function sends pending submits which are not tracked by the broker api app. For every
+    course, ids of pending submits and ids of their broker submits are fetched with one query each
+    and the untracked ones are found as a set difference, so the work depends only on the amount
+    of pending submits. Untracked submits are put into the dispatch queue in bulk (or sent one by
+    one if the dispatch queue is disabled or the broker is mocked).
+
+    Only submits older than ``min_age`` are resent - younger ones may still be sent by the request
+    that created them. Submits tracked in the meantime (e.g. by another process running this
+    function) are skipped.
 
     :param silent: If True, the function will not log anything
     :type silent: bool
+    :param min_age: (In seconds) How old should pending submits be to be resent, defaults to
+        ``BROKER_RETRY_POLICY.untracked_min_age``
+    :type min_age: float
 
     :return: The number of resent submits
     :rtype: int
@@ -44,22 +58,41 @@ def resend_pending_submits(silent: bool = False) -> int:
     from .models import Submit
     from .routing import InCourse
 
+    if min_age is None:
+        min_age = settings.BROKER_RETRY_POLICY.untracked_min_age
+    created_before = timezone.now() - timedelta(seconds=min_age)
+    bulk_enqueue = settings.BROKER_DISPATCH_POLICY.enabled and not settings.MOCK_BROKER
     courses = Course.objects.filter(is_active=True)
     resent_submits = 0
     for course in courses:
         with InCourse(course):
-            broker_submits = BrokerSubmit.objects.filter(course=course)
-            broker_submit_ids = [broker_submit.submit_id for broker_submit in broker_submits]
-            submits = Submit.objects.filter(submit_status=ResultStatus.PND,
-                                            id__in=broker_submit_ids)
-            for submit in submits:
-                if not BrokerSubmit.objects.filter(course=course,
-                                                   submit_id=submit.pk,
-                                                   ).exists():
-                    submit.send()
-                    if not silent:
-                        logger.debug(f'Submit {submit.pk} resent to broker')
-                    resent_submits += 1
+            pending = dict(Submit.objects.filter(submit_status=ResultStatus.PND,
+                                                 submit_date__lte=created_before)
+                           .values_list('pk', 'task__package_instance_id'))
+            if not pending:
+                continue
+            tracked = set(BrokerSubmit.objects.filter(course=course, submit_id__in=pending)
+                          .values_list('submit_id', flat=True))
+            untracked = sorted(pending.keys() - tracked)
+            if not untracked:
+                continue
+
+            if bulk_enqueue:
+                BrokerSubmit.objects.enqueue_many(
+                    course,
+                    [(submit_id, pending[submit_id]) for submit_id in untracked]
+                )
+            else:
+                for submit in Submit.objects.filter(pk__in=untracked):
+                    try:
+                        submit.send()
+                    except (ValueError, IntegrityError):
+                        logger.debug(f'Submit {submit.pk} of course {course.short_name} is '
+                                     f'already tracked')
+            if not silent:
+                logger.debug(f'Submits {untracked} of course {course.short_name} '
+                             f'resent to broker')
+            resent_submits += len(untracked)
 
     if resent_submits > 0 and not silent:
         logger.info(f'Resent {resent_submits} submits to broker')
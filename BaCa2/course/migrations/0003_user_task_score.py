@@ -0,0 +1,75 @@
+# Generated by Django 5.0.14 on 2026-10-16 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def fill_user_task_scores(apps, schema_editor):
+    db_alias = schema_editor.connection.alias
+    if db_alias == 'default':
+        return
+
+    task_model = apps.get_model('course', 'Task')
+    submit_model = apps.get_model('course', 'Submit')
+    user_task_score_model = apps.get_model('course', 'UserTaskScore')
+
+    ordering = {'BEST': '-final_score', 'LAST': '-submit_date'}
+    new_scores = []
+    for task in task_model.objects.using(db_alias).select_related('round').all():
+        selected_submits = (
+            submit_model.objects.using(db_alias)
+            .filter(task=task)
+            .order_by('usr', ordering[task.round.score_selection_policy])
+            .distinct('usr')
+        )
+        new_scores.extend(
+            user_task_score_model(task=task,
+                                  usr=submit.usr,
+                                  submit=submit,
+                                  score=submit.final_score,
+                                  submit_status=submit.submit_status,
+                                  points=max(submit.final_score, 0) * task.points)
+            for submit in selected_submits
+        )
+    user_task_score_model.objects.using(db_alias).bulk_create(new_scores)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('course', '0002_change_submit_source_code'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskScore',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('usr', models.BigIntegerField()),
+                ('score', models.FloatField(default=-1)),
+                ('submit_status', models.CharField(
+                    choices=[('PND', 'Pending'), ('OK', 'Accepted'), ('ANS', 'Wrong answer'),
+                             ('TLE', 'Time limit exceeded'), ('RTE', 'Runtime error'),
+                             ('MEM', 'Memory exceeded'), ('CME', 'Compilation error'),
+                             ('RUL', 'Rule violation'), ('EXT', 'Unknown extension'),
+                             ('ITL', 'Internal timeout'), ('INT', 'Internal error')],
+                    default='PND', max_length=3)),
+                ('points', models.FloatField(default=0)),
+                ('submit', models.ForeignKey(null=True,
+                                             on_delete=django.db.models.deletion.SET_NULL,
+                                             to='course.submit')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                           to='course.task')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['usr', 'submit_status'],
+                                         name='user_task_score_usr_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='usertaskscore',
+            constraint=models.UniqueConstraint(fields=('task', 'usr'),
+                                               name='unique_user_task_score'),
+        ),
+        migrations.RunPython(fill_user_task_scores, migrations.RunPython.noop),
+    ]
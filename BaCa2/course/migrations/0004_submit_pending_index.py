@@ -0,0 +1,17 @@
+# Generated by Django 5.0.14 on 2026-10-16 18:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('course', '0003_user_task_score'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='submit',
+            index=models.Index(condition=models.Q(('submit_status', 'PND')), fields=['id'],
+                               name='submit_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 5.0.14 on 2026-10-16 18:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('course', '0004_submit_pending_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='test',
+            name='memory_limit',
+            field=models.BigIntegerField(default=None, null=True),
+        ),
+        migrations.AddField(
+            model_name='test',
+            name='time_limit',
+            field=models.FloatField(default=None, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-16 19:05
+
+from django.db import migrations, models
+
+import core.tools.storage
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('course', '0005_test_limits'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='submit',
+            name='source_code',
+            field=models.FileField(storage=core.tools.storage.ShardedHashStorage(),
+                                   upload_to='submits/'),
+        ),
+    ]
@@ -1,15 +1,16 @@
 from __future__ import annotations
 
 import inspect
+from collections import defaultdict
 from datetime import datetime
 from pathlib import Path
-from typing import TYPE_CHECKING, Any, List, Self
+from typing import TYPE_CHECKING, Any, Callable, Iterable, List, Self, Tuple
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.files import File
 from django.db import models, transaction
-from django.db.models import Count
+from django.db.models import Count, Sum
 from django.db.models.base import ModelBase
 from django.utils import timezone
 from django.utils.timezone import now
@@ -30,17 +31,17 @@ from core.choices import (
 )
 from core.exceptions import DataError
 from core.tools.falloff import FallOff
-from core.tools.files import MediaFileHandler
 from core.tools.misc import as_perc, str_to_datetime
+from core.tools.storage import ShardedHashStorage
 from course.routing import InCourse, OptionalInCourse
 from util.models_registry import ModelsRegistry
 
 if TYPE_CHECKING:
     from broker_api.models import BrokerSubmit
     from main.models import Course, User
-    from package.models import PackageInstance
+    from package.models import PackageInstance, PackageSetMetadata
 
-__all__ = ['Round', 'Task', 'TestSet', 'Test', 'Submit', 'Result']
+__all__ = ['Round', 'Task', 'TestSet', 'Test', 'Submit', 'Result', 'UserTaskScore']
 
 
 class ReadCourseMeta(ModelBase):
@@ -82,6 +83,25 @@ class ReadCourseMeta(ModelBase):
                     setattr(result_class, f'{attr_name}_id_', cls.field_decorator(dest_field_id))
         return result_class
 
+    def __call__(cls, *args, **kwargs):
+        """
+        Creates new instance and remembers the course it was created (or read) in. With the
+        ``schema`` course database backend all courses share one database alias, so the course
+        cannot be read from ``_state.db``.
+        """
+        instance = super().__call__(*args, **kwargs)
+        instance._state.course = settings.CURRENT_DB.get(None)
+        return instance
+
+    @staticmethod
+    def origin_db(instance) -> str:
+        """
+        :param instance: Course model instance.
+        :return: Database alias of the course the instance comes from.
+        :rtype: str
+        """
+        return getattr(instance._state, 'course', None) or instance._state.db
+
     @staticmethod
     def field_decorator(field):
         """
@@ -98,7 +118,7 @@ class ReadCourseMeta(ModelBase):
         def field_property(self):
             if InCourse.is_defined():
                 return field.__get__(self)
-            with InCourse(self._state.db):
+            with InCourse(ReadCourseMeta.origin_db(self)):
                 return field.__get__(self)
 
         return field_property
@@ -121,7 +141,7 @@ class ReadCourseMeta(ModelBase):
             if InCourse.is_defined():
                 result = original_method(self, *args, **kwargs)
             else:
-                with InCourse(self._state.db):
+                with InCourse(ReadCourseMeta.origin_db(self)):
                     result = original_method(self, *args, **kwargs)
             return result
 
@@ -129,7 +149,7 @@ class ReadCourseMeta(ModelBase):
             if InCourse.is_defined():
                 result = original_method.fget(self)
             else:
-                with InCourse(self._state.db):
+                with InCourse(ReadCourseMeta.origin_db(self)):
                     result = original_method.fget(self)
             return result
 
@@ -301,12 +321,18 @@ class Round(models.Model, metaclass=ReadCourseMeta):
             raise ValidationError("Round: Start date can't be later then deadline.")
 
     @transaction.atomic
-    def update(self, **kwargs) -> None:
+    def update(self, rescore: bool = True, **kwargs) -> bool:
         """
         It updates the round object.
 
+        :param rescore: If True, tasks of the round are rescored at once if the changes require it,
+            otherwise rescoring is left to the caller (e.g. to a background job) (optional)
+        :type rescore: bool
         :param kwargs: The new values for the round object.
         :type kwargs: dict
+
+        :return: True if the changes require rescoring tasks of the round.
+        :rtype: bool
         """
         rescore_planned = False
         for key, value in kwargs.items():
@@ -321,8 +347,9 @@ class Round(models.Model, metaclass=ReadCourseMeta):
         self.validate_dates(self.start_date, self.deadline_date, self.end_date)
         self.save()
 
-        if rescore_planned:
+        if rescore_planned and rescore:
             self.rescore_tasks()
+        return rescore_planned
 
     @transaction.atomic
     def delete(self, using: Any = None, keep_parents: bool = False):
@@ -387,8 +414,8 @@ class Round(models.Model, metaclass=ReadCourseMeta):
         """
         Rescores all tasks for the round.
         """
-        for task in self.tasks:
-            task.rescore_submits()
+        Submit.objects.rescore_submits(self.tasks,
+                                       submit_types=[SubmitType.STD, SubmitType.CTR])
 
     def __str__(self):
         return f'Round {self.pk}: {self.name}'
@@ -464,7 +491,7 @@ class TaskManager(models.Manager):
         judging_mode = ModelsRegistry.get_task_judging_mode(judging_mode)
 
         if points is None:
-            points = package_instance.package['points']
+            points = package_instance.metadata.points
         with OptionalInCourse(course):
             new_task = self.model(package_instance_id=package_instance.pk,
                                   task_name=task_name,
@@ -678,9 +705,8 @@ class Task(models.Model, metaclass=ReadCourseMeta):
 
         :return: None
         """
-        pkg = self.package_instance.package
-        for t_set in pkg.sets():
-            TestSet.objects.create_from_package(t_set, self)
+        for set_metadata in self.package_instance.metadata.test_sets:
+            TestSet.objects.create_from_metadata(set_metadata, self)
 
     @property
     def legacy_ancestors(self) -> List[Task]:
@@ -928,24 +954,29 @@ class Task(models.Model, metaclass=ReadCourseMeta):
             submits += task.legacy_submits_amount
         return submits
 
-    def update_submits(self):
+    def update_submits(self, on_update: Callable[[], None] = None):
         """
         Updates all submits for the task.
+
+        :param on_update: Function called after every updated submit, e.g. to report progress
+            (optional)
+        :type on_update: Callable[[], None]
         """
         if self.is_legacy:
             for submit in self.submits(add_control=True):
                 submit.update()
+                if on_update is not None:
+                    on_update()
 
         old_versions = Task.objects.filter(updated_task=self)
         for task in old_versions:
-            task.update_submits()
+            task.update_submits(on_update)
 
     def rescore_submits(self) -> None:
         """
-        Rescores all submits for the task.
+        Rescores all submits for the task and refreshes users' task scores.
         """
-        for submit in self.submits(add_control=True):
-            submit.score(rejudge=True)
+        Submit.objects.rescore_submits([self], submit_types=[SubmitType.STD, SubmitType.CTR])
 
     def has_user_ok_status(self, user: int | str | User) -> bool:
         """
@@ -1062,6 +1093,33 @@ class TestSetManager(models.Manager):
             Test.objects.create_from_package(test, test_set)
         return test_set
 
+    @transaction.atomic
+    def create_from_metadata(self, set_metadata: PackageSetMetadata, task: Task) -> TestSet:
+        """
+        It creates a new TestSet object (with its tests) from the package metadata stored in the
+        default database - the package itself is not loaded.
+
+        :param set_metadata: Metadata of the package test set.
+        :type set_metadata: PackageSetMetadata
+        :param task: The task that you want to associate the TestSet object with.
+        :type task: Task
+
+        :return: A new TestSet object.
+        :rtype: TestSet
+        """
+        test_set = self.model(short_name=set_metadata.name,
+                              weight=set_metadata.weight,
+                              task=task)
+        test_set.save()
+        Test.objects.bulk_create(
+            Test(short_name=test_metadata.name,
+                 test_set=test_set,
+                 time_limit=test_metadata.time_limit,
+                 memory_limit=test_metadata.memory_limit)
+            for test_metadata in set_metadata.tests.all()
+        )
+        return test_set
+
 
 class TestSet(models.Model, metaclass=ReadCourseMeta):
     """
@@ -1113,7 +1171,11 @@ class TestSet(models.Model, metaclass=ReadCourseMeta):
 class TestManager(models.Manager):
 
     @transaction.atomic
-    def create_test(self, short_name: str, test_set: TestSet) -> Test:
+    def create_test(self,
+                    short_name: str,
+                    test_set: TestSet,
+                    time_limit: float = None,
+                    memory_limit: int = None) -> Test:
         """
         It creates a new test object.
 
@@ -1121,12 +1183,20 @@ class TestManager(models.Manager):
         :type short_name: str
         :param test_set: The test set that you want to associate the test with.
         :type test_set: TestSet
+        :param time_limit: Time limit of the test in seconds, if None - read from the package when
+            first needed (optional)
+        :type time_limit: float
+        :param memory_limit: Memory limit of the test in bytes, if None - read from the package
+            when first needed (optional)
+        :type memory_limit: int
 
         :return: A new test object.
         :rtype: Test
         """
         new_test = self.model(short_name=short_name,
-                              test_set=test_set)
+                              test_set=test_set,
+                              time_limit=time_limit,
+                              memory_limit=memory_limit)
         new_test.save()
         return new_test
 
@@ -1156,7 +1226,37 @@ class TestManager(models.Manager):
         :return: A new Test object.
         :rtype: Test
         """
-        return self.create_test(short_name=test['name'], test_set=test_set)
+        return self.create_test(short_name=test['name'],
+                                test_set=test_set,
+                                time_limit=test['time_limit'],
+                                memory_limit=bytes_from_str(test['memory_limit']))
+
+    @transaction.atomic
+    def refresh_limits(self, task: int | Task) -> List[Test]:
+        """
+        It copies time and memory limits of all tests of a task from its package metadata to the
+        course database. Used for tests created before the limits were stored (tests created from
+        a package store them on creation).
+
+        :param task: The task whose tests should be refreshed.
+        :type task: int | Task
+
+        :return: List of refreshed tests.
+        :rtype: List[Test]
+        """
+        task = ModelsRegistry.get_task(task)
+        limits = {
+            (set_metadata.name, test_metadata.name): test_metadata
+            for set_metadata in task.package_instance.metadata.test_sets
+            for test_metadata in set_metadata.tests.all()
+        }
+        tests = list(self.filter(test_set__task=task).select_related('test_set'))
+        for test in tests:
+            test_metadata = limits[(test.test_set.short_name, test.short_name)]
+            test.time_limit = test_metadata.time_limit
+            test.memory_limit = test_metadata.memory_limit
+        self.bulk_update(tests, ['time_limit', 'memory_limit'], batch_size=500)
+        return tests
 
 
 class Test(models.Model, metaclass=ReadCourseMeta):
@@ -1169,6 +1269,10 @@ class Test(models.Model, metaclass=ReadCourseMeta):
     short_name = models.CharField(max_length=255)
     #: Foreign key to :py:class:`TestSet`.
     test_set = models.ForeignKey(TestSet, on_delete=models.CASCADE)
+    #: Time limit of the test in seconds, copied from the package.
+    time_limit = models.FloatField(null=True, default=None)
+    #: Memory limit of the test in bytes, copied from the package.
+    memory_limit = models.BigIntegerField(null=True, default=None)
 
     #: The manager for the Test model.
     objects = TestManager()
@@ -1196,6 +1300,22 @@ class Test(models.Model, metaclass=ReadCourseMeta):
             result.delete()
         super().delete(using, keep_parents)
 
+    @property
+    def limits(self) -> Tuple[float, int]:
+        """
+        Time and memory limits of the test, stored in the database. If the limits are not stored
+        yet, they are copied from the package for all tests of the task.
+
+        :return: Time limit in seconds and memory limit in bytes.
+        :rtype: Tuple[float, int]
+        """
+        if self.time_limit is None or self.memory_limit is None:
+            refreshed = {test.pk: test for test in
+                         Test.objects.refresh_limits(self.test_set.task_id)}
+            self.time_limit = refreshed[self.pk].time_limit
+            self.memory_limit = refreshed[self.pk].memory_limit
+        return self.time_limit, self.memory_limit
+
     @property
     def package_test(self) -> TestF:
         """
@@ -1219,6 +1339,7 @@ class SubmitManager(models.Manager):
                       error_msg: str = None,
                       retry: int = 0,
                       fixed_fall_off_factor: float = None,
+                      move_source: bool = False,
                       **kwargs) -> Submit:
         """
         It creates a new submit object.
@@ -1248,6 +1369,9 @@ class SubmitManager(models.Manager):
         :param fixed_fall_off_factor: The fixed fall-off factor of the submit, defaults to None
             (optional)
         :type fixed_fall_off_factor: float
+        :param move_source: If True and `source_code` is a path, the file is moved into the submit
+            storage instead of being copied (optional)
+        :type move_source: bool
 
         :return: A new submit object.
         :rtype: Submit
@@ -1258,40 +1382,274 @@ class SubmitManager(models.Manager):
         if fixed_fall_off_factor is None and submit_type == SubmitType.CTR:
             fixed_fall_off_factor = 1
         if isinstance(source_code, Path):
-            source_code_handler = MediaFileHandler(
-                path=source_code,
-                extension=source_code.suffix[1:],
-            )
-            with source_code_handler.file as source_code_file:
-                new_submit = self.model(submit_date=submit_date,
-                                        source_code=source_code_file,
-                                        task=task,
-                                        usr=user.pk,
-                                        final_score=final_score,
-                                        submit_type=submit_type,
-                                        submit_status=submit_status,
-                                        error_msg=error_msg,
-                                        retries=retry,
-                                        fixed_fall_off_factor=fixed_fall_off_factor,
-                                        )
-                new_submit.save()
-        else:
-            new_submit = self.model(submit_date=submit_date,
-                                    source_code=source_code,
-                                    task=task,
-                                    usr=user.pk,
-                                    final_score=final_score,
-                                    submit_type=submit_type,
-                                    submit_status=submit_status,
-                                    error_msg=error_msg,
-                                    retries=retry,
-                                    fixed_fall_off_factor=fixed_fall_off_factor,
-                                    )
-            new_submit.save()
+            source_code_field = self.model._meta.get_field('source_code')
+            source_code = source_code_field.storage.store(source_code,
+                                                          source_code_field.upload_to,
+                                                          move=move_source)
+        new_submit = self.model(submit_date=submit_date,
+                                source_code=source_code,
+                                task=task,
+                                usr=user.pk,
+                                final_score=final_score,
+                                submit_type=submit_type,
+                                submit_status=submit_status,
+                                error_msg=error_msg,
+                                retries=retry,
+                                fixed_fall_off_factor=fixed_fall_off_factor,
+                                )
+        new_submit.save()
+        UserTaskScore.objects.refresh_scores(task, user)
         if auto_send:
             new_submit.send(**kwargs)
         return new_submit
 
+    @transaction.atomic
+    def rescore_submits(self,
+                        tasks: List[Task],
+                        submit_types: List[SubmitType] = None) -> List[Submit]:
+        """
+        It rescores all submits of given tasks at once. Gives the same results as calling
+        :py:meth:`Submit.score` with ``rejudge=True`` for every submit, but results are counted
+        with grouped aggregate queries, test set weights are read once and changed submits are
+        saved with a single ``bulk_update``. Users' task scores are refreshed afterwards.
+
+        :param tasks: The tasks whose submits should be rescored.
+        :type tasks: List[Task]
+        :param submit_types: Types of submits to be rescored, if None - all submits are rescored
+            (optional)
+        :type submit_types: List[SubmitType]
+
+        :return: List of submits with changed score.
+        :rtype: List[Submit]
+
+        :raise DataError: if there is more results than tests
+        :raise NotImplementedError: if selected judging mode is not implemented
+        """
+        tasks = {task.pk: task for task in tasks}
+        submits = self.filter(task_id__in=tasks.keys())
+        results = Result.objects.filter(submit__task_id__in=tasks.keys())
+        if submit_types is not None:
+            submits = submits.filter(submit_type__in=submit_types)
+            results = results.filter(submit__submit_type__in=submit_types)
+
+        weights = dict(
+            TestSet.objects.filter(task_id__in=tasks.keys()).values_list('pk', 'weight')
+        )
+
+        # Amount of tests in each test set, grouped by tasks.
+        tests_amounts = defaultdict(dict)
+        for row in (Test.objects
+                    .filter(test_set__task_id__in=tasks.keys())
+                    .values('test_set__task', 'test_set')
+                    .annotate(amount=Count('*'))):
+            tests_amounts[row['test_set__task']][row['test_set']] = row['amount']
+
+        # Amount of different statuses for every submit, grouped by test sets.
+        statuses = defaultdict(lambda: defaultdict(dict))
+        for row in (results
+                    .values('submit', 'test__test_set', 'status')
+                    .annotate(amount=Count('*'))):
+            statuses[row['submit']][row['test__test_set']][row['status']] = row['amount']
+
+        fall_offs = {task_id: task.get_fall_off() for task_id, task in tasks.items()}
+
+        changed_submits = []
+        for submit in submits:
+            if self._score_from_aggregates(submit,
+                                           tasks[submit.task_id],
+                                           tests_amounts[submit.task_id],
+                                           statuses[submit.pk],
+                                           weights,
+                                           fall_offs[submit.task_id]):
+                changed_submits.append(submit)
+
+        self.bulk_update(changed_submits, ['final_score', 'submit_status'], batch_size=500)
+        for task in tasks.values():
+            UserTaskScore.objects.refresh_scores(task)
+        return changed_submits
+
+    @staticmethod
+    def _score_from_aggregates(submit: Submit,
+                               task: Task,
+                               tests_amounts: dict,
+                               statuses: dict,
+                               weights: dict,
+                               fall_off: FallOff) -> bool:
+        """
+        Calculates the score of a submit from pre-aggregated results, following the rules of
+        :py:meth:`Submit.score` with ``rejudge=True``. Used by :py:meth:`rescore_submits`.
+
+        :param submit: The submit to be scored (changed in place).
+        :type submit: Submit
+        :param task: The task of the submit.
+        :type task: Task
+        :param tests_amounts: Amount of tests in each test set of the task.
+        :type tests_amounts: dict
+        :param statuses: Amount of results with each status, grouped by test sets.
+        :type statuses: dict
+        :param weights: Weights of test sets.
+        :type weights: dict
+        :param fall_off: Fall-off of the task.
+        :type fall_off: FallOff
+
+        :return: True if the submit should be saved, False otherwise.
+        :rtype: bool
+        """
+        submit_status = ResultStatus[submit.submit_status]
+        if submit_status in EMPTY_FINAL_STATUSES:
+            submit.final_score = 0
+            return True
+
+        results_amount = sum(sum(s.values()) for s in statuses.values())
+        if submit_status == ResultStatus.PND and results_amount < sum(tests_amounts.values()):
+            submit.final_score = -1
+            submit.submit_status = ResultStatus.PND
+            return True
+
+        if not tests_amounts:
+            return False
+
+        worst_status = ResultStatus.PND
+        final_score = 0
+        final_weight = 0
+        for test_set, max_amount in tests_amounts.items():
+            set_statuses = statuses.get(test_set, {})
+            amount = sum(set_statuses.values())
+            if amount > max_amount:
+                raise DataError(f'Submit ({submit}): More test results, then test assigned to task')
+            if amount < max_amount:
+                return False
+
+            if task.judging_mode == TaskJudgingMode.LIN:
+                set_score = set_statuses.get('OK', 0) / amount
+            elif task.judging_mode == TaskJudgingMode.UNA:
+                set_score = float(set_statuses.get('OK', 0) == amount)
+            else:
+                raise NotImplementedError(
+                    f'Submit ({submit}): Task {task.pk} has judging mode ' +
+                    'which is not implemented.')
+
+            for status in set_statuses.keys():
+                status = ResultStatus[status]
+                if ResultStatus.compare(status, worst_status) > 0:
+                    worst_status = status
+
+            final_weight += weights[test_set]
+            final_score += set_score * weights[test_set]
+
+        submit.final_score = round(final_score / final_weight, 6)
+        if submit.fixed_fall_off_factor is not None:
+            submit.final_score *= submit.fixed_fall_off_factor
+        else:
+            submit.final_score *= fall_off.get_factor(submit.submit_date)
+        submit.submit_status = worst_status
+        return True
+
+    def get_submits_data(self,
+                         submits: Iterable[Submit],
+                         show_user: bool = True,
+                         add_round_task_name: bool = False,
+                         add_summary_score: bool = False,
+                         add_falloff_info: bool = False) -> List[dict]:
+        """
+        Serializes many submits at once. Gives the same results as calling
+        :py:meth:`Submit.get_data` for every submit, but tasks (with their rounds) are read with
+        a single query, submitters are read with a single query to the default database and
+        stored scores are reused - submits are scored only if their score is not calculated yet.
+
+        :param submits: The submits to be serialized.
+        :type submits: Iterable[Submit]
+        :param show_user: If True, first and last name of the submitter are included.
+        :type show_user: bool
+        :param add_round_task_name: If True, the name of the round and task is included.
+        :type add_round_task_name: bool
+        :param add_summary_score: If True, the summary score (points and percent) is included.
+        :type add_summary_score: bool
+        :param add_falloff_info: If True, the fall-off factor of the submit is included.
+        :type add_falloff_info: bool
+
+        :return: List of submits data, in the order of given submits.
+        :rtype: List[dict]
+
+        :raise User.DoesNotExist: if the submitter of any submit does not exist
+        """
+        from main.models import User
+
+        submits = list(submits)
+        tasks = Task.objects.select_related('round').in_bulk({s.task_id for s in submits})
+        users = {}
+        if show_user:
+            users = {
+                pk: (first_name, last_name) for pk, first_name, last_name in
+                User.objects.filter(pk__in={s.usr for s in submits})
+                .values_list('pk', 'first_name', 'last_name')
+            }
+        fall_offs = {}
+
+        data = []
+        for submit in submits:
+            submit.task = task = tasks[submit.task_id]
+            score = submit.final_score if submit.final_score >= 0 else submit.score()
+            res = {
+                'id': submit.pk,
+                'submit_date': submit.submit_date,
+                'source_code': submit.source_code.path,
+                'task_name': task.task_name,
+                'task_score': round(task.points * score, 2) if score > -1 else '---',
+                'final_score': submit.format_score(score),
+                'submit_status': submit.formatted_submit_status,
+                '_submit_status': submit.submit_status,
+                'is_legacy': task.is_legacy,
+            }
+            if show_user:
+                if submit.usr not in users:
+                    raise User.DoesNotExist(f'User {submit.usr} of submit {submit.pk} does not '
+                                            f'exist.')
+                first_name, last_name = users[submit.usr]
+                res |= {'user_first_name': first_name if first_name else '---',
+                        'user_last_name': last_name if last_name else '---'}
+            if add_round_task_name:
+                res |= {'round_task_name': f'{task.round.name}: {task.task_name}'}
+            if add_summary_score:
+                res |= {'summary_score': submit.format_score(score, 1, True, task.points)}
+            if add_falloff_info:
+                if submit.fixed_fall_off_factor is not None:
+                    fall_off_factor = submit.fixed_fall_off_factor
+                else:
+                    if task.pk not in fall_offs:
+                        fall_offs[task.pk] = task.get_fall_off()
+                    fall_off_factor = fall_offs[task.pk].get_factor(submit.submit_date)
+                res |= {'fall_off_factor': submit.format_score(fall_off_factor)}
+            data.append(res)
+        return data
+
+    @transaction.atomic
+    def end_with_errors(self,
+                        submits: List[int],
+                        error_type: ResultStatus,
+                        error_msg: str) -> int:
+        """
+        It ends many submits with an error using a single update, then refreshes the
+        materialized task scores of affected tasks once per task. Bulk counterpart of
+        :py:meth:`Submit.end_with_error`.
+
+        :param submits: Ids of the submits to be ended.
+        :type submits: List[int]
+        :param error_type: The type of the error.
+        :type error_type: ResultStatus
+        :param error_msg: The message of the error.
+        :type error_msg: str
+
+        :return: Amount of ended submits.
+        :rtype: int
+        """
+        submits = self.filter(pk__in=submits)
+        task_ids = set(submits.values_list('task_id', flat=True))
+        updated = submits.update(submit_status=error_type, error_msg=error_msg, final_score=0)
+        for task_id in task_ids:
+            UserTaskScore.objects.refresh_scores(task_id)
+        return updated
+
     @transaction.atomic
     def delete_submit(self, submit: int | Submit, course: str | int | Course = None) -> None:
         """
@@ -1332,7 +1690,12 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
     #                                    allow_files=True,
     #                                    null=True,
     #                                    max_length=2047)
-    source_code = models.FileField(upload_to='submits/', null=False, blank=False)
+    #: Source code files are stored once per content, in directories sharded by content digest -
+    #: resent and updated submits share the file of the original submit.
+    source_code = models.FileField(upload_to='submits/',
+                                   storage=ShardedHashStorage(),
+                                   null=False,
+                                   blank=False)
     #: :py:class:`Task` model, to which submit is assigned.
     task = models.ForeignKey(Task, on_delete=models.CASCADE)
     #: Pseudo-foreign key to :py:class:`main.models.User` model (user), who submitted to the task.
@@ -1370,6 +1733,11 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
             ('view_used_time', _('Can view used time')),
             ('rejudge_submit', _('Can rejudge submit')),
         ]
+        indexes = [
+            models.Index(fields=['id'],
+                         condition=models.Q(submit_status=ResultStatus.PND),
+                         name='submit_pending_idx'),
+        ]
 
     class BasicAction(ModelAction):
         """
@@ -1399,21 +1767,24 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
     def send(self, **kwargs) -> BrokerSubmit | None:
         """
         It sends the submit to the broker. If the broker is mocked, it will run the mock broker and
-        return None.
+        return None. If asynchronous dispatch is enabled (``BROKER_DISPATCH_POLICY.enabled``),
+        the submit is only put into the dispatch queue and sent later by the dispatch worker.
 
         :return: A new BrokerSubmit object or None if the broker is mocked.
         :rtype: BrokerSubmit | None
         """
         from broker_api.models import BrokerSubmit
+        course = ModelsRegistry.get_course(ReadCourseMeta.origin_db(self))
         if settings.MOCK_BROKER:
             from broker_api.mock import BrokerMock
-            mock = BrokerMock(ModelsRegistry.get_course(self._state.db), self, **kwargs)
+            mock = BrokerMock(course, self, **kwargs)
             mock.run()
             return None
 
-        return BrokerSubmit.send(ModelsRegistry.get_course(self._state.db),
-                                 self.id,
-                                 self.task.package_instance)
+        if settings.BROKER_DISPATCH_POLICY.enabled:
+            return BrokerSubmit.objects.enqueue(course, self.id, self.task.package_instance)
+
+        return BrokerSubmit.send(course, self.id, self.task.package_instance)
 
     def resend(self, limit_retries: int = -1) -> Submit:
         """
@@ -1430,7 +1801,7 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
         self.submit_type = SubmitType.HID
         self.save()
 
-        new_submit = self.objects.create_submit(
+        new_submit = Submit.objects.create_submit(
             submit_date=self.submit_date,
             source_code=self.source_code,
             task=self.task,
@@ -1468,6 +1839,7 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
         for result in self.results:
             result.delete()
         super().delete(using, keep_parents)
+        UserTaskScore.objects.refresh_scores(self.task, self.usr)
 
     @property
     def user(self) -> User:
@@ -1507,6 +1879,7 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
 
         self.final_score = 0
         self.save()
+        UserTaskScore.objects.refresh_scores(self.task, self.usr)
 
     @property
     def fall_off_factor(self) -> float:
@@ -1519,19 +1892,39 @@ class Submit(models.Model, metaclass=ReadCourseMeta):
         return self.task.get_fall_off().get_factor(self.submit_date)
 
     @transaction.atomic
-    def score(self, rejudge: bool = False) -> float:
+    def score(self, rejudge: bool = False, refresh_task_score: bool = True) -> float:
         """
-        It calculates the score of *self* submit.
+        It calculates the score of *self* submit. If the score or status of the submit changes,
+        the materialized :py:class:`UserTaskScore` of the submitter is refreshed.
 
         :param rejudge: If True, the score will be recalculated even if it was already calculated
             before, defaults to False (optional)
         :type rejudge: bool
+        :param refresh_task_score: If True, the user's task score will be refreshed after the
+            score changes, defaults to True (optional)
+        :type refresh_task_score: bool
 
         :return: The score of the submit.
 
         :raise DataError: if there is more results than tests
         :raise NotImplementedError: if selected judging mode is not implemented
         """
+        previous_state = (self.final_score, self.submit_status)
+        score = self._calculate_score(rejudge)
+        if refresh_task_score and previous_state != (self.final_score, self.submit_status):
+            UserTaskScore.objects.refresh_scores(self.task, self.usr)
+        return score
+
+    def _calculate_score(self, rejudge: bool = False) -> float:
+        """
+        Calculates and saves the score of *self* submit. Used by :py:meth:`score`.
+
+        :param rejudge: If True, the score will be recalculated even if it was already calculated
+            before, defaults to False (optional)
+        :type rejudge: bool
+
+        :return: The score of the submit.
+        """
         submit_status = ResultStatus[self.submit_status]
         if rejudge:
             if submit_status in EMPTY_FINAL_STATUSES:
@@ -1720,7 +2113,9 @@ class ResultManager(models.Manager):
                        results: BrokerToBaca,
                        auto_score: bool = True) -> List[Result]:
         """
-        It unpacks the results from the BrokerToBaca object and saves them to the database.
+        It unpacks the results from the BrokerToBaca object and saves them to the database. Tests
+        of the submit's task are fetched with a single query and all results are saved with one
+        ``bulk_create``.
 
         :param submit: The submit id that you want to unpack the results for.
         :type submit: int | Submit
@@ -1730,30 +2125,50 @@ class ResultManager(models.Manager):
             defaults to True (optional)
         :type auto_score: bool
 
-        :return: None
+        :return: List of created results.
+        :rtype: List[Result]
+
+        :raise DataError: If results contain test sets or tests which don't exist in the
+            submit's task.
         """
         submit = ModelsRegistry.get_submit(submit)
-        results_list = []
+        tests = {
+            (test.test_set.short_name, test.short_name): test
+            for test in Test.objects.filter(test_set__task_id=submit.task_id)
+            .select_related('test_set')
+        }
+        set_names = {set_name for set_name, _ in tests.keys()}
 
+        results_list = []
+        unknown_sets = []
+        unknown_tests = []
         for set_name, set_result in results.results.items():
-            test_set = TestSet.objects.get(task=submit.task, short_name=set_name)
+            if set_name not in set_names:
+                unknown_sets.append(set_name)
+                continue
             for test_name, test_result in set_result.tests.items():
-                test = Test.objects.get(test_set=test_set, short_name=test_name)
+                test = tests.get((set_name, test_name))
+                if test is None:
+                    unknown_tests.append(f'{set_name}/{test_name}')
+                    continue
                 logs = test_result.logs
-                compile_log = logs.get('compile_log')
-                checker_log = logs.get('checker_log')
-                result = self.model(
+                results_list.append(self.model(
                     test=test,
                     submit=submit,
                     status=test_result.status,
                     time_real=test_result.time_real,
                     time_cpu=test_result.time_cpu,
                     runtime_memory=test_result.runtime_memory,
-                    compile_log=compile_log,
-                    checker_log=checker_log
-                )
-                result.save()
-                results_list.append(result)
+                    compile_log=logs.get('compile_log'),
+                    checker_log=logs.get('checker_log')
+                ))
+
+        if unknown_sets or unknown_tests:
+            raise DataError(f"Submit ({submit.pk}): Results don't match task {submit.task_id} - "
+                            f'unknown test sets: {unknown_sets or "---"}; '
+                            f'unknown tests: {unknown_tests or "---"}')
+
+        results_list = self.bulk_create(results_list)
         if auto_score:
             submit.score(rejudge=True)
         return results_list
@@ -1895,16 +2310,16 @@ class Result(models.Model, metaclass=ReadCourseMeta):
                 res['f_time_real'] = self.status
                 res['f_time_cpu'] = self.status
             if add_limits:
-                time_limit = round(self.test.package_test['time_limit'], 3)
-                res['f_time_real'] += f' / {time_limit} s'
-                res['f_time_cpu'] += f' / {time_limit} s'
+                time_limit = round(self.test.limits[0], 3)
+                res['f_time_real'] += f' / {time_limit:g} s'
+                res['f_time_cpu'] += f' / {time_limit:g} s'
         if include_memory and format_memory and self.runtime_memory:
             res['f_runtime_memory'] = f'{bytes_to_str(self.runtime_memory)}'
             if self.status in HALF_EMPTY_FINAL_STATUSES:
                 res['f_runtime_memory'] = self.status
             if add_limits:
-                memory_limit = self.test.package_test['memory_limit']
-                res['f_runtime_memory'] += f' / {bytes_to_str(bytes_from_str(memory_limit))}'
+                memory_limit = self.test.limits[1]
+                res['f_runtime_memory'] += f' / {bytes_to_str(memory_limit)}'
         if translate_status:
             res['f_status'] = f'{self.status} ({ResultStatus[self.status].label})'
 
@@ -1924,3 +2339,127 @@ class Result(models.Model, metaclass=ReadCourseMeta):
             res['user_answer'] = ''
 
         return res
+
+
+class UserTaskScoreManager(models.Manager):
+
+    @transaction.atomic
+    def refresh_scores(self,
+                       task: int | Task,
+                       user: str | int | User = None) -> List[UserTaskScore]:
+        """
+        It recalculates the materialized task scores of users. For every user, the submit selected
+        by the score selection policy of the task's round is stored together with its score,
+        status and points. Submit scores are not recalculated - values already saved in submits
+        are used.
+
+        :param task: The task for which the scores should be refreshed.
+        :type task: int | Task
+        :param user: The user whose score should be refreshed, if None - scores of all users who
+            submitted to the task are refreshed (optional)
+        :type user: str | int | User
+
+        :return: List of refreshed task scores.
+        :rtype: List[UserTaskScore]
+        """
+        task = ModelsRegistry.get_task(task)
+        submits = Submit.objects.filter(task=task)
+        task_scores = self.filter(task=task)
+        if user is not None:
+            user_id = ModelsRegistry.get_user_id(user)
+            submits = submits.filter(usr=user_id)
+            task_scores = task_scores.filter(usr=user_id)
+
+        ssp = task.round.score_selection_policy
+        if ssp == ScoreSelectionPolicy.BEST:
+            ordering = '-final_score'
+        elif ssp == ScoreSelectionPolicy.LAST:
+            ordering = '-submit_date'
+        else:
+            raise NotImplementedError(f'Task ({task}): Score selection policy {ssp} '
+                                      f'is not implemented.')
+
+        selected_submits = submits.order_by('usr', ordering).distinct('usr')
+        new_scores = [
+            self.model(task=task,
+                       usr=submit.usr,
+                       submit=submit,
+                       score=submit.final_score,
+                       submit_status=submit.submit_status,
+                       points=max(submit.final_score, 0) * task.points)
+            for submit in selected_submits
+        ]
+
+        task_scores.exclude(usr__in=[score.usr for score in new_scores]).delete()
+        return self.bulk_create(new_scores,
+                                update_conflicts=True,
+                                unique_fields=['task', 'usr'],
+                                update_fields=['submit', 'score', 'submit_status', 'points'])
+
+    def user_points(self, user: str | int | User) -> float:
+        """
+        :param user: The user whose points should be summed.
+        :type user: str | int | User
+
+        :return: Sum of points gained by the user for all non-legacy tasks.
+        :rtype: float
+        """
+        user_id = ModelsRegistry.get_user_id(user)
+        return self.filter(
+            usr=user_id,
+            task__is_legacy=False
+        ).aggregate(Sum('points'))['points__sum'] or 0
+
+    def user_cleared_tasks(self, user: str | int | User, statuses: List[ResultStatus]) -> int:
+        """
+        :param user: The user whose cleared tasks should be counted.
+        :type user: str | int | User
+        :param statuses: Submit statuses which are considered as task clearance.
+        :type statuses: List[ResultStatus]
+
+        :return: Amount of non-legacy tasks, for which the scored submit of the user has one of
+            given statuses.
+        :rtype: int
+        """
+        user_id = ModelsRegistry.get_user_id(user)
+        return self.filter(usr=user_id,
+                           task__is_legacy=False,
+                           submit_status__in=statuses).count()
+
+
+class UserTaskScore(models.Model, metaclass=ReadCourseMeta):
+    """
+    Materialized score of a user for a task. Holds the submit selected by the score selection
+    policy of the task's round, so course summaries don't have to rescore submits on every read.
+    Rows are refreshed by :py:class:`UserTaskScoreManager` whenever a submit score changes.
+    """
+
+    #: :py:class:`Task` which is scored.
+    task = models.ForeignKey(Task, on_delete=models.CASCADE)
+    #: Pseudo-foreign key to :py:class:`main.models.User` model (user), who submitted to the task.
+    usr = models.BigIntegerField()
+    #: :py:class:`Submit` selected as the user's task score source.
+    submit = models.ForeignKey(Submit, on_delete=models.SET_NULL, null=True)
+    #: Final score of the selected submit (``-1`` if it is still pending).
+    score = models.FloatField(default=-1)
+    #: Status of the selected submit.
+    submit_status = models.CharField(max_length=3,
+                                     choices=ResultStatus.choices,
+                                     default=ResultStatus.PND)
+    #: Points gained by the user for the task.
+    points = models.FloatField(default=0)
+
+    #: The manager for the UserTaskScore model.
+    objects = UserTaskScoreManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['task', 'usr'], name='unique_user_task_score'),
+        ]
+        indexes = [
+            models.Index(fields=['usr', 'submit_status'], name='user_task_score_usr_idx'),
+        ]
+
+    def __str__(self):
+        return f'UserTaskScore {self.pk}: User: {self.usr}; Task: {self.task_id}; ' \
+               f'Score: {self.score}'
@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Dict
 
 from django.conf import settings
 
@@ -61,7 +61,8 @@ class ContextCourseRouter(SimpleCourseRouter):
     def _get_context(model, **hints):
         """
         It returns the name of the database to use for a given model. It gets it from context
-        manager.
+        manager. With the ``schema`` course database backend, all courses share one database
+        alias (see :py:meth:`core.db.manager.DBManager.runtime_alias`).
 
         :param model: The model class that is being queried
         :return: The name of the database to use.
@@ -76,14 +77,12 @@ class ContextCourseRouter(SimpleCourseRouter):
         except LookupError:
             raise RoutingError(
                 "No DB chosen. Remember to use 'with InCourse', while accessing course instance.")
-        if db not in settings.DATABASES.keys():
-            settings.DB_MANAGER.parse_cache()
-            if db not in settings.DATABASES.keys():
-                raise RoutingError(
-                    f"Can't access course DB {db}. Check the name in 'with InCourse'.\n"
-                    f'Available DBs: {list(settings.DATABASES.keys())}')
+        if not settings.DB_MANAGER.db_exists(db):
+            raise RoutingError(
+                f"Can't access course DB {db}. Check the name in 'with InCourse'.\n"
+                f'Available DBs: {list(settings.DATABASES.keys())}')
 
-        return db
+        return settings.DB_MANAGER.runtime_alias(db)
 
     def db_for_read(self, model, **hints):
         """
@@ -104,6 +103,100 @@ class ContextCourseRouter(SimpleCourseRouter):
         return self._get_context(model, **hints)
 
 
+class CourseAliasCache:
+    """
+    In-process cache of course database aliases (course short names), keyed by course short name
+    and id. It lets :py:class:`InCourse` enter a course context without querying the ``Course``
+    table. Entries are added on course creation or on the first lookup, and removed on course
+    deletion (see :py:meth:`main.models.CourseManager.create_course` and
+    :py:meth:`main.models.Course.delete`).
+    """
+
+    def __init__(self):
+        self._aliases: Dict[str | int, str] = {}
+        self._ids: Dict[str, int] = {}
+
+    def add(self, course_id: int, short_name: str) -> None:
+        """
+        It caches the alias of the course.
+
+        :param course_id: Id of the course.
+        :type course_id: int
+        :param short_name: Short name of the course (its database alias).
+        :type short_name: str
+        """
+        self._aliases[course_id] = short_name
+        self._aliases[short_name] = short_name
+        self._ids[short_name] = course_id
+
+    def invalidate(self, short_name: str) -> None:
+        """
+        It removes the course from the cache.
+
+        :param short_name: Short name of the course.
+        :type short_name: str
+        """
+        for key, alias in list(self._aliases.items()):
+            if alias == short_name:
+                self._aliases.pop(key, None)
+        self._ids.pop(short_name, None)
+
+    def clear(self) -> None:
+        """
+        It removes all courses from the cache.
+        """
+        self._aliases.clear()
+        self._ids.clear()
+
+    def resolve(self, course: int | str | Course) -> str:
+        """
+        Returns the database alias of the course. Only courses not cached yet are looked up in the
+        database.
+
+        :param course: Course model instance, its short name or id.
+        :type course: int | str | Course
+
+        :return: Database alias of the course.
+        :rtype: str
+        """
+        if not isinstance(course, (str, int)):
+            return course.short_name
+        alias = self._aliases.get(course)
+        if alias is None:
+            from util.models_registry import ModelsRegistry
+
+            course = ModelsRegistry.get_course(course)
+            self.add(course.id, course.short_name)
+            alias = course.short_name
+        return alias
+
+    def resolve_id(self, course: int | str | Course) -> int:
+        """
+        Returns the id of the course. Only courses not cached yet are looked up in the database.
+
+        :param course: Course model instance, its short name or id.
+        :type course: int | str | Course
+
+        :return: Id of the course.
+        :rtype: int
+        """
+        if isinstance(course, int):
+            return course
+        if not isinstance(course, str):
+            return course.id
+        course_id = self._ids.get(course)
+        if course_id is None:
+            from util.models_registry import ModelsRegistry
+
+            course = ModelsRegistry.get_course(course)
+            self.add(course.id, course.short_name)
+            course_id = course.id
+        return course_id
+
+
+course_aliases = CourseAliasCache()
+
+
 class InCourse:
     """
     It allows you to give the context database. Everything called inside this context manager
@@ -122,15 +215,11 @@ class InCourse:
     """
 
     def __init__(self, course: int | str | Course):
-        from util.models_registry import ModelsRegistry
-
-        # if isinstance(course, str):
-        #     self.db = course
-        # else:
-        self.db = ModelsRegistry.get_course(course).short_name
+        self.db = course_aliases.resolve(course)
 
     def __enter__(self):
         self.token = settings.CURRENT_DB.set(self.db)
+        settings.COURSE_DB_POOL.touch(settings.DB_MANAGER.runtime_alias(self.db))
 
     def __exit__(self, *args):
         settings.CURRENT_DB.reset(self.token)
@@ -1,18 +1,37 @@
 import datetime as dt_raw
+import hashlib
+import json
+import tempfile
 from datetime import datetime, timedelta
+from pathlib import Path
 from random import choice, randint
+from unittest.mock import PropertyMock, patch
+from urllib.parse import urlencode
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.files.base import ContentFile
+from django.db import connections, transaction
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import timezone
 
-from core.choices import ResultStatus
-from main.models import Course, User
+from baca2PackageManager.broker_communication import BrokerToBaca, SetResult, TestResult
+from baca2PackageManager.tools import bytes_from_str, bytes_to_str
+from core.choices import ResultStatus, TaskJudgingMode
+from core.db.manager import DBManager
+from core.db.pool import CourseConnectionPool
+from core.exceptions import DataError, RoutingError
+from main.models import Course, CourseDatabase, User
 from package.models import PackageInstance
 from parameterized import parameterized
+from util import encode_dict_to_url
+from util.responses import BaCa2JsonResponse
 
 from .models import *
-from .routing import InCourse, OptionalInCourse
+from .models import ReadCourseMeta
+from .routing import InCourse, OptionalInCourse, course_aliases
+from .views import ResultModelView, SubmitModelView
 
 
 def create_rounds(course, amount):
@@ -102,6 +121,7 @@ class RoundTest(TestCase):
         pkg_src = cls.pkg.package_source
         cls.pkg.delete()
         pkg_src.delete()
+        super().tearDownClass()
 
     def tearDown(self):
         with InCourse(self.course):
@@ -245,6 +265,7 @@ class TaskTestMain(TestCase):
     @classmethod
     def tearDownClass(cls):
         Course.objects.delete_course(cls.course)
+        super().tearDownClass()
 
     def tearDown(self):
         with InCourse(self.course):
@@ -318,6 +339,7 @@ class TestTaskWithResults(TestCase):
     def tearDownClass(cls):
         Course.objects.delete_course(cls.course)
         cls.user.delete()
+        super().tearDownClass()
 
     def tearDown(self):
         with InCourse(self.course):
@@ -394,3 +416,937 @@ class TestTaskWithResults(TestCase):
                 last_submit = self.task1.last_submit(self.user)
                 self.assertLess(last_submit.score(), 1)
                 self.assertGreater(last_submit.score(), 0)
+
+    def test_05_result_limits_without_package(self):
+        submit = create_submit(self.course, self.task1, self.user, '1234.cpp')
+        create_task_results(self.course, submit)
+        with InCourse(self.course):
+            expected = {}
+            for test in Test.objects.filter(test_set__task=self.task1):
+                package_test = test.package_test
+                self.assertEqual(test.time_limit, package_test['time_limit'])
+                self.assertEqual(test.memory_limit, bytes_from_str(package_test['memory_limit']))
+                expected[test.pk] = (round(package_test['time_limit'], 3),
+                                     bytes_to_str(bytes_from_str(package_test['memory_limit'])))
+            with patch.object(PackageInstance, 'package', new_callable=PropertyMock,
+                              side_effect=AssertionError('package read')):
+                for result in Result.objects.filter(submit=submit):
+                    data = result.get_data(include_time=True, include_memory=True)
+                    time_limit, memory_limit = expected[result.test_id]
+                    self.assertTrue(data['f_time_real'].endswith(f' / {time_limit:g} s'))
+                    self.assertTrue(data['f_runtime_memory'].endswith(f' / {memory_limit}'))
+
+    def test_06_refresh_missing_limits(self):
+        submit = create_submit(self.course, self.task1, self.user, '1234.cpp')
+        create_task_results(self.course, submit)
+        with InCourse(self.course):
+            tests = Test.objects.filter(test_set__task=self.task1)
+            stored = {test.pk: (test.time_limit, test.memory_limit) for test in tests}
+            tests.update(time_limit=None, memory_limit=None)
+            result = Result.objects.filter(submit=submit).first()
+            result.get_data(include_time=True, include_memory=True)
+            self.assertEqual({test.pk: (test.time_limit, test.memory_limit) for test in tests},
+                             stored)
+
+    def test_07_initialise_task_from_metadata(self):
+        package_instance = self.task1.package_instance
+        metadata = package_instance.metadata
+        with patch.object(PackageInstance, 'package', new_callable=PropertyMock,
+                          side_effect=AssertionError('package read')), InCourse(self.course):
+            task = Task.objects.create_task(package_instance=package_instance,
+                                            round_=self.round_,
+                                            task_name='Task from metadata')
+            self.assertEqual(task.points, metadata.points)
+            self.assertEqual(
+                sorted(TestSet.objects.filter(task=task).values_list('short_name', 'weight')),
+                sorted((s.name, s.weight) for s in metadata.test_sets)
+            )
+            self.assertEqual(
+                Test.objects.filter(test_set__task=task).count(),
+                Test.objects.filter(test_set__task=self.task1).count()
+            )
+            task.delete()
+
+    def test_08_submit_sources_shared(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            source = Path(tmp_dir) / 'solution.cpp'
+            source.write_text('int main() {}')
+            submit = create_submit(self.course, self.task1, self.user, source)
+            duplicate = create_submit(self.course, self.task2, self.user, source)
+            self.assertTrue(source.is_file())
+
+            with InCourse(self.course), patch.object(Submit, 'send'):
+                resent = Submit.objects.get(pk=submit.pk).resend()
+
+        digest = hashlib.sha256(b'int main() {}').hexdigest()
+        name = f'submits/{digest[:2]}/{digest[2:4]}/{digest}.cpp'
+        self.assertEqual(submit.source_code.name, name)
+        self.assertEqual(duplicate.source_code.name, name)
+        self.assertEqual(resent.source_code.name, name)
+        self.assertEqual(submit.source_code_path.read_text(), 'int main() {}')
+
+    def test_09_submit_source_moved(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            sources = [Path(tmp_dir) / 'first.cpp', Path(tmp_dir) / 'second.cpp']
+            submits = []
+            for source in sources:
+                source.write_text('// moved')
+                with InCourse(self.course):
+                    submits.append(Submit.objects.create_submit(source_code=source,
+                                                                task=self.task1,
+                                                                user=self.user,
+                                                                auto_send=False,
+                                                                move_source=True))
+                self.assertFalse(source.exists())
+        self.assertEqual(submits[0].source_code.name, submits[1].source_code.name)
+        self.assertEqual(submits[0].source_code_path.read_text(), '// moved')
+
+    def test_10_submit_storage_save(self):
+        storage = Submit._meta.get_field('source_code').storage
+        name = storage.save('submits/upload.py', ContentFile(b'print(1)'))
+        self.assertEqual(storage.save('submits/other.py', ContentFile(b'print(1)')), name)
+        self.assertNotEqual(storage.save('submits/other.cpp', ContentFile(b'print(1)')), name)
+        self.assertRegex(name, r'^submits/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.py$')
+        with storage.open(name) as file:
+            self.assertEqual(file.read(), b'print(1)')
+        self.assertEqual(list(Path(storage.path('submits')).rglob('.*')), [])
+
+
+class UserTaskScoreTest(TestCase):
+    course = None
+    round_ = None
+    task = None
+    user = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(
+            name='Test Course',
+            short_name='TC4',
+        )
+        cls.pkg = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        cls.round_ = create_rounds(cls.course, 1)[0]
+        cls.user = User.objects.create_user(
+            email='task_score@test.com',
+            password='test',
+        )
+        with InCourse(cls.course):
+            cls.task = Task.objects.create_task(
+                package_instance=cls.pkg,
+                round_=cls.round_,
+                task_name='Task scored from materialized scores',
+                points=10,
+                initialise_task=False,
+            )
+            for set_no in range(2):
+                test_set = TestSet.objects.create(task=cls.task,
+                                                  short_name=f'set{set_no}',
+                                                  weight=1)
+                for test_no in range(3):
+                    Test.objects.create(test_set=test_set, short_name=f'test{test_no}')
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        cls.user.delete()
+        pkg_src = cls.pkg.package_source
+        cls.pkg.delete()
+        pkg_src.delete()
+        super().tearDownClass()
+
+    def tearDown(self):
+        with InCourse(self.course):
+            Result.objects.all().delete()
+            Submit.objects.all().delete()
+
+    def test_01_pending_submit_score(self):
+        submit = create_submit(self.course, self.task, self.user, '1234.cpp')
+        with InCourse(self.course):
+            task_score = UserTaskScore.objects.get(task=self.task, usr=self.user.pk)
+            self.assertEqual(task_score.submit, submit)
+            self.assertEqual(task_score.score, -1)
+            self.assertEqual(task_score.points, 0)
+        self.assertEqual(self.course.get_member_points(self.user), 0)
+        self.assertEqual(self.course.get_member_cleared_tasks_number(self.user), 0)
+
+    @parameterized.expand([
+        ('best submit', 'BEST', 10, 1),
+        ('last submit', 'LAST', 0, 0),
+    ])
+    def test_02_score_selection_policy(self, name, policy, points, cleared):
+        submit_ok = create_submit(self.course, self.task, self.user, '1234.cpp')
+        create_task_results(self.course, submit_ok)
+        submit_ans = create_submit(self.course, self.task, self.user, '1234.cpp')
+        create_task_results(self.course, submit_ans, (ResultStatus.ANS,))
+        with InCourse(self.course):
+            submit_ok.score()
+            submit_ans.score()
+            self.round_.update(score_selection_policy=policy)
+            task_score = UserTaskScore.objects.get(task=self.task, usr=self.user.pk)
+            self.assertEqual(task_score.submit, self.task.user_scored_submit(self.user))
+        self.assertEqual(self.course.get_member_points(self.user), points)
+        self.assertEqual(self.course.get_member_cleared_tasks_number(self.user), cleared)
+
+    def test_03_task_points_change(self):
+        submit = create_submit(self.course, self.task, self.user, '1234.cpp')
+        create_task_results(self.course, submit)
+        with InCourse(self.course):
+            submit.score()
+            self.assertEqual(self.course.get_member_points(self.user), 10)
+            self.task.update_data(points=20)
+            self.assertEqual(self.course.get_member_points(self.user), 20)
+            self.task.update_data(points=10)
+
+    def test_04_submit_delete(self):
+        submit = create_submit(self.course, self.task, self.user, '1234.cpp')
+        with InCourse(self.course):
+            submit.delete()
+            self.assertFalse(UserTaskScore.objects.filter(task=self.task).exists())
+
+
+class BulkScoringTest(TestCase):
+    course = None
+    round_ = None
+    task = None
+    users = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(
+            name='Test Course',
+            short_name='TC5',
+        )
+        cls.pkg = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        cls.round_ = create_rounds(cls.course, 1)[0]
+        cls.users = [User.objects.create_user(email=f'bulk_score{i}@test.com', password='test')
+                     for i in range(3)]
+        with InCourse(cls.course):
+            cls.task = Task.objects.create_task(
+                package_instance=cls.pkg,
+                round_=cls.round_,
+                task_name='Task scored in bulk',
+                points=10,
+                initialise_task=False,
+            )
+            for set_no, weight in enumerate((1, 3, 0.5)):
+                test_set = TestSet.objects.create(task=cls.task,
+                                                  short_name=f'set{set_no}',
+                                                  weight=weight)
+                for test_no in range(set_no + 2):
+                    Test.objects.create(test_set=test_set, short_name=f'test{test_no}')
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        for user in cls.users:
+            user.delete()
+        pkg_src = cls.pkg.package_source
+        cls.pkg.delete()
+        pkg_src.delete()
+        super().tearDownClass()
+
+    def tearDown(self):
+        with InCourse(self.course):
+            Result.objects.all().delete()
+            Submit.objects.all().delete()
+
+    def create_submits(self):
+        possible_results = (ResultStatus.OK, ResultStatus.ANS, ResultStatus.TLE, ResultStatus.MEM)
+        for user in self.users:
+            for submit_no in range(4):
+                submit = create_submit(self.course, self.task, user, '1234.cpp')
+                if submit_no == 0:
+                    create_task_results(self.course, submit)
+                elif submit_no < 3:
+                    create_task_results(self.course, submit, possible_results)
+        with InCourse(self.course):
+            Submit.objects.filter(pk=submit.pk).update(fixed_fall_off_factor=0.5)
+
+    @parameterized.expand([
+        ('linear', TaskJudgingMode.LIN),
+        ('unanimous', TaskJudgingMode.UNA),
+    ])
+    def test_01_bulk_scores_match_single_scores(self, name, judging_mode):
+        self.create_submits()
+        with InCourse(self.course):
+            self.task.judging_mode = judging_mode
+            self.task.save()
+            expected = {}
+            for submit in Submit.objects.filter(task=self.task):
+                submit.score(rejudge=True)
+                expected[submit.pk] = (submit.final_score, submit.submit_status)
+            Submit.objects.filter(task=self.task).update(final_score=-1,
+                                                         submit_status=ResultStatus.PND)
+
+            Submit.objects.rescore_submits([self.task])
+
+            for submit in Submit.objects.filter(task=self.task):
+                self.assertEqual(expected[submit.pk], (submit.final_score, submit.submit_status))
+                if submit.task.user_scored_submit(submit.usr) == submit:
+                    self.assertEqual(
+                        UserTaskScore.objects.get(task=self.task, usr=submit.usr).score,
+                        submit.final_score
+                    )
+
+    def test_02_round_update_rescores_tasks(self):
+        self.create_submits()
+        with InCourse(self.course):
+            Submit.objects.filter(task=self.task).update(final_score=-1)
+            self.round_.update(score_selection_policy='LAST')
+            self.round_.update(score_selection_policy='BEST')
+            self.assertFalse(
+                Submit.objects.filter(task=self.task, final_score__gt=-1,
+                                      submit_status=ResultStatus.PND).exists()
+            )
+            for user in self.users:
+                self.assertEqual(UserTaskScore.objects.get(task=self.task, usr=user.pk).score,
+                                 1.0)
+
+
+class UnpackResultsTest(TestCase):
+    course = None
+    round_ = None
+    task = None
+    user = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(
+            name='Test Course',
+            short_name='TC6',
+        )
+        cls.pkg = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        cls.round_ = create_rounds(cls.course, 1)[0]
+        cls.user = User.objects.create_user(email='unpack@test.com', password='test')
+        with InCourse(cls.course):
+            cls.task = Task.objects.create_task(
+                package_instance=cls.pkg,
+                round_=cls.round_,
+                task_name='Task with unpacked results',
+                points=10,
+                initialise_task=False,
+            )
+            for set_no in range(2):
+                test_set = TestSet.objects.create(task=cls.task,
+                                                  short_name=f'set{set_no}',
+                                                  weight=1)
+                for test_no in range(3):
+                    Test.objects.create(test_set=test_set, short_name=f'test{test_no}')
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        cls.user.delete()
+        pkg_src = cls.pkg.package_source
+        cls.pkg.delete()
+        pkg_src.delete()
+        super().tearDownClass()
+
+    def tearDown(self):
+        with InCourse(self.course):
+            Result.objects.all().delete()
+            Submit.objects.all().delete()
+
+    @staticmethod
+    def broker_results(sets: dict) -> BrokerToBaca:
+        return BrokerToBaca(
+            pass_hash='-',
+            submit_id='-',
+            results={
+                set_name: SetResult(name=set_name, tests={
+                    test_name: TestResult(name=test_name, status=status, time_real=0.5,
+                                          time_cpu=0.3, runtime_memory=123)
+                    for test_name, status in tests.items()
+                })
+                for set_name, tests in sets.items()
+            }
+        )
+
+    def test_01_unpack_results(self):
+        submit = create_submit(self.course, self.task, self.user, '1234.cpp')
+        results = self.broker_results({
+            'set0': {'test0': 'OK', 'test1': 'OK', 'test2': 'OK'},
+            'set1': {'test0': 'OK', 'test1': 'ANS', 'test2': 'OK'},
+        })
+        with InCourse(self.course):
+            unpacked = Result.objects.unpack_results(submit, results)
+            self.assertEqual(len(unpacked), 6)
+            self.assertEqual(Result.objects.filter(submit=submit).count(), 6)
+            self.assertEqual(
+                Result.objects.get(submit=submit,
+                                   test__test_set__short_name='set1',
+                                   test__short_name='test1').status,
+                ResultStatus.ANS
+            )
+            submit.refresh_from_db()
+            self.assertEqual(submit.final_score, round((1 + 2 / 3) / 2, 6))
+            self.assertEqual(submit.submit_status, ResultStatus.ANS)
+
+    @parameterized.expand([
+        ('unknown set', {'set0': {'test0': 'OK'}, 'set7': {'test0': 'OK'}}, 'set7'),
+        ('unknown test', {'set0': {'test0': 'OK', 'test9': 'OK'}}, 'set0/test9'),
+    ])
+    def test_02_unknown_names(self, name, sets, unknown_name):
+        submit = create_submit(self.course, self.task, self.user, '1234.cpp')
+        with InCourse(self.course):
+            with self.assertRaises(DataError) as error:
+                Result.objects.unpack_results(submit, self.broker_results(sets))
+            self.assertIn(unknown_name, str(error.exception))
+            self.assertFalse(Result.objects.filter(submit=submit).exists())
+
+
+class CourseConnectionPoolTest(TestCase):
+    courses = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [
+            Course.objects.create_course(name=f'Pooled course {i}', short_name=f'TC7{i}')
+            for i in range(2)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        for course in cls.courses:
+            Course.objects.delete_course(course)
+        super().tearDownClass()
+
+    @staticmethod
+    def query(course):
+        with InCourse(course):
+            Round.objects.count()
+
+    def test_01_persistent_settings(self):
+        policy = settings.COURSE_DB_CONNECTION_POLICY
+        for course in self.courses:
+            db_settings = settings.DATABASES[course.short_name]
+            self.assertEqual(db_settings['CONN_MAX_AGE'], policy.conn_max_age)
+            self.assertEqual(db_settings['CONN_HEALTH_CHECKS'], policy.health_checks)
+
+    def test_02_lru_eviction(self):
+        first, second = (course.short_name for course in self.courses)
+        pool = CourseConnectionPool(max_connections=1, idle_timeout=60)
+        self.query(first)
+        pool.touch(first)
+        self.assertIsNotNone(connections[first].connection)
+
+        self.query(second)
+        pool.touch(second)
+        self.assertIsNone(connections[first].connection)
+        self.assertIsNotNone(connections[second].connection)
+        self.assertEqual(pool.aliases, [second])
+        pool.touch('default')
+        self.assertEqual(pool.aliases, [second])
+
+    def test_03_close_idle(self):
+        alias = self.courses[0].short_name
+        pool = CourseConnectionPool(max_connections=4, idle_timeout=0)
+        self.query(alias)
+        pool.touch(alias)
+        self.assertEqual(1, pool.close_idle())
+        self.assertIsNone(connections[alias].connection)
+        self.assertEqual(pool.aliases, [])
+        self.assertEqual(0, pool.close_idle())
+
+
+class SchemaBackendTest(TestCase):
+    manager = None
+    cache_file = None
+
+    @classmethod
+    def setUpClass(cls):
+        cls.cache_file = Path(tempfile.mkstemp(suffix='.cache')[1])
+        main_manager = settings.DB_MANAGER
+        cls.manager = DBManager(cache_file=cls.cache_file,
+                                default_settings=main_manager.default_settings,
+                                root_user=main_manager.root_user,
+                                root_password=main_manager.root_password,
+                                db_host=main_manager.db_host,
+                                databases=settings.DATABASES,
+                                add_default=False,
+                                backend=DBManager.SCHEMA_BACKEND,
+                                schema_db_name='test_baca2_course_schemas',
+                                schema_alias='test_course_schemas',
+                                migration_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        alias = cls.manager.schema_alias
+        connections[alias].close()
+        del connections[alias]
+        settings.DATABASES.pop(alias)
+        conn = cls.manager._raw_root_connection()
+        try:
+            conn.cursor().execute('DROP DATABASE IF EXISTS test_baca2_course_schemas WITH (FORCE);')
+        finally:
+            conn.close()
+        cls.cache_file.unlink(missing_ok=True)
+
+    def schema_tables(self, schema):
+        conn = self.manager._raw_root_connection(self.manager.schema_db_name)
+        try:
+            cursor = conn.cursor()
+            cursor.execute('SELECT table_name FROM information_schema.tables '
+                           'WHERE table_schema = %s;', [schema])
+            return {row[0] for row in cursor.fetchall()}
+        finally:
+            conn.close()
+
+    def in_course(self, name, query):
+        token = settings.CURRENT_DB.set(name)
+        try:
+            return query()
+        finally:
+            settings.CURRENT_DB.reset(token)
+
+    def test_schema_per_course(self):
+        names = ['tc8schema0', 'tc8schema1']
+        alias = self.manager.schema_alias
+        try:
+            for name in names:
+                self.manager.create_db(name)
+            report = self.manager.migrate_all()
+            self.assertEqual(set(names), set(report.migrated))
+
+            for name in names:
+                db_settings = settings.DATABASES[name]
+                self.assertEqual(db_settings['NAME'], 'test_baca2_course_schemas')
+                self.assertIn(f'search_path={name}_db', db_settings['OPTIONS']['options'])
+                self.assertIn('course_submit', self.schema_tables(f'{name}_db'))
+                self.assertIn('django_migrations', self.schema_tables(f'{name}_db'))
+            self.assertFalse(self.manager.db_exists(alias))
+
+            with override_settings(DB_MANAGER=self.manager):
+                round_ = self.in_course(names[0], lambda: Round.objects.create_round(
+                    start_date=timezone.now(),
+                    deadline_date=timezone.now() + timedelta(days=1)
+                ))
+                self.assertEqual(alias, round_._state.db)
+                self.assertEqual(names[0], ReadCourseMeta.origin_db(round_))
+                self.assertEqual(1, self.in_course(names[0], Round.objects.count))
+                self.assertEqual(0, self.in_course(names[1], Round.objects.count))
+
+                # both courses are queried through one connection
+                self.assertIsNotNone(connections[alias].connection)
+                for name in names:
+                    self.assertIsNone(connections[name].connection)
+
+                # schema set in a rolled back transaction is set again
+                self.assertEqual(1, self.in_course(names[0], Round.objects.count))
+                with self.assertRaises(DataError):
+                    with transaction.atomic(using=alias):
+                        self.assertEqual(0, self.in_course(names[1], Round.objects.count))
+                        raise DataError('rollback')
+                self.assertEqual(0, self.in_course(names[1], Round.objects.count))
+
+                with self.assertRaises(RoutingError):
+                    with connections[alias].cursor() as cursor:
+                        cursor.execute('SELECT 1;')
+        finally:
+            for name in names:
+                if name in settings.DATABASES:
+                    self.manager.delete_db(name)
+        self.assertEqual(set(), self.schema_tables(f'{names[0]}_db'))
+
+
+class MigrateAllTest(TestCase):
+    courses = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [
+            Course.objects.create_course(name=f'Migrated course {i}', short_name=f'TC9{i}')
+            for i in range(3)
+        ]
+
+    @classmethod
+    def tearDownClass(cls):
+        for course in cls.courses:
+            Course.objects.delete_course(course)
+        super().tearDownClass()
+
+    @staticmethod
+    def unapply_index_migration(alias, drop_index):
+        with connections[alias].cursor() as cursor:
+            cursor.execute("DELETE FROM django_migrations "
+                           "WHERE app = 'course' AND name IN "
+                           "('0004_submit_pending_index', '0005_test_limits', "
+                           "'0006_submit_source_storage');")
+            if drop_index:
+                cursor.execute('DROP INDEX submit_pending_idx;')
+                cursor.execute('ALTER TABLE course_test '
+                               'DROP COLUMN time_limit, DROP COLUMN memory_limit;')
+        connections[alias].close()
+
+    def test_migrate_all(self):
+        broken, pending, up_to_date = (course.short_name for course in self.courses)
+        manager = settings.DB_MANAGER
+        self.assertEqual([], manager.pending_migrations([broken, pending, up_to_date]))
+
+        self.unapply_index_migration(broken, drop_index=False)
+        self.unapply_index_migration(pending, drop_index=True)
+        self.assertEqual([broken, pending],
+                         manager.pending_migrations([broken, pending, up_to_date]))
+
+        report = manager.migrate_all(workers=2)
+        self.assertIn(pending, report.migrated)
+        self.assertIn(up_to_date, report.skipped)
+        self.assertIn(broken, report.failed)
+        self.assertIn('submit_pending_idx', report.failed[broken])
+        self.assertFalse(report.ok)
+        self.assertEqual([broken], manager.pending_migrations([broken, pending, up_to_date]))
+
+
+class CourseDatabaseRegistryTest(TestCase):
+    course = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(name='Registered course', short_name='TC10')
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        super().tearDownClass()
+
+    def test_01_registered_on_create(self):
+        self.assertTrue(CourseDatabase.objects.filter(name=self.course.short_name).exists())
+        self.assertGreater(CourseDatabase.objects.registry_version(), 0)
+
+    def test_02_reload_on_version_change(self):
+        manager = settings.DB_MANAGER
+        alias = self.course.short_name
+        db_settings = settings.DATABASES.pop(alias)
+        try:
+            manager.registry_version = None
+            self.assertTrue(manager.db_exists(alias))
+            self.assertEqual(db_settings, settings.DATABASES[alias])
+        finally:
+            settings.DATABASES.setdefault(alias, db_settings)
+
+        with self.assertNumQueries(1):
+            self.assertFalse(manager.load_registry())
+
+    def test_03_unknown_alias_is_remembered(self):
+        manager = settings.DB_MANAGER
+        self.assertFalse(manager.db_exists('tc10_unknown'))
+        with self.assertNumQueries(0):
+            self.assertFalse(manager.db_exists('tc10_unknown'))
+            with self.assertRaises(RoutingError):
+                with InCourse(self.course):
+                    settings.CURRENT_DB.set('tc10_unknown')
+                    Round.objects.count()
+
+    def test_04_registry_changes_from_other_process(self):
+        manager = settings.DB_MANAGER
+        self.assertFalse(manager.db_exists('tc10_other'))
+
+        CourseDatabase.objects.register('tc10_other')
+        self.assertFalse(manager.db_exists('tc10_other'))
+        manager._misses.clear()
+        self.assertTrue(manager.db_exists('tc10_other'))
+
+        CourseDatabase.objects.unregister('tc10_other')
+        self.assertTrue(manager.load_registry())
+        self.assertIn(self.course.short_name, settings.DATABASES)
+        settings.DATABASES.pop('tc10_other')
+
+
+class CourseAliasCacheTest(TestCase):
+    course = None
+    round_obj = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(name='Cached course', short_name='TC11')
+        cls.round_obj = create_rounds(cls.course, 1)[0]
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        super().tearDownClass()
+
+    def tearDown(self):
+        course_aliases.add(self.course.id, self.course.short_name)
+
+    def test_01_cached_on_create(self):
+        with self.assertNumQueries(0):
+            for course in (self.course, self.course.short_name, self.course.id):
+                with InCourse(course):
+                    self.assertEqual(settings.CURRENT_DB.get(), self.course.short_name)
+
+    def test_02_looked_up_once(self):
+        course_aliases.clear()
+        with self.assertNumQueries(1):
+            with InCourse(self.course.id):
+                pass
+            with InCourse(self.course.id):
+                pass
+        with self.assertNumQueries(0):
+            self.assertEqual(course_aliases.resolve(self.course.short_name),
+                             self.course.short_name)
+
+    def test_03_unknown_course(self):
+        with self.assertRaises(Course.DoesNotExist):
+            InCourse('tc11_unknown')
+
+    def test_04_meta_wrappers(self):
+        with InCourse(self.course):
+            round_ = Round.objects.get(pk=self.round_obj.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(round_.start_date_, self.round_obj.start_date)
+            self.assertTrue(round_.is_open)
+
+    def test_05_invalidated_on_delete(self):
+        course = Course.objects.create_course(name='Deleted course', short_name='TC12')
+        course_id = course.id
+        self.assertEqual(course_aliases.resolve(course_id), 'tc12')
+        Course.objects.delete_course(course)
+        with self.assertRaises(Course.DoesNotExist):
+            course_aliases.resolve(course_id)
+        with self.assertRaises(Course.DoesNotExist):
+            course_aliases.resolve('tc12')
+
+
+class OwnedResultsViewTest(TestCase):
+    course = None
+    task = None
+    owner = None
+    other = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(name='Owned results', short_name='TC13')
+        cls.pkg = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        cls.owner = User.objects.create_user(email='tc13_owner@test.com', password='test')
+        cls.other = User.objects.create_user(email='tc13_other@test.com', password='test')
+        cls.course.create_role(name='student',
+                               permissions=[Course.CourseAction.VIEW_OWN_RESULT.label,
+                                            Course.CourseAction.VIEW_OWN_SUBMIT.label])
+        cls.course.add_members([cls.owner, cls.other], 'student')
+        round_ = create_rounds(cls.course, 1)[0]
+        with InCourse(cls.course):
+            cls.task = Task.objects.create_task(package_instance=cls.pkg,
+                                                round_=round_,
+                                                task_name='Task with many tests',
+                                                points=10,
+                                                initialise_task=False)
+            test_set = TestSet.objects.create(task=cls.task, short_name='set0', weight=1)
+            cls.tests = [Test.objects.create(test_set=test_set, short_name=f'test{i}')
+                         for i in range(12)]
+
+    @classmethod
+    def tearDownClass(cls):
+        Course.objects.delete_course(cls.course)
+        cls.owner.delete()
+        cls.other.delete()
+        pkg_src = cls.pkg.package_source
+        cls.pkg.delete()
+        pkg_src.delete()
+        super().tearDownClass()
+
+    def tearDown(self):
+        with InCourse(self.course):
+            Result.objects.all().delete()
+            Submit.objects.all().delete()
+
+    def submit_with_results(self, user, results_amount):
+        submit = create_submit(self.course, self.task, user, '1234.cpp')
+        for test in self.tests[:results_amount]:
+            create_test_result(submit, test, ResultStatus.OK, self.course)
+        return submit
+
+    def get_response(self, user, view, table_params=None, get_data=None, **filter_params):
+        request = RequestFactory().get(
+            f'/course/{self.course.id}/models/{view.MODEL._meta.model_name}/'
+            f'?mode=filter&{encode_dict_to_url("filter_params", filter_params)}'
+            f'&{urlencode(table_params or {})}'
+        )
+        request.user = user
+        get_data = get_data or (lambda obj, **kwargs: obj.pk)
+
+        def serialize_objects(_, objects, serialize_kwargs):
+            return [get_data(obj, **serialize_kwargs) for obj in objects]
+
+        # streaming responses serialize submits after the view returns
+        self.enterContext(patch.object(view, 'serialize_objects', serialize_objects))
+        return view.as_view()(request, course_id=self.course.id)
+
+    def get_results(self, user, view, table_params=None, **filter_params):
+        response = self.get_response(user, view, table_params, **filter_params)
+        if response.streaming:
+            return json.loads(b''.join(response.streaming_content))
+        return json.loads(response.content)
+
+    def test_01_owned_results(self):
+        for results_amount in (3, 12):
+            submit = self.submit_with_results(self.owner, results_amount)
+            with CaptureQueriesContext(connections[self.course.short_name]) as queries:
+                response = self.get_results(self.owner, ResultModelView, submit=submit.pk)
+            self.assertEqual(response['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+            self.assertEqual(len(response['data']), results_amount)
+            self.assertEqual(len(queries), 2)
+
+    def test_02_results_of_other_user(self):
+        submit = self.submit_with_results(self.other, 3)
+        response = self.get_results(self.owner, ResultModelView, submit=submit.pk)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+        response = self.get_results(self.owner, ResultModelView, status=ResultStatus.OK)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+
+    def test_03_submits(self):
+        own_submit = self.submit_with_results(self.owner, 1)
+        self.submit_with_results(self.other, 1)
+        response = self.get_results(self.owner, SubmitModelView, usr=self.owner.pk)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+        self.assertEqual(response['data'], [own_submit.pk])
+        response = self.get_results(self.owner, SubmitModelView, task=self.task.pk)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+
+    def test_04_server_side_page(self):
+        submits = [self.submit_with_results(self.owner, 0) for _ in range(5)]
+        with InCourse(self.course):
+            for i, submit in enumerate(submits):
+                submit.submit_date = timezone.now() - timedelta(minutes=i)
+                submit.submit_status = ResultStatus.OK if i % 2 else ResultStatus.ANS
+                submit.save()
+        table_params = {
+            'draw': 3,
+            'start': 1,
+            'length': 2,
+            'columns[0][data]': 'submit_date',
+            'columns[0][searchable]': 'true',
+            'columns[0][orderable]': 'true',
+            'columns[1][data]': 'submit_status',
+            'columns[1][searchable]': 'true',
+            'columns[1][orderable]': 'true',
+            'columns[2][data]': 'user_first_name',
+            'columns[2][searchable]': 'true',
+            'columns[2][orderable]': 'true',
+            'order[0][column]': 0,
+            'order[0][dir]': 'asc',
+            'search[value]': '',
+        }
+        response = self.get_results(self.owner, SubmitModelView, table_params, usr=self.owner.pk)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+        self.assertEqual(response['draw'], 3)
+        self.assertEqual(response['recordsTotal'], 5)
+        self.assertEqual(response['recordsFiltered'], 5)
+        self.assertEqual(response['data'], [submits[3].pk, submits[2].pk])
+
+        table_params |= {'start': 0, 'length': -1, 'search[value]': ResultStatus.ANS,
+                         'order[0][column]': 2}
+        response = self.get_results(self.owner, SubmitModelView, table_params, usr=self.owner.pk)
+        self.assertEqual(response['recordsTotal'], 5)
+        self.assertEqual(response['recordsFiltered'], 3)
+        self.assertEqual(response['data'], [submits[0].pk, submits[2].pk, submits[4].pk])
+
+        self.submit_with_results(self.other, 0)
+        response = self.get_results(self.owner, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+
+    def test_05_streamed_response(self):
+        submits = [self.submit_with_results(self.owner, 0) for _ in range(7)]
+        with patch.object(SubmitModelView, 'STREAM_CHUNK_SIZE', 3):
+            response = self.get_response(self.owner, SubmitModelView, usr=self.owner.pk)
+            self.assertTrue(response.streaming)
+            # the view has returned - the stream has to retrieve submits from the course db itself
+            self.assertFalse(InCourse.is_defined())
+            chunks = list(response.streaming_content)
+        self.assertEqual(len(chunks), 5)
+        response = json.loads(b''.join(chunks))
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+        self.assertEqual(sorted(response['data']), sorted(submit.pk for submit in submits))
+
+    def test_06_streamed_response_error(self):
+        submits = [self.submit_with_results(self.owner, 0) for _ in range(4)]
+
+        def get_data(obj, **kwargs):
+            if obj.pk == submits[2].pk:
+                raise ValueError('broken submit')
+            return obj.pk
+
+        with patch.object(SubmitModelView, 'STREAM_CHUNK_SIZE', 2):
+            response = self.get_response(self.owner,
+                                         SubmitModelView,
+                                         get_data=get_data,
+                                         usr=self.owner.pk)
+            with self.assertLogs('util.responses', level='ERROR'):
+                response = json.loads(b''.join(response.streaming_content))
+        self.assertEqual(response['status'], BaCa2JsonResponse.Status.ERROR.value)
+        self.assertEqual(response['errors'], ['broken submit'])
+
+    def test_07_bulk_submit_data(self):
+        self.submit_with_results(self.owner, 12)
+        self.submit_with_results(self.other, 12)
+        self.submit_with_results(self.owner, 3)
+        serialize_kwargs = {'show_user': True,
+                            'add_round_task_name': True,
+                            'add_summary_score': True,
+                            'add_falloff_info': True}
+        with InCourse(self.course):
+            data = Submit.objects.get_submits_data(Submit.objects.order_by('id'),
+                                                   **serialize_kwargs)
+            expected = [submit.get_data(**serialize_kwargs)
+                        for submit in Submit.objects.order_by('id')]
+        self.assertEqual(data, expected)
+
+    def test_08_bulk_submit_data_queries(self):
+        for user in (self.owner, self.other, self.owner):
+            self.submit_with_results(user, 12).score()
+        with InCourse(self.course):
+            submits = list(Submit.objects.all())
+            with CaptureQueriesContext(connections[self.course.short_name]) as course_queries, \
+                    CaptureQueriesContext(connections['default']) as default_queries:
+                Submit.objects.get_submits_data(submits,
+                                                add_round_task_name=True,
+                                                add_summary_score=True,
+                                                add_falloff_info=True)
+        self.assertEqual(len(course_queries), 1)
+        self.assertEqual(len(default_queries), 1)
+
+    def test_09_server_side_user_columns(self):
+        admin = User.objects.create_superuser(email='tc13_admin@test.com', password='test')
+        User.objects.filter(pk=self.owner.pk).update(first_name='Zofia', last_name='Nowak')
+        User.objects.filter(pk=self.other.pk).update(first_name='Adam', last_name='Kowalski')
+        own_submits = [self.submit_with_results(self.owner, 0) for _ in range(2)]
+        other_submit = self.submit_with_results(self.other, 0)
+        with InCourse(self.course):
+            Submit.objects.filter(pk=own_submits[1].pk).update(fixed_fall_off_factor=0.5)
+            Submit.objects.filter(pk=other_submit.pk).update(fixed_fall_off_factor=0.2)
+        table_params = {
+            'draw': 1,
+            'columns[0][data]': 'user_first_name',
+            'columns[0][searchable]': 'true',
+            'columns[0][orderable]': 'true',
+            'columns[1][data]': 'user_last_name',
+            'columns[1][searchable]': 'true',
+            'columns[1][orderable]': 'true',
+            'columns[2][data]': 'fall_off_factor',
+            'columns[2][searchable]': 'true',
+            'columns[2][orderable]': 'true',
+            'order[0][column]': 0,
+            'order[0][dir]': 'asc',
+            'search[value]': 'nowa',
+        }
+        response = self.get_results(admin, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['recordsTotal'], 3)
+        self.assertEqual(response['recordsFiltered'], 2)
+        self.assertEqual(response['data'], [submit.pk for submit in own_submits])
+
+        table_params |= {'search[value]': '', 'columns[0][search][value]': 'ada'}
+        response = self.get_results(admin, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['data'], [other_submit.pk])
+
+        table_params |= {'columns[0][search][value]': '', 'order[0][dir]': 'desc'}
+        response = self.get_results(admin, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['data'], [own_submits[0].pk, own_submits[1].pk, other_submit.pk])
+
+        table_params |= {'order[0][column]': 2, 'order[0][dir]': 'asc', 'length': 2}
+        response = self.get_results(admin, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['recordsFiltered'], 3)
+        self.assertEqual(response['data'], [other_submit.pk, own_submits[1].pk])
+
+        table_params |= {'order[0][column]': 1, 'order[1][column]': 2, 'order[1][dir]': 'desc'}
+        response = self.get_results(admin, SubmitModelView, table_params, task=self.task.pk)
+        self.assertEqual(response['data'], [other_submit.pk, own_submits[0].pk])
@@ -1,8 +1,9 @@
 import inspect
 from abc import ABC, ABCMeta
-from typing import Any, Callable, Dict, List, Union
+from typing import Any, Callable, Dict, Iterable, List, Union
 
 from django.contrib.auth.mixins import UserPassesTestMixin
+from django.db.models import Q, QuerySet
 from django.http import JsonResponse
 from django.template.response import TemplateResponse
 from django.utils import timezone
@@ -218,6 +219,15 @@ class RoundModelView(CourseModelView):
 
     MODEL = Round
 
+    TABLE_FIELDS = {
+        'id': 'id',
+        'name': 'name',
+        'start_date': 'start_date',
+        'end_date': 'end_date',
+        'deadline_date': 'deadline_date',
+        'reveal_date': 'reveal_date',
+    }
+
     def post(self, request, **kwargs) -> BaCa2JsonResponse:
         """
         Delegates the handling of the POST request to the appropriate form based on the `form_name`
@@ -249,6 +259,14 @@ class TaskModelView(CourseModelView):
 
     MODEL = Task
 
+    TABLE_FIELDS = {
+        'id': 'id',
+        'name': 'task_name',
+        'round_name': 'round__name',
+        'judging_mode': 'judging_mode',
+        'points': 'points',
+    }
+
     def post(self, request, **kwargs) -> JsonResponse:
         """
         Delegates the handling of the POST request to the appropriate form based on the `form_name`
@@ -284,6 +302,97 @@ class SubmitModelView(CourseModelView):
 
     MODEL = Submit
 
+    TABLE_FIELDS = {
+        'id': 'id',
+        'submit_date': 'submit_date',
+        'task_name': 'task__task_name',
+        'round_task_name': 'task__task_name',
+        'submit_status': 'submit_status',
+        'final_score': 'final_score',
+        'summary_score': 'final_score',
+    }
+
+    STREAM_CHUNK_SIZE = 500
+
+    #: Mapping of table columns containing names of submitters to fields of the user model. Users
+    #: are stored in the default database, so these columns are searched and sorted by user ids.
+    USER_NAME_FIELDS = {
+        'user_first_name': 'first_name',
+        'user_last_name': 'last_name',
+    }
+
+    def get_search_filter(self, column: str, value: str) -> Q | None:
+        """
+        Extends the default search with submitter name columns - submits are matched by ids of
+        users whose name contains the searched value.
+
+        :param column: Name of the table column.
+        :type column: str
+        :param value: Searched value.
+        :type value: str
+        :return: Filter matching submits with the column containing the searched value, or `None`
+            if the column cannot be searched.
+        :rtype: Q | None
+        """
+        if column in self.USER_NAME_FIELDS:
+            users = User.objects.filter(**{f'{self.USER_NAME_FIELDS[column]}__icontains': value})
+            return Q(usr__in=list(users.values_list('pk', flat=True)))
+        return super().get_search_filter(column, value)
+
+    def get_sort_keys(self, query_set: QuerySet, column: str) -> Dict[int, Any] | None:
+        """
+        Computes sort keys of submitter name columns (names of users retrieved from the default
+        database) and of the fall-off factor column (computed the same way as in
+        :meth:`course.models.SubmitManager.get_submits_data`).
+
+        :param query_set: Query set of submits to be sorted.
+        :type query_set: QuerySet
+        :param column: Name of the table column.
+        :type column: str
+        :return: Sort keys of the submits by their primary keys, or `None` if the column cannot be
+            sorted.
+        :rtype: Dict[int, Any] | None
+        """
+        if column in self.USER_NAME_FIELDS:
+            submitters = dict(query_set.values_list('pk', 'usr'))
+            names = dict(User.objects.filter(pk__in=set(submitters.values())).values_list(
+                'pk', self.USER_NAME_FIELDS[column]
+            ))
+            return {pk: names.get(usr, '').lower() for pk, usr in submitters.items()}
+
+        if column == 'fall_off_factor':
+            rows = list(query_set.values_list('pk', 'task', 'submit_date', 'fixed_fall_off_factor'))
+            tasks = Task.objects.select_related('round').in_bulk({row[1] for row in rows})
+            fall_offs = {}
+            keys = {}
+            for pk, task_id, submit_date, fall_off_factor in rows:
+                if fall_off_factor is None:
+                    if task_id not in fall_offs:
+                        fall_offs[task_id] = tasks[task_id].get_fall_off()
+                    fall_off_factor = fall_offs[task_id].get_factor(submit_date)
+                keys[pk] = fall_off_factor
+            return keys
+
+        return super().get_sort_keys(query_set, column)
+
+    def serialize_objects(self, objects: Iterable[Submit], serialize_kwargs: dict
+                          ) -> List[Dict[str, Any]]:
+        """
+        Serializes submits in bulk, with a constant number of queries regardless of the number of
+        submits.
+
+        :param objects: Submits to be serialized.
+        :type objects: Iterable[Submit]
+        :param serialize_kwargs: Kwargs to pass to :meth:`Submit.get_data`.
+        :type serialize_kwargs: dict
+        :return: Serialized data of the submits, in the order of given submits.
+        :rtype: List[Dict[str, Any]]
+
+        See also:
+            - :meth:`course.models.SubmitManager.get_submits_data`
+        """
+        return Submit.objects.get_submits_data(objects, **serialize_kwargs)
+
     def post(self, request, **kwargs) -> JsonResponse:
         """
         Delegates the handling of the POST request to the appropriate form based on the `form_name`
@@ -304,11 +413,20 @@ class SubmitModelView(CourseModelView):
 
         return self.handle_unknown_form(request, **kwargs)
 
+    def get_ownership_filter(self, request, **kwargs) -> Dict[str, Any]:
+        """
+        :param request: HTTP GET request object received by the view
+        :type request: HttpRequest
+        :return: Query parameters matching submits of the requesting user
+        :rtype: Dict[str, Any]
+        """
+        return {'usr': request.user.pk}
+
     def check_get_filtered_permission(self,
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[Submit],
+                                      query_result: QuerySet[Submit],
                                       request,
                                       **kwargs) -> bool:
         """
@@ -320,20 +438,18 @@ class SubmitModelView(CourseModelView):
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
         :param query_result: Query result retrieved by the view
-        :type query_result: List[:class:`Submit`]
+        :type query_result: QuerySet[:class:`Submit`]
         :param request: HTTP GET request object received by the view
         :type request: HttpRequest
-        :return: `True` if the user has the view_own_submit permission and all the retrieved
-            submit instances are owned by the user, `False` otherwise
+        :return: `True` if the user has the view_own_submit permission, `False` otherwise (the
+            retrieved submit instances also have to be owned by the user, see
+            :meth:`get_ownership_filter`)
         :rtype: bool
         """
         user = getattr(request, 'user')
-        course = ModelsRegistry.get_course(self.kwargs.get('course_id'))
-
-        if not user.has_course_permission(Course.CourseAction.VIEW_OWN_SUBMIT.label, course):
-            return False
+        course_id = self.kwargs.get('course_id')
 
-        return all(submit.usr == user.pk for submit in query_result)
+        return user.has_course_permission(Course.CourseAction.VIEW_OWN_SUBMIT.label, course_id)
 
 
 class ResultModelView(CourseModelView):
@@ -344,6 +460,8 @@ class ResultModelView(CourseModelView):
 
     MODEL = Result
 
+    STREAM_CHUNK_SIZE = 500
+
     def check_get_all_permission(self, request, serialize_kwargs, **kwargs) -> bool:
         """
         :param request: HTTP GET request object received by the view
@@ -357,7 +475,7 @@ class ResultModelView(CourseModelView):
             course.
         """
         user = getattr(request, 'user')
-        course = ModelsRegistry.get_course(self.kwargs.get('course_id'))
+        course = self.kwargs.get('course_id')
 
         if not user.has_course_permission(Course.CourseAction.VIEW_RESULT.label, course):
             return False
@@ -374,11 +492,20 @@ class ResultModelView(CourseModelView):
 
         return True
 
+    def get_ownership_filter(self, request, **kwargs) -> Dict[str, Any]:
+        """
+        :param request: HTTP GET request object received by the view
+        :type request: HttpRequest
+        :return: Query parameters matching results of submits of the requesting user
+        :rtype: Dict[str, Any]
+        """
+        return {'submit__usr': request.user.pk}
+
     def check_get_filtered_permission(self,
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[Result],
+                                      query_result: QuerySet[Result],
                                       request,
                                       **kwargs) -> bool:
         """
@@ -390,24 +517,22 @@ class ResultModelView(CourseModelView):
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
         :param query_result: Query result retrieved by the view
-        :type query_result: List[:class:`Result`]
+        :type query_result: QuerySet[:class:`Result`]
         :param request: HTTP GET request object received by the view
         :type request: HttpRequest
-        :return: `True` if the user has the view_own_result permission and all the retrieved
-            result instances are owned by the user. If `serialize_kwargs` contains
-            `include_time` and/or `include_memory` set to `True`, the user also needs to have
-            the view_used_time and/or view_used_memory permissions in the course.
+        :return: `True` if the user has the view_own_result permission (the retrieved result
+            instances also have to be owned by the user, see :meth:`get_ownership_filter`). If
+            `serialize_kwargs` contains `include_time` and/or `include_memory` set to `True`, the
+            user also needs to have the view_used_time and/or view_used_memory permissions in the
+            course.
         :rtype: bool
         """
         user = getattr(request, 'user')
-        course = ModelsRegistry.get_course(self.kwargs.get('course_id'))
+        course = self.kwargs.get('course_id')
 
         if not user.has_course_permission(Course.CourseAction.VIEW_OWN_RESULT.label, course):
             return False
 
-        if not all(result.submit.usr == user.pk for result in query_result):
-            return False
-
         if serialize_kwargs.get('include_time') and not user.has_course_permission(
             Course.CourseAction.VIEW_USED_TIME.label, course
         ):
@@ -758,6 +883,7 @@ class CourseView(CourseTemplateView):
                 'paging': TableWidgetPaging(page_length=50,
                                             allow_length_change=True,
                                             length_change_options=[10, 25, 50, 100]),
+                'server_side': True,
                 'default_order_col': 'submit_date',
                 'default_order_asc': False,
                 'row_styling_rules': get_status_rules(),
@@ -834,13 +960,13 @@ class CourseTask(CourseTemplateView):
                                            parent_tab=True)])
 
         # description ----------------------------------------------------------------------------
-        package = task.package_instance.package
+        package_metadata = task.package_instance.metadata
 
-        description_extension = package.doc_extension()
-        description_file = package.doc_path(description_extension)
+        description_extension = package_metadata.doc_extension()
+        description_file = package_metadata.doc_path(description_extension)
         kwargs = {}
 
-        if package.doc_has_extension('pdf'):
+        if package_metadata.doc_has_extension('pdf'):
             pdf_docs = task.package_instance.pdf_docs
 
             if description_extension == 'pdf':
@@ -937,6 +1063,7 @@ class CourseTask(CourseTemplateView):
                 'paging': TableWidgetPaging(page_length=50,
                                             allow_length_change=True,
                                             length_change_options=[10, 25, 50, 100]),
+                'server_side': True,
                 'default_order_col': 'submit_date',
                 'default_order_asc': False,
                 'row_styling_rules': get_status_rules(),
@@ -0,0 +1,16 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+from django.utils.translation import gettext_lazy as _
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'jobs'
+    verbose_name = _('Background jobs')
+
+    def ready(self):
+        """
+        It imports ``jobs`` modules of all installed apps, so that their job handlers are
+        registered (see :py:func:`jobs.registry.job_handler`).
+        """
+        autodiscover_modules('jobs')
@@ -0,0 +1,31 @@
+import logging
+
+from django.core.management.base import BaseCommand
+
+from jobs.worker import JobWorker
+
+logger = logging.getLogger(__name__)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued background jobs'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Run the oldest queued job (if any) and exit')
+        parser.add_argument('--poll-interval', type=float, default=None,
+                            help='How long to wait before checking an empty queue again')
+
+    def handle(self, *args, **options):
+        worker = JobWorker()
+        if options['once']:
+            job = worker.run_once()
+            if job is None:
+                logger.debug('No jobs to run.')
+            return
+
+        logger.info('Starting background job worker.')
+        try:
+            worker.run(poll_interval=options['poll_interval'])
+        except KeyboardInterrupt:
+            logger.info('Background job worker stopped.')
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.14 on 2026-10-16 19:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    initial = True
+
+    dependencies = [
+        ('main', '0005_course_database_registry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('kind', models.CharField(max_length=64)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('PND', 'Pending'), ('RUN', 'Running'),
+                                                     ('DON', 'Done'), ('ERR', 'Failed'),
+                                                     ('CNL', 'Cancelled')],
+                                            default='PND',
+                                            max_length=3)),
+                ('worker', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('progress', models.IntegerField(default=0)),
+                ('total', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True, default='')),
+                ('error', models.TextField(blank=True, default=None, null=True)),
+                ('result', models.JSONField(blank=True, default=None, null=True)),
+                ('cancel_requested', models.BooleanField(default=False)),
+                ('course', models.ForeignKey(blank=True, null=True,
+                                             on_delete=django.db.models.deletion.SET_NULL,
+                                             to='main.course')),
+                ('created_by', models.ForeignKey(blank=True, null=True,
+                                                 on_delete=django.db.models.deletion.SET_NULL,
+                                                 to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['pk'],
+                'indexes': [models.Index(condition=models.Q(('status', 'PND')), fields=['id'],
+                                         name='job_pending_idx')],
+            },
+        ),
+    ]
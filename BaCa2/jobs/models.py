@@ -0,0 +1,330 @@
+from __future__ import annotations
+
+import logging
+from contextlib import nullcontext
+from datetime import timedelta
+from typing import Any, Dict
+
+from django.conf import settings
+from django.db import models, transaction
+from django.urls import reverse
+from django.utils import timezone
+
+from core.choices import FINISHED_JOB_STATUSES, JobStatus
+from course.routing import InCourse
+from main.models import Course, User
+from util.models_registry import ModelsRegistry
+
+from .registry import get_job_handler
+
+logger = logging.getLogger(__name__)
+
+
+class JobManager(models.Manager):
+
+    def enqueue(self,
+                kind: str,
+                params: Dict[str, Any] = None,
+                user: int | str | User = None,
+                course: int | str | Course = None,
+                message: str = '') -> Job:
+        """
+        Queues a new job, which will be run by the job worker (see ``runJobs`` command). If
+        background jobs are disabled (``BACKGROUND_JOBS_POLICY.enabled``), the job is run at once
+        and the error which failed it is raised.
+
+        :param kind: Kind of the job (see :py:func:`jobs.registry.job_handler`)
+        :type kind: str
+        :param params: Keyword arguments passed to the job handler, have to be JSON serializable
+            (optional)
+        :type params: Dict[str, Any]
+        :param user: User who started the job (optional)
+        :type user: int | str | User
+        :param course: Course in which context the job is run (optional)
+        :type course: int | str | Course
+        :param message: Initial message describing the job (optional)
+        :type message: str
+
+        :return: The new job.
+        :rtype: Job
+
+        :raises ValueError: If no handler is registered for given kind of jobs.
+        :raises Exception: If background jobs are disabled and the job failed.
+        """
+        get_job_handler(kind)
+        job = self.create(
+            kind=kind,
+            params=params or {},
+            created_by=ModelsRegistry.get_user(user) if user is not None else None,
+            course=ModelsRegistry.get_course(course) if course is not None else None,
+            message=message,
+        )
+        if not settings.BACKGROUND_JOBS_POLICY.enabled:
+            job.start(worker='request')
+            job.run(raise_error=True)
+        return job
+
+    def claim(self, worker: str) -> Job | None:
+        """
+        Claims the oldest pending job. Claimed row is locked with ``SKIP LOCKED``, so many workers
+        can claim jobs at the same time.
+
+        :param worker: Identifier of the worker claiming the job
+        :type worker: str
+
+        :return: Claimed job (already marked as running) or None if no job is pending.
+        :rtype: Job | None
+        """
+        with transaction.atomic():
+            job = (self.select_for_update(skip_locked=True)
+                   .filter(status=JobStatus.PND)
+                   .order_by('pk')
+                   .first())
+            if job is None:
+                return None
+            job.start(worker)
+        return job
+
+    def fail_stale(self, timeout: float) -> int:
+        """
+        Marks running jobs which did not report progress for given time as failed - their worker
+        stopped running them. Such jobs are not run again, as their work may be done partially.
+
+        :param timeout: (in seconds) time after which running job is considered abandoned
+        :type timeout: float
+
+        :return: Amount of failed jobs.
+        :rtype: int
+        """
+        now = timezone.now()
+        return self.filter(
+            status=JobStatus.RUN,
+            heartbeat_at__lt=now - timedelta(seconds=timeout)
+        ).update(status=JobStatus.ERR, error='Job was abandoned by its worker', finished_at=now)
+
+
+class Job(models.Model):
+    """
+    Long operation (e.g. rejudging a task) run in the background by the job worker (see
+    :py:class:`jobs.worker.JobWorker`), outside the request which started it. The job reports its
+    progress, which can be checked with :py:func:`jobs.views.job_progress`, and can be cancelled -
+    a running job stops at the next progress report.
+    """
+
+    class Cancelled(Exception):
+        """
+        Raised in a running job when its cancellation was requested.
+        """
+        pass
+
+    #: kind of the job, selects its handler (see :py:func:`jobs.registry.job_handler`)
+    kind = models.CharField(max_length=64)
+    #: keyword arguments passed to the job handler
+    params = models.JSONField(default=dict, blank=True)
+    #: status of the job
+    status = models.CharField(max_length=3, choices=JobStatus.choices, default=JobStatus.PND)
+    #: course in which context the job is run
+    course = models.ForeignKey(Course, on_delete=models.SET_NULL, null=True, blank=True)
+    #: user who started the job
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    #: identifier of the worker running the job (``host:pid``)
+    worker = models.CharField(max_length=255, blank=True, default='')
+
+    #: date when the job was queued
+    created_at = models.DateTimeField(default=timezone.now)
+    #: date when the job was started
+    started_at = models.DateTimeField(null=True, blank=True)
+    #: date of the last progress report of the running job
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    #: date when the job was finished
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    #: amount of done steps
+    progress = models.IntegerField(default=0)
+    #: amount of all steps (0 if unknown)
+    total = models.IntegerField(default=0)
+    #: message describing current state of the job
+    message = models.TextField(blank=True, default='')
+    #: error which failed the job
+    error = models.TextField(null=True, blank=True, default=None)
+    #: value returned by the job handler
+    result = models.JSONField(null=True, blank=True, default=None)
+    #: if True, the running job stops at the next progress report
+    cancel_requested = models.BooleanField(default=False)
+
+    #: The manager for the Job model.
+    objects = JobManager()
+
+    class Meta:
+        ordering = ['pk']
+        indexes = [
+            models.Index(fields=['id'],
+                         condition=models.Q(status=JobStatus.PND),
+                         name='job_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f'Job {self.pk}: {self.kind} ({self.status})'
+
+    @property
+    def is_finished(self) -> bool:
+        """
+        :return: True if the job is done, failed or cancelled.
+        :rtype: bool
+        """
+        return self.status in FINISHED_JOB_STATUSES
+
+    def start(self, worker: str) -> None:
+        """
+        Marks the job as running.
+
+        :param worker: Identifier of the worker running the job
+        :type worker: str
+        """
+        now = timezone.now()
+        self.status = JobStatus.RUN
+        self.worker = worker
+        self.started_at = now
+        self.heartbeat_at = now
+        self.save(update_fields=['status', 'worker', 'started_at', 'heartbeat_at'])
+
+    def run(self, raise_error: bool = False) -> None:
+        """
+        Runs the started job with its handler (in the context of the job's course) and saves its
+        outcome - the result of the handler, the error which failed the job or its cancellation.
+        The outcome is saved only if the job is still running (it was not failed as abandoned).
+
+        :param raise_error: If True, the error which failed the job is raised after its outcome
+            is saved (optional)
+        :type raise_error: bool
+        """
+        error = None
+        try:
+            context = InCourse(self.course_id) if self.course_id is not None else nullcontext()
+            with context:
+                self.result = get_job_handler(self.kind)(self, **self.params)
+            self.status = JobStatus.DON
+            if self.total:
+                self.progress = self.total
+        except Job.Cancelled:
+            self.status = JobStatus.CNL
+        except Exception as e:
+            logger.exception(f'{self} failed: {e}')
+            self.status = JobStatus.ERR
+            self.error = str(e) or e.__class__.__name__
+            error = e
+        self.finished_at = timezone.now()
+        fields = ['status', 'result', 'progress', 'total', 'message', 'error', 'finished_at']
+        # the job may have been failed as abandoned meanwhile (see JobManager.fail_stale)
+        if not Job.objects.filter(pk=self.pk, status=JobStatus.RUN).update(
+            **{field: getattr(self, field) for field in fields}
+        ):
+            logger.warning(f'Job {self.pk} was finished by another process, its outcome is '
+                           f'discarded.')
+            self.refresh_from_db()
+        if raise_error and error is not None:
+            raise error
+
+    def set_total(self, total: int, message: str = None) -> None:
+        """
+        Sets the amount of steps of the running job.
+
+        :param total: Amount of all steps.
+        :type total: int
+        :param message: New message describing the job (optional)
+        :type message: str
+
+        :raises Job.Cancelled: If cancellation of the job was requested.
+        """
+        self.total = total
+        self.report(message=message)
+
+    def advance(self, steps: int = 1, message: str = None) -> None:
+        """
+        Reports progress of the running job. Cancelled job stops here.
+
+        :param steps: Amount of done steps (optional)
+        :type steps: int
+        :param message: New message describing the job (optional)
+        :type message: str
+
+        :raises Job.Cancelled: If cancellation of the job was requested.
+        """
+        self.progress += steps
+        self.report(message=message)
+
+    def report(self, message: str = None) -> None:
+        """
+        Saves progress of the running job and checks if its cancellation was requested.
+
+        :param message: New message describing the job (optional)
+        :type message: str
+
+        :raises Job.Cancelled: If cancellation of the job was requested.
+        """
+        if message is not None:
+            self.message = message
+        self.heartbeat_at = timezone.now()
+        Job.objects.filter(pk=self.pk).update(progress=self.progress,
+                                              total=self.total,
+                                              message=self.message,
+                                              heartbeat_at=self.heartbeat_at)
+        self.cancel_requested = Job.objects.filter(pk=self.pk).values_list(
+            'cancel_requested', flat=True
+        ).get()
+        if self.cancel_requested:
+            raise Job.Cancelled(f'{self} cancelled')
+
+    def cancel(self) -> bool:
+        """
+        Cancels the job - pending job is cancelled at once, running job stops at its next progress
+        report.
+
+        :return: False if the job is already finished, True otherwise.
+        :rtype: bool
+        """
+        now = timezone.now()
+        if Job.objects.filter(pk=self.pk, status=JobStatus.PND).update(status=JobStatus.CNL,
+                                                                       finished_at=now):
+            self.refresh_from_db()
+            return True
+        updated = Job.objects.filter(pk=self.pk, status=JobStatus.RUN).update(
+            cancel_requested=True
+        )
+        self.refresh_from_db()
+        return bool(updated)
+
+    def can_view(self, user: User) -> bool:
+        """
+        :param user: The user.
+        :type user: User
+
+        :return: True if the user started the job or is a superuser.
+        :rtype: bool
+        """
+        return user.is_superuser or (self.created_by_id is not None
+                                     and self.created_by_id == user.pk)
+
+    def get_data(self) -> dict:
+        """
+        :return: Data of the job, as returned by the progress endpoint.
+        :rtype: dict
+        """
+        return {
+            'id': self.pk,
+            'kind': self.kind,
+            'status': self.status,
+            'status_display': JobStatus(self.status).label,
+            'progress': self.progress,
+            'total': self.total,
+            'percent': round(100 * self.progress / self.total, 1) if self.total else None,
+            'message': self.message,
+            'error': self.error,
+            'result': self.result,
+            'cancel_requested': self.cancel_requested,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'progress_url': reverse('jobs:job-progress', args=[self.pk]),
+            'cancel_url': reverse('jobs:job-cancel', args=[self.pk]),
+        }
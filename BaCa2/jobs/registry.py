@@ -0,0 +1,45 @@
+from typing import Callable, Dict
+
+#: Job handlers registered by kind of job
+JOB_HANDLERS: Dict[str, Callable] = {}
+
+
+def job_handler(kind: str) -> Callable[[Callable], Callable]:
+    """
+    Registers decorated function as the handler of given kind of jobs. Handlers are called by
+    :py:meth:`jobs.models.Job.run` with the job as the first argument and job parameters as
+    keyword arguments. The value returned by a handler is saved as the job result, so it has to
+    be JSON serializable.
+
+    Handlers of installed apps should be defined in their ``jobs`` modules, which are imported on
+    startup.
+
+    :param kind: Kind of jobs handled by the function.
+    :type kind: str
+
+    :return: Decorator registering the handler.
+    :rtype: Callable[[Callable], Callable]
+    """
+    def decorator(func: Callable) -> Callable:
+        if kind in JOB_HANDLERS and JOB_HANDLERS[kind] is not func:
+            raise ValueError(f'Handler of {kind} jobs is already registered')
+        JOB_HANDLERS[kind] = func
+        return func
+
+    return decorator
+
+
+def get_job_handler(kind: str) -> Callable:
+    """
+    :param kind: Kind of jobs.
+    :type kind: str
+
+    :return: Handler of given kind of jobs.
+    :rtype: Callable
+
+    :raises ValueError: If no handler is registered for given kind of jobs.
+    """
+    try:
+        return JOB_HANDLERS[kind]
+    except KeyError:
+        raise ValueError(f'No handler registered for {kind} jobs')
@@ -0,0 +1,234 @@
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.test import RequestFactory, TestCase
+from django.utils import timezone
+
+from core.choices import JobStatus
+from course.jobs import reupload_task
+from course.models import Task
+from main.models import User
+from package.models import PackageInstance
+from util.responses import BaCa2JsonResponse
+
+from .models import Job
+from .registry import JOB_HANDLERS, get_job_handler, job_handler
+from .views import cancel_job, job_progress
+from .worker import JobWorker
+
+
+@job_handler('tests.count')
+def count(job: Job, amount: int) -> dict:
+    job.set_total(amount, message='Counting')
+    for _ in range(amount):
+        job.advance()
+    return {'counted': amount}
+
+
+@job_handler('tests.fail')
+def fail(job: Job) -> None:
+    raise RuntimeError('Job failed on purpose')
+
+
+@job_handler('tests.cancel_self')
+def cancel_self(job: Job) -> None:
+    job.set_total(2)
+    Job.objects.filter(pk=job.pk).update(cancel_requested=True)
+    job.advance()
+    job.advance()
+
+
+@job_handler('tests.abandoned')
+def abandoned(job: Job) -> dict:
+    Job.objects.fail_stale(-60)
+    return {'done': True}
+
+
+class JobTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1 = User.objects.create_user(email='job_user_1@uj.edu.pl', password='password')
+        cls.user_2 = User.objects.create_user(email='job_user_2@uj.edu.pl', password='password')
+
+    def setUp(self):
+        self.enterContext(patch.object(settings.BACKGROUND_JOBS_POLICY, 'enabled', True))
+        self.worker = JobWorker(name='test-worker')
+
+    def test_01_registry(self):
+        self.assertIs(get_job_handler('tests.count'), count)
+        self.assertIn('course.rejudge_task', JOB_HANDLERS)
+        self.assertIn('main.create_course', JOB_HANDLERS)
+        with self.assertRaises(ValueError):
+            get_job_handler('tests.unknown')
+        with self.assertRaises(ValueError):
+            job_handler('tests.count')(fail)
+        with self.assertRaises(ValueError):
+            Job.objects.enqueue('tests.unknown')
+
+    def test_02_run_job(self):
+        job = Job.objects.enqueue('tests.count', {'amount': 3}, user=self.user_1)
+        self.assertEqual(job.status, JobStatus.PND)
+        self.assertEqual(self.worker.run_once().pk, job.pk)
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.DON)
+        self.assertEqual(job.worker, 'test-worker')
+        self.assertEqual((job.progress, job.total), (3, 3))
+        self.assertEqual(job.result, {'counted': 3})
+        self.assertIsNotNone(job.finished_at)
+        self.assertIsNone(self.worker.run_once())
+
+    def test_03_jobs_run_in_order(self):
+        first = Job.objects.enqueue('tests.count', {'amount': 1})
+        second = Job.objects.enqueue('tests.count', {'amount': 1})
+        self.assertEqual(self.worker.run_once().pk, first.pk)
+        self.assertEqual(self.worker.run_once().pk, second.pk)
+
+    def test_04_failed_job(self):
+        job = Job.objects.enqueue('tests.fail')
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.ERR)
+        self.assertEqual(job.error, 'Job failed on purpose')
+        self.assertTrue(job.is_finished)
+
+    def test_05_cancel_pending_job(self):
+        job = Job.objects.enqueue('tests.count', {'amount': 1})
+        self.assertTrue(job.cancel())
+        self.assertEqual(job.status, JobStatus.CNL)
+        self.assertIsNone(self.worker.run_once())
+        self.assertFalse(job.cancel())
+
+    def test_06_cancel_running_job(self):
+        job = Job.objects.enqueue('tests.cancel_self')
+        self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.CNL)
+        self.assertEqual(job.progress, 1)
+
+    def test_07_stale_jobs_failed(self):
+        job = Job.objects.enqueue('tests.count', {'amount': 1})
+        job.start('dead-worker')
+        Job.objects.filter(pk=job.pk).update(heartbeat_at=timezone.now() - timedelta(hours=1))
+        self.assertIsNone(self.worker.run_once())
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.ERR)
+        self.assertEqual(Job.objects.fail_stale(60), 0)
+
+    def test_08_eager_mode(self):
+        with patch.object(settings.BACKGROUND_JOBS_POLICY, 'enabled', False):
+            job = Job.objects.enqueue('tests.count', {'amount': 2})
+        self.assertEqual(job.status, JobStatus.DON)
+        self.assertEqual(job.result, {'counted': 2})
+        self.assertIsNone(self.worker.run_once())
+
+    def test_09_abandoned_job_outcome_discarded(self):
+        job = Job.objects.enqueue('tests.abandoned')
+        with self.assertLogs('jobs.models', level='WARNING'):
+            self.worker.run_once()
+        job.refresh_from_db()
+        self.assertEqual(job.status, JobStatus.ERR)
+        self.assertEqual(job.error, 'Job was abandoned by its worker')
+        self.assertIsNone(job.result)
+
+    def test_10_eager_mode_error(self):
+        with patch.object(settings.BACKGROUND_JOBS_POLICY, 'enabled', False), \
+                self.assertLogs('jobs.models', level='ERROR'), \
+                self.assertRaisesMessage(RuntimeError, 'Job failed on purpose'):
+            Job.objects.enqueue('tests.fail')
+        job = Job.objects.get(kind='tests.fail')
+        self.assertEqual(job.status, JobStatus.ERR)
+        self.assertEqual(job.error, 'Job failed on purpose')
+
+
+class ReuploadTaskJobTest(TestCase):
+
+    def setUp(self):
+        self.enterContext(patch.object(settings.BACKGROUND_JOBS_POLICY, 'enabled', True))
+        self.job = Job.objects.enqueue('course.reupload_task')
+        self.job.start('test-worker')
+        self.zip_file = Path(self.enterContext(tempfile.TemporaryDirectory())) / 'package.zip'
+        self.zip_file.write_bytes(b'zip')
+        self.new_package_instance = MagicMock()
+        self.enterContext(patch.object(Task.objects, 'get'))
+        self.create = self.enterContext(patch.object(
+            PackageInstance.objects,
+            'create_package_instance_from_zip',
+            return_value=self.new_package_instance
+        ))
+        self.update_task = self.enterContext(patch.object(Task.objects, 'update_task'))
+
+    def reupload(self):
+        return reupload_task(self.job, task_id=1, zip_file=str(self.zip_file), user_id=1)
+
+    def test_01_cancelled_before_task_update(self):
+        def create(**kwargs):
+            Job.objects.filter(pk=self.job.pk).update(cancel_requested=True)
+            return self.new_package_instance
+
+        self.create.side_effect = create
+        with self.assertRaises(Job.Cancelled):
+            self.reupload()
+        self.update_task.assert_not_called()
+        self.new_package_instance.delete.assert_called_once_with(delete_files=True)
+        self.assertFalse(self.zip_file.exists())
+
+    def test_02_cleanup_error_does_not_mask_failure(self):
+        self.update_task.side_effect = RuntimeError('update failed')
+        self.new_package_instance.delete.side_effect = ValidationError('package is used')
+        with self.assertLogs('course.jobs', level='ERROR'), \
+                self.assertRaisesMessage(RuntimeError, 'update failed'):
+            self.reupload()
+        self.assertFalse(self.zip_file.exists())
+
+
+class JobViewsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user_1 = User.objects.create_user(email='job_user_1@uj.edu.pl', password='password')
+        cls.user_2 = User.objects.create_user(email='job_user_2@uj.edu.pl', password='password')
+
+    def setUp(self):
+        self.enterContext(patch.object(settings.BACKGROUND_JOBS_POLICY, 'enabled', True))
+        self.factory = RequestFactory()
+        self.job = Job.objects.enqueue('tests.count', {'amount': 2}, user=self.user_1)
+
+    def request(self, view, user, method='get'):
+        request = getattr(self.factory, method)(f'/jobs/{self.job.pk}/')
+        request.user = user
+        response = view(request, self.job.pk)
+        return json.loads(response.content)
+
+    def test_01_progress(self):
+        data = self.request(job_progress, self.user_1)
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+        self.assertEqual(data['job']['status'], JobStatus.PND)
+        self.assertEqual(data['job']['progress_url'], f'/jobs/{self.job.pk}/')
+
+        JobWorker().run_once()
+        data = self.request(job_progress, self.user_1)
+        self.assertEqual(data['job']['status'], JobStatus.DON)
+        self.assertEqual(data['job']['percent'], 100)
+
+    def test_02_other_user(self):
+        data = self.request(job_progress, self.user_2)
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+        data = self.request(cancel_job, self.user_2, method='post')
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.IMPERMISSIBLE.value)
+        self.job.refresh_from_db()
+        self.assertEqual(self.job.status, JobStatus.PND)
+
+    def test_03_cancel(self):
+        data = self.request(cancel_job, self.user_1)
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.INVALID.value)
+        data = self.request(cancel_job, self.user_1, method='post')
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.SUCCESS.value)
+        self.assertEqual(data['job']['status'], JobStatus.CNL)
+        data = self.request(cancel_job, self.user_1, method='post')
+        self.assertEqual(data['status'], BaCa2JsonResponse.Status.INVALID.value)
@@ -0,0 +1,10 @@
+from django.urls import path
+
+from .views import cancel_job, job_progress
+
+app_name = 'jobs'
+
+urlpatterns = [
+    path('<int:job_id>/', job_progress, name='job-progress'),
+    path('<int:job_id>/cancel/', cancel_job, name='job-cancel'),
+]
@@ -0,0 +1,65 @@
+from django.utils.translation import gettext_lazy as _
+
+from util.responses import BaCa2JsonResponse
+
+from .models import Job
+
+
+def _get_job(request, job_id: int) -> Job | BaCa2JsonResponse:
+    """
+    :param request: Request object.
+    :type request: HttpRequest
+    :param job_id: ID of the job.
+    :type job_id: int
+
+    :return: Job with given ID, or an error response if the job does not exist or the requesting
+        user is not allowed to see it.
+    :rtype: Job | BaCa2JsonResponse
+    """
+    if not request.user.is_authenticated:
+        return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.IMPERMISSIBLE,
+                                 message=_('You have to be logged in to see jobs.'))
+    job = Job.objects.filter(pk=job_id).first()
+    if job is None or not job.can_view(request.user):
+        return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.IMPERMISSIBLE,
+                                 message=_('Job not found.'))
+    return job
+
+
+def job_progress(request, job_id: int) -> BaCa2JsonResponse:
+    """
+    Functional view returning progress of a background job, available to the user who started the
+    job.
+
+    :return: JSON response with the job data (see :py:meth:`jobs.models.Job.get_data`).
+    :rtype: BaCa2JsonResponse
+    """
+    job = _get_job(request, job_id)
+    if isinstance(job, BaCa2JsonResponse):
+        return job
+    return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.SUCCESS,
+                             message=job.message,
+                             job=job.get_data())
+
+
+def cancel_job(request, job_id: int) -> BaCa2JsonResponse:
+    """
+    Functional view cancelling a background job (POST only), available to the user who started the
+    job.
+
+    :return: JSON response with the job data (see :py:meth:`jobs.models.Job.get_data`).
+    :rtype: BaCa2JsonResponse
+    """
+    if request.method != 'POST':
+        return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.INVALID,
+                                 message=_('Jobs can be cancelled only with POST requests.'))
+    job = _get_job(request, job_id)
+    if isinstance(job, BaCa2JsonResponse):
+        return job
+    if not job.cancel():
+        return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.INVALID,
+                                 message=_('Job is already finished.'),
+                                 job=job.get_data())
+    return BaCa2JsonResponse(status=BaCa2JsonResponse.Status.SUCCESS,
+                             message=_('Job cancelled.'),
+                             job=job.get_data())
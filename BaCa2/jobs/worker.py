@@ -0,0 +1,69 @@
+"""Contains the worker running queued background jobs."""
+
+import logging
+import os
+import socket
+from time import sleep
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from jobs.models import Job
+
+logger = logging.getLogger(__name__)
+
+
+class JobWorker:
+    """
+    Runs jobs queued by :py:meth:`jobs.models.JobManager.enqueue`, one at a time. Several workers
+    can run at the same time - claimed rows are locked with ``SKIP LOCKED``, so no job is run
+    twice. Running jobs which stopped reporting progress (e.g. their worker was killed) are marked
+    as failed (see :py:meth:`jobs.models.JobManager.fail_stale`).
+    """
+
+    def __init__(self, name: str = None):
+        """
+        :param name: identifier of the worker, defaults to ``host:pid`` (optional)
+        :type name: str
+        """
+        self.name = name or f'{socket.gethostname()}:{os.getpid()}'
+
+    def run_once(self) -> Job | None:
+        """
+        Claims and runs the oldest pending job.
+
+        :return: The finished job or None if no job was pending
+        :rtype: Job | None
+        """
+        failed = Job.objects.fail_stale(settings.BACKGROUND_JOBS_POLICY.stale_timeout)
+        if failed:
+            logger.warning(f'Marked {failed} abandoned jobs as failed.')
+
+        job = Job.objects.claim(self.name)
+        if job is None:
+            return None
+
+        logger.info(f'Running {job}.')
+        job.run()
+        logger.info(f'Finished {job}.')
+        return job
+
+    def run(self, poll_interval: float = None, max_cycles: int = None) -> None:
+        """
+        Runs jobs until interrupted. If the queue is empty, worker waits ``poll_interval`` seconds
+        before checking it again.
+
+        :param poll_interval: (in seconds) wait time for an empty queue, defaults to
+            ``BACKGROUND_JOBS_POLICY.poll_interval`` (optional)
+        :type poll_interval: float
+        :param max_cycles: if given, worker stops after this amount of cycles (optional)
+        :type max_cycles: int
+        """
+        poll_interval = poll_interval or settings.BACKGROUND_JOBS_POLICY.poll_interval
+        cycles = 0
+        while max_cycles is None or cycles < max_cycles:
+            close_old_connections()
+            job = self.run_once()
+            cycles += 1
+            if job is None:
+                sleep(poll_interval)
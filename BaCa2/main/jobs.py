@@ -0,0 +1,41 @@
+"""Background jobs of the main app (see :py:mod:`jobs`)."""
+
+from typing import Any, Dict
+
+from django.utils.translation import gettext_lazy as _
+
+from jobs.models import Job
+from jobs.registry import job_handler
+from main.models import Course
+
+
+@job_handler('main.create_course')
+def create_course(job: Job,
+                  name: str,
+                  short_name: str = '',
+                  usos_course_code: str | None = None,
+                  usos_term_code: str | None = None) -> Dict[str, Any]:
+    """
+    Creates a new course together with its database (see
+    :py:meth:`main.models.CourseManager.create_course`).
+
+    :param job: The running job.
+    :type job: Job
+    :param name: Name of the new course.
+    :type name: str
+    :param short_name: Short name of the new course (optional)
+    :type short_name: str
+    :param usos_course_code: Course code of the course in the USOS system (optional)
+    :type usos_course_code: str | None
+    :param usos_term_code: Term code of the course in the USOS system (optional)
+    :type usos_term_code: str | None
+
+    :return: ID and short name of the new course.
+    :rtype: Dict[str, Any]
+    """
+    job.set_total(1, message=str(_('Creating course database')))
+    course = Course.objects.create_course(name=name,
+                                          short_name=short_name,
+                                          usos_course_code=usos_course_code,
+                                          usos_term_code=usos_term_code)
+    return {'course_id': course.pk, 'short_name': course.short_name}
@@ -0,0 +1,47 @@
+# Generated by Django 5.0.14 on 2026-10-16 18:21
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def register_existing_databases(apps, schema_editor):
+    if schema_editor.connection.alias != 'default':
+        return
+
+    course_database_model = apps.get_model('main', 'CourseDatabase')
+    registry_model = apps.get_model('main', 'CourseDatabaseRegistry')
+    db_names = [db_name for db_name in settings.DATABASES if db_name != 'default']
+    if not db_names:
+        return
+    course_database_model.objects.bulk_create(
+        [course_database_model(name=db_name) for db_name in db_names],
+        ignore_conflicts=True
+    )
+    registry_model.objects.update_or_create(pk=1, defaults={'version': 1})
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('main', '0004_announcement_course'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDatabase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('name', models.CharField(max_length=63, unique=True)),
+                ('settings', models.JSONField(blank=True, default=dict)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CourseDatabaseRegistry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('version', models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(register_existing_databases, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,12 @@
 from __future__ import annotations
 
 from datetime import datetime
-from typing import Any, Callable, List
+from time import time_ns
+from typing import Any, Callable, Dict, List
 
 from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, Group, Permission
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
 from django.db.models import Sum
@@ -16,7 +18,7 @@ from core.choices import BasicModelAction, ModelAction, PermissionCheck, UserJob
 from core.tools.misc import try_getting_name_from_email
 from course.manager import create_course as create_course_db
 from course.manager import delete_course as delete_course_db
-from course.routing import InCourse
+from course.routing import InCourse, course_aliases
 from util.models import get_model_permissions, model_cls
 from util.models_registry import ModelsRegistry
 from util.other import replace_special_symbols
@@ -279,6 +281,7 @@ class CourseManager(models.Manager):
             admin_role=roles[-1]
         )
         course.save(using='default')
+        course_aliases.add(course.id, course.short_name)
         course.add_roles(roles)
         return course
 
@@ -1270,18 +1273,9 @@ class Course(models.Model):
         :rtype: int
         """
         from core.choices import OK_FINAL_STATUSES
-        from course.models import Task
-
-        tasks = Task.objects.filter(is_legacy=False)
-        cleared = 0
-
-        for task in tasks:
-            scored_submit = task.user_scored_submit(user)
+        from course.models import UserTaskScore
 
-            if scored_submit is not None and scored_submit.submit_status in OK_FINAL_STATUSES:
-                cleared += 1
-
-        return cleared
+        return UserTaskScore.objects.user_cleared_tasks(user, OK_FINAL_STATUSES)
 
     @inside_course(course_method=True)
     def get_member_submits_number(self, user: User | str | int) -> int:
@@ -1312,18 +1306,9 @@ class Course(models.Model):
         :return: The number of points gained by the given user in the course.
         :rtype: float
         """
-        from course.models import Task
-
-        tasks = Task.objects.filter(is_legacy=False)
-        score = 0
+        from course.models import UserTaskScore
 
-        for task in tasks:
-            task_score = task.user_score(user)
-
-            if task_score is not None:
-                score += task_score * task.points
-
-        return score
+        return UserTaskScore.objects.user_points(user)
 
     @inside_course(course_method=True)
     def get_member_points_percentage(self, user: User | str | int) -> float:
@@ -1346,10 +1331,117 @@ class Course(models.Model):
         """
         Delete the course, all its roles and its database.
         """
+        course_aliases.invalidate(self.short_name)
         delete_course_db(self.short_name)
         super().delete(using, keep_parents)
 
 
+class CoursePermissionCache:
+    """
+    Cache of course permission matrices - the role of a user within a course and the ids and
+    codenames of all permissions assigned to it - used by :py:meth:`User.has_course_permission`.
+
+    A matrix is loaded with a single query and kept on the user instance (so for the duration of
+    a request) and in the ``course_permissions`` cache for ``COURSE_PERMISSION_CACHE_TTL``
+    seconds. Cached matrices are keyed by a version of the course roles, which is changed by every
+    change of role permissions or members (see :py:class:`Role`), so outdated matrices are never
+    used by processes sharing the cache - with the default file based cache, all processes of one
+    host. Processes using another cache (e.g. on other hosts) may use outdated matrices for up to
+    ``COURSE_PERMISSION_CACHE_TTL`` seconds.
+
+    The version is read from the cache once per request (when the matrix is first needed) and kept
+    on the user instance together with the matrix. Changes made by the current process are seen
+    immediately, changes made by other processes - from the next request.
+    """
+
+    #: Alias of the cache storing versions and matrices (see ``CACHES`` setting)
+    CACHE_ALIAS = 'course_permissions'
+    VERSION_KEY = 'course_permissions_version:{course_id}'
+    MATRIX_KEY = 'course_permissions:{course_id}:{version}:{user_id}'
+
+    #: Versions of course roles set by the current process
+    _local_versions: Dict[int, int] = {}
+
+    @classmethod
+    def cache(cls):
+        """
+        :return: Cache storing versions and matrices.
+        :rtype: BaseCache
+        """
+        return caches[cls.CACHE_ALIAS]
+
+    @classmethod
+    def version(cls, course_id: int) -> int:
+        """
+        :param course_id: Id of the course.
+        :type course_id: int
+
+        :return: Current version of the course roles.
+        :rtype: int
+        """
+        return cls.cache().get_or_set(cls.VERSION_KEY.format(course_id=course_id), time_ns, None)
+
+    @classmethod
+    def invalidate(cls, course_id: int | None) -> None:
+        """
+        Changes the version of the course roles, making all cached matrices of the course outdated.
+        The version is changed again when the current transaction is committed, so matrices loaded
+        by other processes before the commit are not used either.
+
+        :param course_id: Id of the course (if None, nothing happens).
+        :type course_id: int | None
+        """
+        if course_id is None:
+            return
+
+        def bump():
+            version = time_ns()
+            cls._local_versions[course_id] = version
+            cls.cache().set(cls.VERSION_KEY.format(course_id=course_id), version, None)
+
+        bump()
+        transaction.on_commit(bump)
+
+    @classmethod
+    def get(cls, user: User, course: Course | str | int) -> dict:
+        """
+        Returns the permission matrix of the user within the course.
+
+        :param user: The user.
+        :type user: User
+        :param course: The course. Can be specified as either the course object, its short name or
+            its id.
+        :type course: Course | str | int
+
+        :return: Dictionary with the id of user's role (``None`` if the user is not a member of
+            the course) and sets of ``ids`` and ``codenames`` of the role permissions.
+        :rtype: dict
+        """
+        course_id = course_aliases.resolve_id(course)
+        request_cache = user.__dict__.setdefault('_course_permissions', {})
+        cached = request_cache.get(course_id)
+        if cached and cached[0] >= cls._local_versions.get(course_id, 0):
+            return cached[1]
+
+        version = cls.version(course_id)
+        key = cls.MATRIX_KEY.format(course_id=course_id, version=version, user_id=user.id)
+        matrix = cls.cache().get(key)
+        if matrix is None:
+            matrix = {'role': None, 'ids': set(), 'codenames': set()}
+            rows = Role.objects.filter(course_id=course_id, user=user).values_list(
+                'id', 'permissions__id', 'permissions__codename'
+            )
+            for role_id, permission_id, codename in rows:
+                matrix['role'] = role_id
+                if permission_id is not None:
+                    matrix['ids'].add(permission_id)
+                    matrix['codenames'].add(codename)
+            cls.cache().set(key, matrix, settings.COURSE_PERMISSION_CACHE_TTL)
+        # a version written concurrently by another process may be older than the local one
+        request_cache[course_id] = (max(version, cls._local_versions.get(course_id, 0)), matrix)
+        return matrix
+
+
 class Settings(models.Model):
     """
     This model represents a user's (:py:class:`User`) settings. It is used to store personal,
@@ -1571,7 +1663,7 @@ class User(AbstractBaseUser):
         :return: `True` if user has been assigned to the course, `False` otherwise.
         :rtype: bool
         """
-        return Role.objects.filter(user=self, course=ModelsRegistry.get_course(course)).exists()
+        return CoursePermissionCache.get(self, course)['role'] is not None
 
     def is_course_admin(self) -> bool:
         """
@@ -1807,10 +1899,19 @@ class User(AbstractBaseUser):
 
         :returns: `True` if the user has the permission or is superuser, `False` otherwise.
         :rtype: bool
+
+        :raises Course.CourseMemberError: If the user is not a member of the course.
         """
         if self.is_superuser:
             return True
-        return ModelsRegistry.get_course(course).user_role(self).has_permission(permission)
+        matrix = CoursePermissionCache.get(self, course)
+        if matrix['role'] is None:
+            raise Course.CourseMemberError('User is not a member of the course')
+        if isinstance(permission, str):
+            return permission in matrix['codenames']
+        if isinstance(permission, int):
+            return permission in matrix['ids']
+        return permission.id in matrix['ids']
 
     def has_course_action_permission(self, action: ModelAction, course: Course | str | int) -> bool:
         """
@@ -2114,6 +2215,7 @@ class Role(models.Model):
                                            f'to role {self} which already has it')
 
         self.permissions.add(permission)
+        CoursePermissionCache.invalidate(self.course_id)
 
     @transaction.atomic
     def add_permissions(self, permissions: List[Permission] | List[str] | List[int]) -> None:
@@ -2147,6 +2249,7 @@ class Role(models.Model):
                                            f'from role {self} which does not have it')
 
         self.permissions.remove(permission)
+        CoursePermissionCache.invalidate(self.course_id)
 
     @transaction.atomic
     def remove_permissions(self, permissions: List[Permission] | List[str] | List[int]) -> None:
@@ -2173,6 +2276,7 @@ class Role(models.Model):
         :type permissions: List[Permission] | List[str] | List[int]
         """
         self.permissions.clear()
+        CoursePermissionCache.invalidate(self.course_id)
         self.add_permissions(permissions)
 
     @transaction.atomic
@@ -2228,6 +2332,7 @@ class Role(models.Model):
                                        f'already assigned to it')
         if not user_is_member:
             self.user_set.add(user)
+            CoursePermissionCache.invalidate(self.course_id)
 
     @transaction.atomic
     def add_members(self,
@@ -2266,6 +2371,7 @@ class Role(models.Model):
                                        f'not assigned to it')
 
         self.user_set.remove(user)
+        CoursePermissionCache.invalidate(self.course_id)
 
     @transaction.atomic
     def remove_members(self, users: List[str] | List[int] | List[User]) -> None:
@@ -2288,6 +2394,7 @@ class Role(models.Model):
         """
         self.user_set.clear()
         self.permissions.clear()
+        CoursePermissionCache.invalidate(self.course_id)
         super().delete()
 
     def get_data(self) -> dict:
@@ -2630,3 +2737,93 @@ class Announcement(models.Model):
             }
 
         return res
+
+
+class CourseDatabaseManager(models.Manager):
+
+    def registry_version(self) -> int:
+        """
+        :return: Current version of the course database registry (0 if nothing was registered).
+        :rtype: int
+        """
+        version = CourseDatabaseRegistry.objects.filter(pk=1).values_list('version', flat=True)
+        return version.first() or 0
+
+    def _bump_version(self) -> int:
+        """
+        Increments the registry version, so other processes reload the registry.
+
+        :return: New registry version.
+        :rtype: int
+        """
+        CourseDatabaseRegistry.objects.get_or_create(pk=1)
+        CourseDatabaseRegistry.objects.filter(pk=1).update(version=models.F('version') + 1)
+        return self.registry_version()
+
+    @transaction.atomic
+    def register(self, name: str, db_settings: dict = None) -> int:
+        """
+        Registers (or updates) a course database.
+
+        :param name: Name (alias) of the course database.
+        :type name: str
+        :param db_settings: Custom settings of the database, other than the default ones.
+        :type db_settings: dict
+
+        :return: New registry version.
+        :rtype: int
+        """
+        self.update_or_create(name=name, defaults={'settings': db_settings or {}})
+        return self._bump_version()
+
+    @transaction.atomic
+    def unregister(self, name: str) -> int:
+        """
+        Removes a course database from the registry.
+
+        :param name: Name (alias) of the course database.
+        :type name: str
+
+        :return: New registry version.
+        :rtype: int
+        """
+        self.filter(name=name).delete()
+        return self._bump_version()
+
+    @transaction.atomic
+    def snapshot(self) -> tuple[int, dict[str, dict]]:
+        """
+        :return: Tuple (version, databases) - current registry version and custom settings of
+            all registered course databases, read in one transaction.
+        :rtype: tuple[int, dict[str, dict]]
+        """
+        return self.registry_version(), dict(self.values_list('name', 'settings'))
+
+
+class CourseDatabase(models.Model):
+    """
+    Course database registered by :py:class:`core.db.manager.DBManager`. The registry is shared by
+    all server processes - every change increments :py:class:`CourseDatabaseRegistry` version, so
+    processes reload it only if it was changed.
+    """
+
+    #: Name (alias) of the course database.
+    name = models.CharField(max_length=63, unique=True)
+    #: Custom settings of the database, other than the default ones.
+    settings = models.JSONField(default=dict, blank=True)
+
+    #: The manager for the CourseDatabase model.
+    objects = CourseDatabaseManager()
+
+    def __str__(self):
+        return f'CourseDatabase({self.name})'
+
+
+class CourseDatabaseRegistry(models.Model):
+    """
+    Single-row table with the version of the course database registry (see
+    :py:class:`CourseDatabase`).
+    """
+
+    #: Version incremented on every registry change.
+    version = models.BigIntegerField(default=0)
@@ -1,3 +1,7 @@
+from unittest.mock import patch
+
+from django.contrib.auth.models import Permission
+from django.core.cache import caches
 from django.core.exceptions import ValidationError
 from django.db import transaction
 from django.test import TestCase
@@ -5,7 +9,7 @@ from django.utils import timezone
 
 from course.models import Round, Submit, Task
 from course.routing import InCourse
-from main.models import Course, Role, RolePreset, User
+from main.models import Course, CoursePermissionCache, Role, RolePreset, User
 from package.models import PackageInstance
 
 
@@ -700,6 +704,7 @@ class TestCourseActions(TestCase):
     def tearDownClass(cls):
         cls.course_1.delete()
         cls.user_1.delete()
+        super().tearDownClass()
 
     def tearDown(self):
         with InCourse(self.course_1):
@@ -796,5 +801,85 @@ class TestCourseActions(TestCase):
         self.assertEqual(len(t.submits()), 0)
 
 
+class CoursePermissionCacheTest(TestCase):
+    course = None
+    role = None
+    user = None
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create_course(name='Permission cache', short_name='pc_1')
+        cls.course.create_role(name='viewer',
+                               permissions=[Course.CourseAction.VIEW_ROLE.label])
+        cls.role = cls.course.get_role('viewer')
+        cls.user = User.objects.create_user(email='pc_user@test.com', password='test')
+        cls.course.add_member(cls.user, cls.role)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.course.delete()
+        cls.user.delete()
+        super().tearDownClass()
+
+    def setUp(self):
+        caches[CoursePermissionCache.CACHE_ALIAS].clear()
+
+    def test_01_loaded_once(self):
+        view_role = Permission.objects.get(codename=Course.CourseAction.VIEW_ROLE.label)
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(1):
+            for course in (self.course, self.course.short_name, self.course.id):
+                self.assertTrue(user.has_course_permission(view_role.codename, course))
+                self.assertTrue(user.has_course_permission(view_role, course))
+                self.assertTrue(user.has_course_permission(view_role.id, course))
+                self.assertFalse(user.has_course_action_permission(
+                    Course.CourseAction.ADD_ROLE, course
+                ))
+                self.assertTrue(user.can_access_course(course))
+
+    def test_02_shared_between_requests(self):
+        User.objects.get(id=self.user.id).has_course_permission(
+            Course.CourseAction.VIEW_ROLE.label, self.course
+        )
+        user = User.objects.get(id=self.user.id)
+        with self.assertNumQueries(0):
+            self.assertTrue(user.has_course_permission(Course.CourseAction.VIEW_ROLE.label,
+                                                       self.course))
+
+    def test_03_permission_changes(self):
+        add_role = Course.CourseAction.ADD_ROLE.label
+        self.assertFalse(self.user.has_course_permission(add_role, self.course))
+        self.course.add_role_permissions(self.role, [add_role])
+        self.assertTrue(self.user.has_course_permission(add_role, self.course))
+        self.course.remove_role_permissions(self.role, [add_role])
+        self.assertFalse(self.user.has_course_permission(add_role, self.course))
+        self.course.change_role_permissions(self.role, [add_role])
+        self.assertTrue(self.user.has_course_permission(add_role, self.course))
+        self.assertFalse(self.user.has_course_permission(Course.CourseAction.VIEW_ROLE.label,
+                                                         self.course))
+
+    def test_04_membership_changes(self):
+        view_role = Course.CourseAction.VIEW_ROLE.label
+        self.assertTrue(self.user.has_course_permission(view_role, self.course))
+        self.course.make_member_admin(self.user)
+        self.assertTrue(self.user.has_course_permission(Course.CourseAction.DEL_ROLE.label,
+                                                        self.course))
+        self.course.remove_admin(self.user)
+        self.assertFalse(self.user.can_access_course(self.course))
+        with self.assertRaises(Course.CourseMemberError):
+            self.user.has_course_permission(view_role, self.course)
+
+    def test_05_version_read_once_per_request(self):
+        user = User.objects.get(id=self.user.id)
+        with patch.object(CoursePermissionCache, 'version',
+                          wraps=CoursePermissionCache.version) as version:
+            for _ in range(3):
+                self.assertTrue(user.has_course_permission(Course.CourseAction.VIEW_ROLE.label,
+                                                           self.course))
+            self.assertEqual(1, version.call_count)
+            User.objects.get(id=self.user.id).can_access_course(self.course)
+            self.assertEqual(2, version.call_count)
+
+
 class UserTest(TestCase):
     pass
@@ -1,6 +1,6 @@
 import logging
 import re
-from typing import Any, Dict, List
+from typing import Any, Dict
 
 from django.conf import settings
 from django.contrib.auth import logout, update_session_auth_hash
@@ -8,6 +8,7 @@ from django.contrib.auth.forms import PasswordChangeForm
 from django.contrib.auth.mixins import UserPassesTestMixin
 from django.contrib.auth.models import Permission
 from django.contrib.auth.views import LoginView
+from django.db.models import QuerySet
 from django.http import HttpResponseRedirect, JsonResponse
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
@@ -65,11 +66,20 @@ class CourseModelView(BaCa2ModelView):
 
     MODEL = Course
 
+    def get_ownership_filter(self, request, **kwargs) -> Dict[str, Any]:
+        """
+        :param request: HTTP GET request object received by the view.
+        :type request: HttpRequest
+        :return: Query parameters matching courses the requesting user is a member of.
+        :rtype: Dict[str, Any]
+        """
+        return {'role_set__user': request.user.pk}
+
     def check_get_filtered_permission(self,
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[Course],
+                                      query_result: QuerySet[Course],
                                       request,
                                       **kwargs) -> bool:
         """
@@ -86,18 +96,14 @@ class CourseModelView(BaCa2ModelView):
         :param serialize_kwargs: Kwargs passed to the serialization method of the model class
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
-        :param query_result: Query set retrieved using the specified query parameters evaluated to a
-            list.
-        :type query_result: List[:class:`Course`]
+        :param query_result: Query set retrieved using the specified query parameters.
+        :type query_result: QuerySet[:class:`Course`]
         :param request: HTTP GET request object received by the view.
         :type request: HttpRequest
-        :return: `True` if the user is a member of all courses retrieved by the query, `False`
-            otherwise.
+        :return: Always `True` - the user has to be a member of all courses retrieved by the
+            query, which is checked using :meth:`get_ownership_filter`.
         :rtype: bool
         """
-        for course in query_result:
-            if not course.user_is_member(request.user):
-                return False
         return True
 
     def post(self, request, **kwargs) -> BaCa2ModelResponse:
@@ -168,11 +174,13 @@ class UserModelView(BaCa2ModelView):
 
     MODEL = User
 
+    STREAM_CHUNK_SIZE = 500
+
     def check_get_filtered_permission(self,
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[User],
+                                      query_result: QuerySet[User],
                                       request,
                                       **kwargs) -> bool:
         """
@@ -189,9 +197,8 @@ class UserModelView(BaCa2ModelView):
         :param serialize_kwargs: Kwargs passed to the serialization method of the model class
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
-        :param query_result: Query set retrieved using the specified query parameters evaluated to a
-            list.
-        :type query_result: List[:class:`User`]
+        :param query_result: Query set retrieved using the specified query parameters.
+        :type query_result: QuerySet[:class:`User`]
         :param request: HTTP GET request object received by the view.
         :type request: HttpRequest
         :return: `True` if the user has the 'add_member' permission in one of their courses, if
@@ -252,7 +259,7 @@ class RoleModelView(BaCa2ModelView):
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[Role],
+                                      query_result: QuerySet[Role],
                                       request,
                                       **kwargs) -> bool:
         """
@@ -269,9 +276,8 @@ class RoleModelView(BaCa2ModelView):
         :param serialize_kwargs: Kwargs passed to the serialization method of the model class
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
-        :param query_result: Query set retrieved using the specified query parameters evaluated to a
-            list.
-        :type query_result: List[:class:`Role`]
+        :param query_result: Query set retrieved using the specified query parameters.
+        :type query_result: QuerySet[:class:`Role`]
         :param request: HTTP GET request object received by the view.
         :type request: HttpRequest
         :return: `True` if all retrieved roles belong to a course the user has the 'view_role'
@@ -1,7 +1,7 @@
 from django.apps import AppConfig
 
 from baca2PackageManager import Package
-from core.settings import PACKAGES
+from core.settings import PACKAGE_CACHE_POLICY, PACKAGES
 
 
 class PackageConfig(AppConfig):
@@ -10,9 +10,16 @@ class PackageConfig(AppConfig):
 
     def ready(self):
         from django.db.utils import ProgrammingError
+        if not PACKAGE_CACHE_POLICY.warm_up:
+            return
         try:
             from .models import PackageInstance
-            for instance in PackageInstance.objects.all():
-                PACKAGES[instance.key] = Package(instance.package_source.path, instance.commit)
+            instances = (PackageInstance.objects.select_related('package_source')
+                         .order_by('-pk')[:PACKAGE_CACHE_POLICY.max_packages])
+            PACKAGES.warm_up(
+                (instance.key,
+                 lambda instance=instance: Package(instance.package_source.path, instance.commit))
+                for instance in instances
+            )
         except ProgrammingError:
             pass
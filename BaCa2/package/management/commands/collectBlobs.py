@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from package.models import PackageInstance
+
+
+class Command(BaseCommand):
+    help = 'Removes stored package files no longer used by any package instance'  # noqa: A003
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orphaned-commits', action='store_true',
+                            help='Also remove package commit directories without package instance')
+
+    def handle(self, *args, **options):
+        removed, freed = PackageInstance.objects.collect_garbage(
+            remove_orphaned_commits=options['orphaned_commits']
+        )
+        self.stdout.write(f'Removed {removed} blobs ({freed} bytes).')
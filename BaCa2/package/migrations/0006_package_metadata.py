@@ -0,0 +1,90 @@
+# Generated by Django 5.0.14 on 2026-10-16 18:54
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ('package', '0005_alter_packageinstance_pdf_docs_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PackageMetadata',
+            fields=[
+                ('package_instance',
+                 models.OneToOneField(on_delete=django.db.models.deletion.CASCADE,
+                                      primary_key=True, related_name='indexed_metadata',
+                                      serialize=False, to='package.packageinstance')),
+                ('title', models.CharField(max_length=1023)),
+                ('points', models.FloatField()),
+                ('cpus', models.IntegerField(default=None, null=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PackageExtension',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('extension', models.CharField(max_length=31)),
+                ('metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                               related_name='extensions',
+                                               to='package.packagemetadata')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PackageDocument',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('extension', models.CharField(max_length=31)),
+                ('file_name', models.CharField(max_length=511)),
+                ('metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                               related_name='documents',
+                                               to='package.packagemetadata')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PackageSetMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('weight', models.FloatField()),
+                ('metadata', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                               related_name='sets',
+                                               to='package.packagemetadata')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PackageTestMetadata',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False,
+                                           verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('time_limit', models.FloatField()),
+                ('memory_limit', models.BigIntegerField()),
+                ('test_set', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE,
+                                               related_name='tests',
+                                               to='package.packagesetmetadata')),
+            ],
+            options={
+                'ordering': ['pk'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='packagesetmetadata',
+            constraint=models.UniqueConstraint(fields=('metadata', 'name'),
+                                               name='unique_package_set_name'),
+        ),
+    ]
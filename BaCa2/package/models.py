@@ -1,7 +1,8 @@
 from __future__ import annotations
 
+import shutil
 from pathlib import Path
-from typing import List
+from typing import List, Tuple
 
 from django.conf import settings
 from django.core.exceptions import ValidationError
@@ -9,13 +10,36 @@ from django.db import models, transaction
 from django.utils import timezone
 
 from baca2PackageManager import Package
+from baca2PackageManager.manager_exceptions import InvalidFileExtension
+from baca2PackageManager.tools import bytes_from_str
 from baca2PackageManager.validators import isStr
-from core.tools.files import MediaFileHandler
+from baca2PackageManager.zipper import Zip
 from core.tools.misc import random_id
+from core.tools.rendered_markup import rendered_markup
 from main.models import User
 from util.models_registry import ModelsRegistry
 
 
+def link_to_media(path: Path | None, upload_to: str) -> str | None:
+    """
+    It links a package file into the media directory through the blob store, so that package
+    instances with the same file share a single copy of it.
+
+    :param path: Path to the file (if None or not a file, nothing is linked)
+    :type path: Path | None
+    :param upload_to: Media subdirectory in which the file is linked
+    :type upload_to: str
+
+    :return: Name of the linked file relative to the media directory (to be assigned to a file
+        field), or None.
+    :rtype: str | None
+    """
+    if path is None or not path.is_file():
+        return None
+    media_root = Path(settings.MEDIA_ROOT)
+    return settings.BLOBS.link(path, media_root / upload_to).relative_to(media_root).as_posix()
+
+
 class PackageSourceManager(models.Manager):
     """
     PackageSourceManager is a manager for the PackageSource class
@@ -231,10 +255,10 @@ class PackageInstanceManager(models.Manager):
         """
         package_source = ModelsRegistry.get_package_source(package_source)
         package_instance = self.model(package_source=package_source, commit=commit)
-        settings.PACKAGES[PackageInstance.commit_msg(package_source, commit)] = Package(
-            package_source.path,
-            commit)
+        package = Package(package_source.path, commit)
+        settings.PACKAGES[PackageInstance.commit_msg(package_source, commit)] = package
         package_instance.save()
+        PackageMetadata.objects.index_package(package_instance, package)
         if creator:
             PackageInstanceUser.objects.create_package_instance_user(creator, package_instance)
         return package_instance
@@ -278,27 +302,28 @@ class PackageInstanceManager(models.Manager):
         :return: A new PackageInstance object.
         """
         package_instance = ModelsRegistry.get_package_instance(package_instance)
+        package_source = package_instance.package_source
         new_commit = f'{timezone.now().timestamp()}'
 
-        new_package = package_instance.package.make_commit(new_commit)
+        settings.BLOBS.materialize(package_instance.path, package_source.path / new_commit)
+        new_package = Package(package_source.path, new_commit)
         new_package.check_package()
 
-        commit_msg = PackageInstance.commit_msg(package_instance.package_source, new_commit)
+        commit_msg = PackageInstance.commit_msg(package_source, new_commit)
         settings.PACKAGES[commit_msg] = new_package
 
         try:
             pdf_docs = new_package.doc_path('pdf')
         except FileNotFoundError:
             pdf_docs = None
-        doc = MediaFileHandler(pdf_docs, 'pdf', nullable=True)
 
-        with doc.file as doc_file:
-            new_instance = self.model(
-                package_source=package_instance.package_source,
-                commit=new_commit,
-                pdf_docs=doc_file
-            )
-            new_instance.save()
+        new_instance = self.model(
+            package_source=package_source,
+            commit=new_commit,
+            pdf_docs=link_to_media(pdf_docs, 'task_descriptions')
+        )
+        new_instance.save()
+        PackageMetadata.objects.index_package(new_instance, new_package)
 
         if copy_permissions:
             for user in package_instance.permitted_users:
@@ -351,21 +376,21 @@ class PackageInstanceManager(models.Manager):
         package_source = ModelsRegistry.get_package_source(package_source)
         commit_name = f'from_zip_{random_id()}'
         pkg = Package.create_from_zip(package_source.path, commit_name, zip_file, overwrite)
+        settings.BLOBS.dedupe_tree(pkg.commit_path)
         settings.PACKAGES[PackageInstance.commit_msg(package_source, commit_name)] = pkg
 
         try:
             pdf_docs = pkg.doc_path('pdf')
         except FileNotFoundError:
             pdf_docs = None
-        doc = MediaFileHandler(pdf_docs, 'pdf', nullable=True)
 
-        with doc.file as doc_file:
-            package_instance = self.model(
-                package_source=package_source,
-                commit=commit_name,
-                pdf_docs=doc_file
-            )
-            package_instance.save()
+        package_instance = self.model(
+            package_source=package_source,
+            commit=commit_name,
+            pdf_docs=link_to_media(pdf_docs, 'task_descriptions')
+        )
+        package_instance.save()
+        PackageMetadata.objects.index_package(package_instance, pkg)
 
         if permissions_from_instance:
             permissions_from_instance = ModelsRegistry.get_package_instance(
@@ -376,6 +401,44 @@ class PackageInstanceManager(models.Manager):
             PackageInstanceUser.objects.create_package_instance_user(creator, package_instance)
         return package_instance
 
+    def collect_garbage(self, remove_orphaned_commits: bool = False) -> Tuple[int, int]:
+        """
+        It removes blobs of the blob store which are no longer used by any package instance.
+        Media files linked through the blob store (see :func:`link_to_media`) which are not
+        referenced by any package instance or attachment are unlinked first.
+
+        :param remove_orphaned_commits: If True, commit directories of package sources which do
+            not belong to any package instance are removed too
+        :type remove_orphaned_commits: bool
+
+        :return: Number of removed blobs and (in bytes) their total size.
+        :rtype: Tuple[int, int]
+        """
+        media_root = Path(settings.MEDIA_ROOT)
+        used_media = set(self.exclude(pdf_docs='').exclude(pdf_docs=None)
+                         .values_list('pdf_docs', flat=True))
+        used_media.update(PackageInstanceAttachment.objects.exclude(path='').exclude(path=None)
+                          .values_list('path', flat=True))
+        for upload_to in ('task_descriptions', 'attachments'):
+            for media_file in (media_root / upload_to).glob('*/*'):
+                if len(media_file.parent.name) != 64 or not media_file.is_file():
+                    continue
+                if media_file.relative_to(media_root).as_posix() not in used_media:
+                    media_file.unlink()
+                    if not any(media_file.parent.iterdir()):
+                        media_file.parent.rmdir()
+
+        if remove_orphaned_commits:
+            for package_source in PackageSource.objects.prefetch_related('packageinstance_set'):
+                commits = {instance.commit for instance in package_source.packageinstance_set.all()}
+                if not package_source.path.is_dir():
+                    continue
+                for commit_path in package_source.path.iterdir():
+                    if commit_path.is_dir() and commit_path.name not in commits:
+                        shutil.rmtree(commit_path)
+
+        return settings.BLOBS.collect_garbage()
+
     def exists_validator(self, pkg_id: int) -> bool:
         """
         If the package with the given ID exists, return True, otherwise return False
@@ -438,12 +501,24 @@ class PackageInstance(models.Model):
 
         :return: The package object.
         """
-        package_id = self.key
-        pkg = settings.PACKAGES.get(package_id)
-        if pkg is None:
-            pkg = Package(self.package_source.path, self.commit)
-            settings.PACKAGES[package_id] = pkg
-        return pkg
+        return settings.PACKAGES.get_or_load(
+            self.key,
+            lambda: Package(self.package_source.path, self.commit)
+        )
+
+    @property
+    def metadata(self) -> PackageMetadata:
+        """
+        It returns the metadata of the package stored in the database. Metadata of package
+        instances created before the metadata was stored is read from the package once.
+
+        :return: Metadata of the package.
+        :rtype: PackageMetadata
+        """
+        try:
+            return self.indexed_metadata
+        except PackageMetadata.DoesNotExist:
+            return PackageMetadata.objects.index_package(self)
 
     @property
     def path(self) -> Path:
@@ -491,7 +566,7 @@ class PackageInstance(models.Model):
             # deleting instance in source directory
             if delete_files:
                 self.package.delete()
-            settings.PACKAGES.pop(self.key)
+            settings.PACKAGES.pop(self.key, None)
 
             # deleting package instance attachments
             PackageInstanceAttachment.objects.delete_package_instance_attachments(self)
@@ -499,6 +574,8 @@ class PackageInstance(models.Model):
             # self delete instance
             super().delete(using, keep_parents)
 
+        rendered_markup.discard(self.path / 'doc')
+
     @property
     def permitted_users(self) -> List[User]:
         """
@@ -568,17 +645,14 @@ class PackageInstanceAttachmentManager(models.Manager):
         package_instance = ModelsRegistry.get_package_instance(package_instance)
         attachments = package_instance.package.get_attachments()
         for attachment in attachments:
-            att = MediaFileHandler(
-                path=attachment,
-                extension=attachment.suffix[1:],
+            if not attachment.is_file():
+                raise FileNotFoundError('The path does not exist or is not a directory')
+            pi_attachment = self.model(
+                package_instance=package_instance,
+                name=attachment.name,
+                path=link_to_media(attachment, 'attachments')
             )
-            with att.file as attachment_file:
-                pi_attachment = self.model(
-                    package_instance=package_instance,
-                    name=attachment.name,
-                    path=attachment_file
-                )
-                pi_attachment.save()
+            pi_attachment.save()
             static_attachments.append(pi_attachment)
         return static_attachments
 
@@ -614,3 +688,236 @@ class PackageInstanceAttachment(models.Model):
 
     def __str__(self):
         return f'PackageInstanceAttachment {self.pk}: {self.name}: \n{self.package_instance}'
+
+
+class PackageMetadataManager(models.Manager):
+    """
+    PackageMetadataManager is a manager for the PackageMetadata class
+    """
+
+    @transaction.atomic
+    def index_package(self,
+                      package_instance: int | PackageInstance,
+                      package: Package = None) -> PackageMetadata:
+        """
+        It reads the package of the package instance and stores its metadata (allowed extensions,
+        description formats, test sets and tests with their limits) in the database. Previously
+        stored metadata of the package instance is replaced. Markdown task descriptions are
+        rendered into the rendered descriptions cache.
+
+        :param package_instance: The package instance
+        :type package_instance: int | PackageInstance
+        :param package: Already loaded package of the package instance (optional)
+        :type package: Package
+
+        :return: Metadata of the package instance.
+        :rtype: PackageMetadata
+        """
+        package_instance = ModelsRegistry.get_package_instance(package_instance)
+        if package is None:
+            package = package_instance.package
+        self.filter(package_instance=package_instance).delete()
+
+        metadata = self.create(package_instance=package_instance,
+                               title=package['title'],
+                               points=package['points'],
+                               cpus=package['cpus'])
+        PackageExtension.objects.bulk_create(
+            PackageExtension(metadata=metadata, extension=extension)
+            for extension in package['allowedExtensions']
+        )
+
+        documents = []
+        for extension in Package.DocExtension:
+            try:
+                doc_path = package.doc_path(extension)
+            except FileNotFoundError:
+                continue
+            documents.append(PackageDocument(metadata=metadata,
+                                             extension=extension.value,
+                                             file_name=doc_path.name))
+        PackageDocument.objects.bulk_create(documents)
+        rendered_markup.warm(package_instance.path / 'doc' / document.file_name
+                             for document in documents)
+
+        for t_set in package.sets():
+            set_metadata = PackageSetMetadata.objects.create(metadata=metadata,
+                                                             name=t_set['name'],
+                                                             weight=t_set['weight'])
+            PackageTestMetadata.objects.bulk_create(
+                PackageTestMetadata(test_set=set_metadata,
+                                    name=test['name'],
+                                    time_limit=test['time_limit'],
+                                    memory_limit=bytes_from_str(test['memory_limit']))
+                for test in t_set.tests()
+            )
+        return metadata
+
+
+class PackageMetadata(models.Model):
+    """
+    Metadata of a package instance, read from its package once and stored in the database, so
+    that it can be used without loading the package from disk.
+    """
+    #: The package instance described by the metadata
+    package_instance = models.OneToOneField(PackageInstance,
+                                            on_delete=models.CASCADE,
+                                            primary_key=True,
+                                            related_name='indexed_metadata')
+    #: title of the package
+    title = models.CharField(max_length=1023)
+    #: default amount of points for tasks using the package
+    points = models.FloatField()
+    #: number of cpus used to judge submits
+    cpus = models.IntegerField(null=True, default=None)
+    #: manager for the PackageMetadata class
+    objects = PackageMetadataManager()
+
+    def __str__(self):
+        return f'PackageMetadata {self.pk}: {self.title}'
+
+    @property
+    def allowed_extensions(self) -> List[str]:
+        """
+        :return: Extensions of source code files accepted by the package.
+        :rtype: List[str]
+        """
+        return [extension.extension for extension in self.extensions.all()]
+
+    @property
+    def test_sets(self) -> List[PackageSetMetadata]:
+        """
+        :return: Test sets of the package, with their tests prefetched.
+        :rtype: List[PackageSetMetadata]
+        """
+        return list(self.sets.prefetch_related('tests'))
+
+    def check_source(self, source_code: Path) -> None:
+        """
+        It checks if the source code file (or files in a zip) have extensions allowed by the
+        package. Works like :meth:`Package.check_source`.
+
+        :param source_code: The path to the source code
+        :type source_code: Path
+
+        :raise FileNotFoundError: If the source code file does not exist.
+        :raise InvalidFileExtension: If the file (or a zipped file) has invalid extension.
+        """
+        if not source_code.is_file():
+            raise FileNotFoundError('File not found')
+        allowed_extensions = self.allowed_extensions
+        if source_code.suffix[1:] not in allowed_extensions:
+            if source_code.suffix[1:].lower() == 'zip':
+                with Zip(source_code) as zip_f:
+                    if not zip_f.check_extensions(allowed_extensions):
+                        raise InvalidFileExtension('Zipped file contains files with invalid '
+                                                   'extension')
+            else:
+                raise InvalidFileExtension('Submitted file has invalid extension')
+
+    def doc_extension(self) -> str:
+        """
+        :return: The extension of the task description file (the first found, in the order of
+            :class:`Package.DocExtension`).
+        :rtype: str
+
+        :raise FileNotFoundError: If the package has no task description file.
+        """
+        document = self.documents.first()
+        if document is None:
+            raise FileNotFoundError(f'No task description file found for {self.title}')
+        return document.extension
+
+    def doc_has_extension(self, extension: str) -> bool:
+        """
+        :param extension: The extension of the task description file
+        :type extension: str
+        :return: True if the package has task description file with the given extension.
+        :rtype: bool
+        """
+        return self.documents.filter(extension=extension.lower()).exists()
+
+    def doc_path(self, extension: str) -> Path:
+        """
+        :param extension: The extension of the task description file
+        :type extension: str
+        :return: The path to the task description file with the given extension.
+        :rtype: Path
+
+        :raise FileNotFoundError: If the package has no task description file with the given
+            extension.
+        """
+        document = self.documents.filter(extension=extension.lower()).first()
+        if document is None:
+            raise FileNotFoundError(f'"{extension}" is not valid extension for {self.title} '
+                                    f'task description')
+        return self.package_instance.path / 'doc' / document.file_name
+
+
+class PackageExtension(models.Model):
+    """
+    Extension of source code files accepted by a package.
+    """
+    #: foreign key to the PackageMetadata class :py:class:`PackageMetadata`
+    metadata = models.ForeignKey(PackageMetadata,
+                                 on_delete=models.CASCADE,
+                                 related_name='extensions')
+    #: the accepted extension
+    extension = models.CharField(max_length=31)
+
+    class Meta:
+        ordering = ['pk']
+
+
+class PackageDocument(models.Model):
+    """
+    Task description file of a package.
+    """
+    #: foreign key to the PackageMetadata class :py:class:`PackageMetadata`
+    metadata = models.ForeignKey(PackageMetadata,
+                                 on_delete=models.CASCADE,
+                                 related_name='documents')
+    #: extension (format) of the description
+    extension = models.CharField(max_length=31)
+    #: name of the description file (in the ``doc`` directory of the package)
+    file_name = models.CharField(max_length=511)
+
+    class Meta:
+        ordering = ['pk']
+
+
+class PackageSetMetadata(models.Model):
+    """
+    Test set of a package.
+    """
+    #: foreign key to the PackageMetadata class :py:class:`PackageMetadata`
+    metadata = models.ForeignKey(PackageMetadata, on_delete=models.CASCADE, related_name='sets')
+    #: name of the test set
+    name = models.CharField(max_length=255)
+    #: weight of the test set in the task score
+    weight = models.FloatField()
+
+    class Meta:
+        ordering = ['pk']
+        constraints = [
+            models.UniqueConstraint(fields=['metadata', 'name'], name='unique_package_set_name'),
+        ]
+
+
+class PackageTestMetadata(models.Model):
+    """
+    Test of a package test set.
+    """
+    #: foreign key to the PackageSetMetadata class :py:class:`PackageSetMetadata`
+    test_set = models.ForeignKey(PackageSetMetadata,
+                                 on_delete=models.CASCADE,
+                                 related_name='tests')
+    #: name of the test
+    name = models.CharField(max_length=255)
+    #: time limit of the test in seconds
+    time_limit = models.FloatField()
+    #: memory limit of the test in bytes
+    memory_limit = models.BigIntegerField()
+
+    class Meta:
+        ordering = ['pk']
@@ -1,10 +1,20 @@
 import shutil
+import tempfile
+from pathlib import Path
+from threading import Thread
+from unittest.mock import PropertyMock, patch
 
 from django.conf import settings
-from django.test import TestCase
+from django.test import SimpleTestCase, TestCase, override_settings
 
+from baca2PackageManager.manager_exceptions import InvalidFileExtension
+from baca2PackageManager.tools import bytes_from_str
+from core.tools.blob_store import BlobStore
+from core.tools.package_cache import PackageCache, estimate_size
+from core.tools.rendered_markup import RenderedMarkupCache, render_markdown, rendered_markup
 from main.models import User
 from parameterized import parameterized
+from widgets.text_display import MarkupDisplayer
 
 from .models import *
 
@@ -19,6 +29,13 @@ class TestPackage(TestCase):
         cls.user2 = User.objects.create_user('test2@test.com', 'test')
         cls.zip_file = settings.PACKAGES_DIR / 'test_pkg.zip'
 
+    def setUp(self):
+        blobs_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(BLOBS=BlobStore(Path(blobs_dir),
+                                                            mutable_names=('config.yml',))))
+        rendered_dir = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(RENDERED_DESCRIPTIONS_DIR=Path(rendered_dir)))
+
     def tearDown(self):
         PackageInstance.objects.all().delete()
         PackageSource.objects.all().delete()
@@ -185,3 +202,270 @@ class TestPackage(TestCase):
                 shutil.rmtree(pkg_src.path)
                 pkg_src.delete()
             raise e
+
+    def test_06_package_reloaded_after_eviction(self):
+        instance = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        settings.PACKAGES.pop(instance.key)
+        self.assertNotIn(instance.key, settings.PACKAGES)
+        self.assertEqual(instance.package['title'], 'Liczby Doskonałe')
+        self.assertIn(instance.key, settings.PACKAGES)
+        self.assertGreater(estimate_size(instance.package), 0)
+
+    def test_07_package_metadata(self):
+        instance = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        package = instance.package
+        metadata = PackageMetadata.objects.get(package_instance=instance)
+        self.assertEqual(metadata.title, package['title'])
+        self.assertEqual(metadata.points, package['points'])
+        self.assertEqual(metadata.allowed_extensions, package['allowedExtensions'])
+        self.assertEqual(metadata.doc_extension(), package.doc_extension())
+        self.assertEqual(metadata.doc_path('pdf'), package.doc_path('pdf'))
+        self.assertFalse(metadata.doc_has_extension('rtf'))
+
+        sets = {set_metadata.name: set_metadata for set_metadata in metadata.test_sets}
+        self.assertEqual(set(sets.keys()), {t_set['name'] for t_set in package.sets()})
+        for t_set in package.sets():
+            set_metadata = sets[t_set['name']]
+            self.assertEqual(set_metadata.weight, t_set['weight'])
+            tests = {test.name: test for test in set_metadata.tests.all()}
+            self.assertEqual(set(tests.keys()), {test['name'] for test in t_set.tests()})
+            for test in t_set.tests():
+                self.assertEqual(tests[test['name']].time_limit, test['time_limit'])
+                self.assertEqual(tests[test['name']].memory_limit,
+                                 bytes_from_str(test['memory_limit']))
+
+        # metadata of package instances indexed before is rebuilt when first needed
+        metadata.delete()
+        instance.refresh_from_db()
+        self.assertEqual(instance.metadata.title, package['title'])
+
+    def test_08_check_source_with_metadata(self):
+        instance = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        source = settings.UPLOAD_DIR / 'metadata_check.cpp'
+        invalid_source = settings.UPLOAD_DIR / 'metadata_check.py'
+        try:
+            source.write_text('int main() {}')
+            invalid_source.write_text('print()')
+            with patch.object(PackageInstance, 'package', new_callable=PropertyMock,
+                              side_effect=AssertionError('package read')):
+                instance.metadata.check_source(source)
+                with self.assertRaises(InvalidFileExtension):
+                    instance.metadata.check_source(invalid_source)
+                with self.assertRaises(FileNotFoundError):
+                    instance.metadata.check_source(settings.UPLOAD_DIR / 'missing.cpp')
+        finally:
+            source.unlink(missing_ok=True)
+            invalid_source.unlink(missing_ok=True)
+
+    def test_09_descriptions_rendered_on_creation(self):
+        instance = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        description = instance.metadata.doc_path('md')
+        render_path = rendered_markup.render_path(description)
+        self.assertTrue(render_path.is_file())
+        hits = rendered_markup.hits
+        displayer = MarkupDisplayer(name='description',
+                                    file_path=description,
+                                    pdf_download_name='description.pdf')
+        self.assertEqual(rendered_markup.hits, hits + 1)
+        self.assertEqual(displayer.content, render_markdown(description))
+
+        instance.delete()
+        self.assertFalse(render_path.parent.exists())
+
+    def test_10_commit_shares_files(self):
+        pkg = PackageInstance.objects.create_source_and_instance('dosko', '1')
+        new_pkg = PackageInstance.objects.make_package_instance_commit(pkg)
+        try:
+            test_file = Path('tests', 'set0', 'dosko0a.in')
+            self.assertTrue((new_pkg.path / test_file).samefile(pkg.path / test_file))
+            self.assertFalse((new_pkg.path / 'config.yml').samefile(pkg.path / 'config.yml'))
+            self.assertEqual((new_pkg.path / 'config.yml').read_text(),
+                             (pkg.path / 'config.yml').read_text())
+            self.assertEqual(new_pkg.package['title'], 'Liczby Doskonałe')
+
+            newest_pkg = PackageInstance.objects.make_package_instance_commit(new_pkg)
+            self.assertTrue(newest_pkg.pdf_docs_path.samefile(pkg.path / 'doc' / 'doskozad.pdf'))
+            self.assertEqual(newest_pkg.pdf_docs.name, new_pkg.pdf_docs.name)
+            newest_pkg.delete(delete_files=True)
+        finally:
+            shutil.rmtree(new_pkg.path)
+            new_pkg.delete()
+
+    def test_11_reupload_deduplicated(self):
+        pkg_src = PackageSource.objects.create_package_source('dosko')
+        pkg = PackageInstance.objects.create_package_instance_from_zip(pkg_src, self.zip_file)
+        reuploaded = PackageInstance.objects.create_package_instance_from_zip(pkg_src,
+                                                                              self.zip_file)
+        test_file = Path('tests', 'set1', '1.in')
+        self.assertTrue((reuploaded.path / test_file).samefile(pkg.path / test_file))
+        self.assertEqual(reuploaded.package['title'], 'zip test pkg')
+
+        pkg.delete(delete_files=True)
+        self.assertEqual(PackageInstance.objects.collect_garbage(), (0, 0))
+        reuploaded.delete(delete_files=True)
+        removed, freed = PackageInstance.objects.collect_garbage()
+        self.assertGreater(removed, 0)
+        self.assertEqual(list(settings.BLOBS.root.iterdir()), [])
+
+
+class BlobStoreTest(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = Path(self.enterContext(tempfile.TemporaryDirectory()))
+        self.store = BlobStore(self.dir / 'blobs', mutable_names=('config.yml',))
+        self.tree = self.dir / 'tree'
+        (self.tree / 'tests').mkdir(parents=True)
+        for name, content in (('1.in', 'data'), ('2.in', 'data'), ('1.out', 'other'),
+                              ('2.out', ''), ('config.yml', 'data')):
+            (self.tree / 'tests' / name).write_text(content)
+
+    def test_01_dedupe_tree(self):
+        self.assertEqual(self.store.dedupe_tree(self.tree), len('data'))
+        tests = self.tree / 'tests'
+        self.assertTrue((tests / '1.in').samefile(tests / '2.in'))
+        self.assertTrue((tests / '1.in').samefile(self.store.add(tests / '1.in')))
+        self.assertFalse((tests / '1.in').samefile(tests / '1.out'))
+        self.assertEqual((tests / 'config.yml').stat().st_nlink, 1)
+        self.assertEqual((tests / '2.out').stat().st_nlink, 1)
+        self.assertEqual(self.store.dedupe_tree(self.tree), 0)
+
+    def test_02_materialize(self):
+        target = self.store.materialize(self.tree, self.dir / 'copy')
+        for name in ('1.in', '2.in', '1.out', '2.out', 'config.yml'):
+            self.assertEqual((target / 'tests' / name).read_text(),
+                             (self.tree / 'tests' / name).read_text())
+        self.assertTrue((target / 'tests' / '1.out').samefile(self.tree / 'tests' / '1.out'))
+        self.assertFalse((target / 'tests' / 'config.yml').samefile(
+            self.tree / 'tests' / 'config.yml'))
+
+    def test_03_link(self):
+        media = self.dir / 'media'
+        link = self.store.link(self.tree / 'tests' / '1.in', media)
+        self.assertEqual(link.parent.parent, media)
+        self.assertEqual(link.name, '1.in')
+        self.assertTrue(link.samefile(self.tree / 'tests' / '1.in'))
+        self.assertEqual(self.store.link(self.tree / 'tests' / '1.in', media), link)
+        self.assertNotEqual(self.store.link(self.tree / 'tests' / '2.in', media), link)
+
+    def test_04_collect_garbage(self):
+        self.store.dedupe_tree(self.tree)
+        self.assertEqual(self.store.collect_garbage(), (0, 0))
+        (self.tree / 'tests' / '1.in').unlink()
+        self.assertEqual(self.store.collect_garbage(), (0, 0))
+        (self.tree / 'tests' / '2.in').unlink()
+        (self.tree / 'tests' / '1.out').unlink()
+        self.assertEqual(self.store.collect_garbage(), (2, len('data') + len('other')))
+        self.assertEqual(list(self.store.root.iterdir()), [])
+
+
+class RenderedMarkupCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = RenderedMarkupCache(Path(self.dir.name) / 'rendered')
+        self.source = Path(self.dir.name) / 'description.md'
+        self.source.write_text('# Title\n\nSum $a + b$.')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_01_hits_and_misses(self):
+        expected = render_markdown(self.source)
+        self.assertEqual(self.cache.get(self.source), expected)
+        self.assertEqual(self.cache.get(self.source), expected)
+        self.assertEqual(self.cache.get(self.source), expected)
+        self.assertEqual(self.cache.stats, {'hits': 2, 'misses': 1, 'hit_rate': 2 / 3})
+
+    def test_02_changed_source(self):
+        self.cache.get(self.source)
+        self.source.write_text('# Changed title')
+        self.assertIn('Changed title', self.cache.get(self.source))
+        self.assertEqual(self.cache.misses, 2)
+
+    def test_03_warm(self):
+        other = Path(self.dir.name) / 'description.txt'
+        other.write_text('text')
+        missing = Path(self.dir.name) / 'missing.md'
+        self.assertEqual(self.cache.warm([self.source, other, missing]), 1)
+        self.assertEqual(self.cache.warm([self.source]), 0)
+        self.cache.get(self.source)
+        self.assertEqual(self.cache.stats['hits'], 1)
+
+    def test_04_discard(self):
+        other_dir = Path(self.dir.name) / 'other'
+        other_dir.mkdir()
+        other = other_dir / 'description.md'
+        other.write_text('# Other')
+        self.cache.warm([self.source, other])
+        self.source.write_text('# Changed title')
+        self.cache.warm([self.source])
+        self.assertEqual(len(list(self.cache.group_path(self.source.parent).iterdir())), 2)
+        self.cache.discard(self.source.parent)
+        self.assertFalse(self.cache.group_path(self.source.parent).exists())
+        self.assertTrue(self.cache.render_path(other).is_file())
+
+
+class PackageCacheTest(SimpleTestCase):
+
+    def setUp(self):
+        self.cache = PackageCache(max_packages=3, estimate=lambda package: 10)
+
+    def test_01_lru_eviction(self):
+        for key in 'abc':
+            self.cache[key] = key.upper()
+        self.assertEqual(self.cache.get('a'), 'A')
+        self.cache['d'] = 'D'
+        self.assertEqual(self.cache.keys(), ['c', 'a', 'd'])
+        self.assertIsNone(self.cache.get('b'))
+        self.assertEqual(self.cache.stats, {'hits': 1, 'misses': 1, 'evictions': 1,
+                                            'packages': 3, 'memory': 30})
+
+    def test_02_memory_bound(self):
+        cache = PackageCache(max_packages=10, max_memory=100, estimate=len)
+        cache['a'] = 'x' * 40
+        cache['b'] = 'x' * 40
+        cache['c'] = 'x' * 40
+        self.assertEqual(cache.keys(), ['b', 'c'])
+        self.assertEqual(cache.memory, 80)
+        cache['d'] = 'x' * 150
+        self.assertEqual(cache.keys(), ['d'])
+        self.assertEqual(cache.pop('d'), 'x' * 150)
+        self.assertEqual(cache.memory, 0)
+
+    def test_03_get_or_load(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            # another thread caches the package while this one loads it
+            self.cache.put('a', 'first')
+            return 'second'
+
+        self.assertEqual(self.cache.get_or_load('a', loader), 'first')
+        self.assertEqual(self.cache.get_or_load('a', loader), 'first')
+        self.assertEqual(len(loads), 1)
+        self.assertEqual(len(self.cache), 1)
+
+    def test_04_concurrent_insertion(self):
+        def insert(thread):
+            for i in range(200):
+                self.cache.get_or_load(f'{thread}-{i % 5}', lambda: thread)
+
+        threads = [Thread(target=insert, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.cache), 3)
+        self.assertEqual(self.cache.memory, 30)
+        stats = self.cache.stats
+        self.assertEqual(stats['hits'] + stats['misses'], 800)
+
+    def test_05_warm_up(self):
+        def broken():
+            raise FileNotFoundError('no package')
+
+        loaded = self.cache.warm_up([('a', lambda: 'A'), ('b', broken), ('c', lambda: 'C'),
+                                     ('d', lambda: 'D'), ('e', lambda: 'E')])
+        self.assertEqual(loaded, 3)
+        self.assertEqual(self.cache.keys(), ['a', 'c', 'd'])
@@ -1,12 +1,21 @@
 from __future__ import annotations
 
+import json
+import logging
+from contextvars import Context, copy_context
 from enum import Enum
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator
 
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.translation import gettext_lazy as _
 
 from core.choices import ModelAction
 from util.models import model_cls
 
+logger = logging.getLogger(__name__)
+
 
 class BaCa2JsonResponse(JsonResponse):
     """
@@ -112,3 +121,73 @@ class BaCa2ModelResponse(BaCa2JsonResponse):
             message += ' due an error.'
 
         return message
+
+
+class BaCa2StreamingJsonResponse(StreamingHttpResponse):
+    """
+    Streaming counterpart of :class:`BaCa2JsonResponse` used to return large lists of records.
+    Records are serialized in batches while the response is sent, so only one batch of records
+    is held in memory at a time. The ``data`` list is sent before the status and message fields -
+    if an error occurs while the records are serialized, the list is closed and the response
+    status is set to ``error``.
+
+    Records are retrieved in a copy of the context the response was created in, so context
+    variables (e.g. the course database chosen with :class:`course.routing.InCourse`) are
+    available while the response is sent.
+
+    See Also:
+        :class:`BaCa2JsonResponse`
+        :meth:`util.views.BaCa2ModelView.get_streaming_response`
+    """
+
+    def __init__(self,
+                 status: BaCa2JsonResponse.Status,
+                 message: str = '',
+                 data: Iterable[Dict[str, Any]] = (),
+                 batch_size: int = 100,
+                 **kwargs: dict) -> None:
+        """
+        :param status: Status of the response (if no error occurs while the data is sent).
+        :type status: :class:`BaCa2JsonResponse.Status`
+        :param message: Message accompanying the response.
+        :type message: str
+        :param data: Records to be serialized into the ``data`` list of the response.
+        :type data: Iterable[Dict[str, Any]]
+        :param batch_size: Number of records serialized at once.
+        :type batch_size: int
+        :param kwargs: Additional fields to be included in the response.
+        :type kwargs: dict
+        """
+        self.batch_size = batch_size
+        fields = {'status': status.value, 'message': message} | kwargs
+        super().__init__(self._stream(iter(data), fields, copy_context()),
+                         content_type='application/json')
+
+    def _stream(self, records: Iterator[Dict[str, Any]], fields: dict, context: Context
+                ) -> Iterator[str]:
+        """
+        :param records: Records to be serialized.
+        :type records: Iterator[Dict[str, Any]]
+        :param fields: Fields of the response sent after the ``data`` list.
+        :type fields: dict
+        :param context: Context in which the records are retrieved.
+        :type context: Context
+        :return: Chunks of the JSON response.
+        :rtype: Iterator[str]
+        """
+        separator = ''
+        yield '{"data": ['
+        try:
+            while True:
+                batch = context.run(list, islice(records, self.batch_size))
+                if not batch:
+                    break
+                yield separator + ', '.join(json.dumps(record, cls=DjangoJSONEncoder)
+                                            for record in batch)
+                separator = ', '
+        except Exception as e:
+            logger.exception('Error while streaming response data.')
+            fields = {'status': BaCa2JsonResponse.Status.ERROR.value,
+                      'message': _('An error occurred while retrieving data.'),
+                      'errors': [str(e)]}
+        yield '], ' + json.dumps(fields, cls=DjangoJSONEncoder)[1:]
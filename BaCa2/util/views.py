@@ -1,9 +1,12 @@
+import re
 from abc import ABC
 from enum import Enum
-from typing import Any, Callable, Dict, List, Optional, Type
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
 
-import django.db.models
+from django.conf import settings
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.db.models import Q, QuerySet
 from django.http import JsonResponse
 from django.utils.translation import gettext_lazy as _
 from django.views import View
@@ -17,7 +20,7 @@ from util import (
     normalize_string_to_python
 )
 from util.models import model_cls
-from util.responses import BaCa2JsonResponse, BaCa2ModelResponse
+from util.responses import BaCa2JsonResponse, BaCa2ModelResponse, BaCa2StreamingJsonResponse
 from widgets.base import Widget
 from widgets.brief_result_summary import BriefResultSummary
 from widgets.code_block import CodeBlock
@@ -307,6 +310,17 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
     #: in the model class.
     GET_DATA_METHOD: Callable[[model_cls, Optional[Dict[str, Any]]], Dict[str, Any]] = None
 
+    #: Mapping of table column names (keys of the serialized data) to model field lookups used to
+    #: sort and search model instances in the database when data is requested by a table in
+    #: server-side mode. Columns missing from the mapping are not sorted or searched in this mode,
+    #: unless the view overrides :meth:`get_search_filter` or :meth:`get_sort_keys`.
+    TABLE_FIELDS: Dict[str, str] = {'id': 'id'}
+
+    #: If set, data for all (or filtered) model instances is sent in a streaming response, with
+    #: instances retrieved from the database in chunks of this size. Should be set by views of
+    #: models with many instances, to keep the memory used by a response bounded.
+    STREAM_CHUNK_SIZE: int | None = None
+
     # -------------------------------------- get methods --------------------------------------- #
 
     @classmethod
@@ -417,12 +431,16 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
                 message=_('Permission denied.')
             )
 
+        message = _('Successfully retrieved data for all model instances')
         try:
+            if self.streams_response(request):
+                return self.get_streaming_response(self.MODEL.objects.all(),
+                                                   serialize_kwargs,
+                                                   message)
             return self.get_request_response(
                 status=BaCa2JsonResponse.Status.SUCCESS,
-                message=_('Successfully retrieved data for all model instances'),
-                data=[self.get_data_method()(instance, **serialize_kwargs)
-                      for instance in self.MODEL.objects.all()]
+                message=message,
+                **self.serialize(self.MODEL.objects.all(), serialize_kwargs, request)
             )
         except Exception as e:
             return self.get_request_response(
@@ -455,31 +473,37 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
 
         See also:
             - :meth:`BaCa2ModelView.check_get_filtered_permission`
+            - :meth:`BaCa2ModelView.get_ownership_filter`
             - :meth:`BaCa2ModelView.get`
             - :class:`BaCa2ModelResponse`
         """
         query_set = self.MODEL.objects.filter(**filter_params).exclude(**exclude_params)
-        query_result = [obj for obj in query_set]
 
         if not self.check_get_all_permission(request, serialize_kwargs, **kwargs):
-            if not self.check_get_filtered_permission(filter_params=filter_params,
-                                                      exclude_params=exclude_params,
-                                                      serialize_kwargs=serialize_kwargs,
-                                                      query_result=query_result,
-                                                      request=request,
-                                                      **kwargs):
+            ownership_filter = self.get_ownership_filter(request, **kwargs)
+            permitted = self.check_get_filtered_permission(filter_params=filter_params,
+                                                           exclude_params=exclude_params,
+                                                           serialize_kwargs=serialize_kwargs,
+                                                           query_result=query_set,
+                                                           request=request,
+                                                           **kwargs)
+            if permitted and ownership_filter is not None:
+                permitted = not query_set.exclude(**ownership_filter).exists()
+            if not permitted:
                 return self.get_request_response(
                     status=BaCa2JsonResponse.Status.IMPERMISSIBLE,
                     message=_('Permission denied.')
                 )
 
+        message = _('Successfully retrieved data for model instances matching the specified '
+                    'filter parameters.')
         try:
+            if self.streams_response(request):
+                return self.get_streaming_response(query_set, serialize_kwargs, message)
             return self.get_request_response(
                 status=BaCa2JsonResponse.Status.SUCCESS,
-                message=_('Successfully retrieved data for model instances matching the specified '
-                          'filter parameters.'),
-                data=[self.get_data_method()(obj, **serialize_kwargs)
-                      for obj in query_result]
+                message=message,
+                **self.serialize(query_set, serialize_kwargs, request)
             )
         except Exception as e:
             return self.get_request_response(
@@ -489,6 +513,250 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
                 data=[str(e)]
             )
 
+    def serialize(self, query_set: QuerySet, serialize_kwargs: dict, request) -> Dict[str, Any]:
+        """
+        Serializes model instances retrieved by the view. If the request was sent by a table in
+        server-side mode (DataTables server-side processing protocol, recognized by the `draw`
+        parameter), only the requested page of instances is retrieved and serialized.
+
+        :param query_set: Query set of model instances permitted to be retrieved.
+        :type query_set: QuerySet
+        :param serialize_kwargs: Kwargs to pass to the serialization method of the model class
+            instances.
+        :type serialize_kwargs: dict
+        :param request: HTTP GET request object received by the view.
+        :type request: HttpRequest
+        :return: Response kwargs containing serialized data (and paging information in
+            server-side mode).
+        :rtype: Dict[str, Any]
+
+        See also:
+            - :meth:`BaCa2ModelView.get_page`
+        """
+        if 'draw' in request.GET:
+            return self.get_page(query_set, serialize_kwargs, request)
+        return {'data': self.serialize_objects(query_set, serialize_kwargs)}
+
+    def serialize_objects(self, objects: Iterable[model_cls], serialize_kwargs: dict
+                          ) -> List[Dict[str, Any]]:
+        """
+        Serializes the given model instances with the serialization method of the model class.
+        Can be overridden by views of models which can be serialized more efficiently in bulk.
+
+        :param objects: Model instances to be serialized.
+        :type objects: Iterable[model_cls]
+        :param serialize_kwargs: Kwargs to pass to the serialization method of the model class
+            instances.
+        :type serialize_kwargs: dict
+        :return: Serialized data of the model instances, in the order of given instances.
+        :rtype: List[Dict[str, Any]]
+        """
+        get_data = self.get_data_method()
+        return [get_data(obj, **serialize_kwargs) for obj in objects]
+
+    def streams_response(self, request) -> bool:
+        """
+        :param request: HTTP GET request object received by the view.
+        :type request: HttpRequest
+        :return: `True` if the data should be sent in a streaming response - streaming is enabled
+            for the view and the request was not sent by a table in server-side mode (which
+            retrieves one page of data at a time).
+        :rtype: bool
+        """
+        return bool(self.STREAM_CHUNK_SIZE) and 'draw' not in request.GET
+
+    def get_streaming_response(self,
+                               query_set: QuerySet,
+                               serialize_kwargs: dict,
+                               message: str) -> BaCa2StreamingJsonResponse:
+        """
+        Creates a streaming JSON response for the given query set. Model instances are retrieved
+        from the database in chunks of `STREAM_CHUNK_SIZE` and serialized while the response is
+        sent, so the whole query set is never loaded into memory.
+
+        :param query_set: Query set of model instances permitted to be retrieved.
+        :type query_set: QuerySet
+        :param serialize_kwargs: Kwargs to pass to the serialization method of the model class
+            instances.
+        :type serialize_kwargs: dict
+        :param message: Message of the response.
+        :type message: str
+        :return: Streaming JSON response containing serialized data of the query set.
+        :rtype: :class:`BaCa2StreamingJsonResponse`
+
+        See also:
+            - :class:`util.responses.BaCa2StreamingJsonResponse`
+        """
+        # the database and course context are chosen now, as the query set is evaluated (and
+        # its instances serialized) after the view returns
+        query_set = query_set.using(query_set.db)
+        course_db = settings.CURRENT_DB.get(None)
+
+        def serialize_chunk(objects: Iterable[model_cls]) -> List[Dict[str, Any]]:
+            token = settings.CURRENT_DB.set(course_db) if course_db else None
+            try:
+                return self.serialize_objects(list(islice(objects, self.STREAM_CHUNK_SIZE)),
+                                              serialize_kwargs)
+            finally:
+                if token is not None:
+                    settings.CURRENT_DB.reset(token)
+
+        def records():
+            objects = query_set.iterator(chunk_size=self.STREAM_CHUNK_SIZE)
+            while chunk := serialize_chunk(objects):
+                yield from chunk
+
+        return BaCa2StreamingJsonResponse(
+            status=BaCa2JsonResponse.Status.SUCCESS,
+            message=message,
+            data=records(),
+            batch_size=self.STREAM_CHUNK_SIZE,
+        )
+
+    def get_search_filter(self, column: str, value: str) -> Q | None:
+        """
+        Creates a filter used to search the given table column in server-side mode. By default
+        columns defined in `TABLE_FIELDS` can be searched. Can be overridden by views with columns
+        which cannot be mapped to a single field lookup.
+
+        :param column: Name of the table column.
+        :type column: str
+        :param value: Searched value.
+        :type value: str
+        :return: Filter matching model instances with the column containing the searched value,
+            or `None` if the column cannot be searched.
+        :rtype: Q | None
+        """
+        field = self.TABLE_FIELDS.get(column)
+        return Q(**{f'{field}__icontains': value}) if field else None
+
+    def get_sort_keys(self, query_set: QuerySet, column: str) -> Dict[int, Any] | None:
+        """
+        Computes sort keys of a table column missing from `TABLE_FIELDS`, used to sort model
+        instances in server-side mode. Can be overridden by views with columns whose values are
+        not stored in the database of the model (or are computed from several fields).
+
+        :param query_set: Query set of model instances to be sorted.
+        :type query_set: QuerySet
+        :param column: Name of the table column.
+        :type column: str
+        :return: Sort keys of the model instances by their primary keys, or `None` if the column
+            cannot be sorted.
+        :rtype: Dict[int, Any] | None
+        """
+        return None
+
+    def get_page(self, query_set: QuerySet, serialize_kwargs: dict, request) -> Dict[str, Any]:
+        """
+        Retrieves and serializes one page of model instances in accordance with the DataTables
+        server-side processing protocol (`start`, `length`, `order` and `search` parameters).
+        Searching is performed in the database, using filters returned by
+        :meth:`get_search_filter`. Sorting is performed in the database, using field lookups of
+        the table columns defined in `TABLE_FIELDS`, unless the order includes columns sorted by
+        keys returned by :meth:`get_sort_keys` - then the filtered instances are sorted in memory.
+
+        :param query_set: Query set of model instances permitted to be retrieved.
+        :type query_set: QuerySet
+        :param serialize_kwargs: Kwargs to pass to the serialization method of the model class
+            instances.
+        :type serialize_kwargs: dict
+        :param request: HTTP GET request object received by the view.
+        :type request: HttpRequest
+        :return: Response kwargs containing serialized data of the page, the `draw` counter and
+            amounts of all and of matching model instances.
+        :rtype: Dict[str, Any]
+        """
+        params = request.GET
+        columns = {}
+        for key, value in params.items():
+            match = re.fullmatch(r'columns\[(\d+)]\[(data|searchable|orderable)]', key)
+            if match:
+                columns.setdefault(int(match.group(1)), {})[match.group(2)] = value
+        for index, column in columns.items():
+            column['search'] = params.get(f'columns[{index}][search][value]', '').strip()
+
+        records_total = query_set.count()
+
+        search_value = params.get('search[value]', '').strip()
+        if search_value:
+            search = Q()
+            for column in columns.values():
+                if column.get('searchable') == 'true':
+                    search |= self.get_search_filter(column.get('data'), search_value) or Q()
+            query_set = query_set.filter(search) if search else query_set.none()
+        for column in columns.values():
+            if column['search']:
+                column_search = self.get_search_filter(column.get('data'), column['search'])
+                if column_search is not None:
+                    query_set = query_set.filter(column_search)
+
+        ordering = []
+        index = 0
+        while f'order[{index}][column]' in params:
+            column = columns.get(int(params[f'order[{index}][column]']), {})
+            if column.get('orderable') == 'true':
+                descending = params.get(f'order[{index}][dir]') == 'desc'
+                key = self.TABLE_FIELDS.get(column.get('data'))
+                if key is None:
+                    key = self.get_sort_keys(query_set, column.get('data'))
+                if key is not None:
+                    ordering.append((key, descending))
+            index += 1
+
+        records_filtered = query_set.count() if search_value or any(
+            column['search'] for column in columns.values()
+        ) else records_total
+
+        start = max(int(params.get('start', 0)), 0)
+        length = int(params.get('length', -1))
+        end = start + length if length >= 0 else None
+
+        if all(isinstance(key, str) for key, _ in ordering):
+            query_set = query_set.order_by(
+                *[f'{"-" if descending else ""}{key}' for key, descending in ordering], 'pk'
+            )
+            page = query_set[start:end]
+        else:
+            page_pks = self._sort_pks(query_set, ordering)[start:end]
+            objects = query_set.in_bulk(page_pks)
+            page = [objects[pk] for pk in page_pks]
+
+        return {
+            'draw': int(params.get('draw')),
+            'recordsTotal': records_total,
+            'recordsFiltered': records_filtered,
+            'data': self.serialize_objects(page, serialize_kwargs),
+        }
+
+    @staticmethod
+    def _sort_pks(query_set: QuerySet, ordering: List[tuple[str | Dict[int, Any], bool]]
+                  ) -> List[int]:
+        """
+        Sorts primary keys of model instances in memory, in the same way the database sorts them
+        (empty values last in ascending order, ties resolved by primary keys).
+
+        :param query_set: Query set of model instances to be sorted.
+        :type query_set: QuerySet
+        :param ordering: Sort keys - field lookups or sort keys by primary keys - with flags
+            indicating descending order, from the most significant.
+        :type ordering: List[tuple[str | Dict[int, Any], bool]]
+        :return: Sorted primary keys of the model instances.
+        :rtype: List[int]
+        """
+        fields = [key for key, _ in ordering if isinstance(key, str)]
+        rows = {row[0]: row[1:] for row in query_set.values_list('pk', *fields)}
+        pks = sorted(rows)
+        field_index = len(fields)
+        # stable sorts, starting from the least significant key
+        for key, descending in reversed(ordering):
+            if isinstance(key, str):
+                field_index -= 1
+                values = {pk: row[field_index] for pk, row in rows.items()}
+            else:
+                values = key
+            pks.sort(key=lambda pk: (values.get(pk) is None, values.get(pk)), reverse=descending)
+        return pks
+
     # --------------------------------- get permission checks ---------------------------------- #
 
     def check_get_all_permission(self, request, serialize_kwargs, **kwargs) -> bool:
@@ -504,17 +772,37 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
         """
         return request.user.has_basic_model_permissions(self.MODEL, BasicModelAction.VIEW)
 
+    def get_ownership_filter(self, request, **kwargs) -> Dict[str, Any] | None:
+        """
+        Declares which model instances the requesting user owns, as query parameters (e.g.
+        ``{'usr': request.user.pk}``). If the user does not possess the 'view' permission for all
+        model instances, the filtered retrieval is permitted only if all retrieved instances match
+        the ownership filter. The check is performed with a single query, regardless of the amount
+        of retrieved instances.
+
+        By default, returns `None` (no ownership restriction). Inheriting classes should override
+        this method instead of checking instance ownership in
+        :meth:`check_get_filtered_permission`.
+
+        :param request: HTTP GET request object received by the view.
+        :type request: HttpRequest
+        :return: Query parameters matching model instances owned by the user or `None`.
+        :rtype: Dict[str, Any] | None
+        """
+        return None
+
     def check_get_filtered_permission(self,
                                       filter_params: dict,
                                       exclude_params: dict,
                                       serialize_kwargs: dict,
-                                      query_result: List[django.db.models.Model],
+                                      query_result: QuerySet,
                                       request,
                                       **kwargs) -> bool:
         """
         Method used to evaluate requesting user's permission to view the model instances matching
         the specified query parameters retrieved by the view if the user does not possess the 'view'
-        permission for all model instances.
+        permission for all model instances. Ownership of retrieved instances declared with
+        :meth:`get_ownership_filter` is checked separately.
 
         By default, returns `False`. Inheriting classes should override this method if the view
         should allow the user to view model instances matching the specified query parameters under
@@ -529,9 +817,9 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
         :param serialize_kwargs: Kwargs passed to the serialization method of the model class
             instances retrieved by the view when the JSON response is generated.
         :type serialize_kwargs: dict
-        :param query_result: Query set retrieved using the specified query parameters evaluated to a
-            list.
-        :type query_result: List[django.db.models.Model]
+        :param query_result: Query set retrieved using the specified query parameters (evaluated
+            only if iterated over).
+        :type query_result: QuerySet
         :param request: HTTP GET request object received by the view.
         :type request: HttpRequest
         :return: `True` if the user has permission to view the model instances matching the query
@@ -577,7 +865,8 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
     def get_request_response(self,
                              status: BaCa2JsonResponse.Status,
                              message: str,
-                             data: list = None) -> BaCa2ModelResponse:
+                             data: list = None,
+                             **kwargs) -> BaCa2ModelResponse:
         """
         :param status: Status of the action.
         :type status: :class:`BaCa2JsonResponse.Status`
@@ -585,6 +874,9 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
         :type message: str
         :param data: Data retrieved by the action (if any).
         :type data: list
+        :param kwargs: Additional response fields (e.g. paging information of tables in
+            server-side mode).
+        :type kwargs: dict
         :return: JSON response with the result of the action in the form of status and message
             string (and data if the action was successful).
         :rtype: :class:`BaCa2ModelResponse`
@@ -593,7 +885,7 @@ class BaCa2ModelView(LoginRequiredMixin, View, ABC):
                                   action=BasicModelAction.VIEW,
                                   status=status,
                                   message=message,
-                                  **{'data': data})
+                                  **{'data': data} | kwargs)
 
     @classmethod
     def _url(cls, **kwargs) -> str:
@@ -11,8 +11,8 @@ from core.tools.files import CsvFileHandler, UploadedFileHandler
 from core.tools.mailer import TemplateMailer
 from course.models import Round, Submit, Task
 from course.routing import InCourse
+from jobs.models import Job
 from main.models import Course, Role, User
-from package.models import PackageInstance
 from util.models_registry import ModelsRegistry
 from widgets.forms.base import (
     BaCa2ModelForm,
@@ -169,24 +169,28 @@ class CreateCourseForm(BaCa2ModelForm):
     )
 
     @classmethod
-    def handle_valid_request(cls, request) -> Dict[str, str]:
+    def handle_valid_request(cls, request) -> Dict[str, Any]:
         """
         Creates a new :class:`Course` object based on the data provided in the request.
 
         :param request: POST request containing the course data.
         :type request: HttpRequest
-        :return: Dictionary containing a success message.
-        :rtype: Dict[str, str]
+        :return: Dictionary containing a success message and data of the background job creating
+            the course.
+        :rtype: Dict[str, Any]
         """
-        Course.objects.create_course(
-            name=request.POST.get('course_name'),
-            short_name=request.POST.get('short_name'),
-            usos_course_code=request.POST.get('USOS_course_code'),
-            usos_term_code=request.POST.get('USOS_term_code')
-        )
+        job = Job.objects.enqueue('main.create_course', {
+            'name': request.POST.get('course_name'),
+            'short_name': request.POST.get('short_name'),
+            'usos_course_code': request.POST.get('USOS_course_code'),
+            'usos_term_code': request.POST.get('USOS_term_code'),
+        }, user=request.user)
 
-        message = _('Course ') + request.POST.get('course_name') + _(' created successfully')
-        return {'message': message}
+        if job.is_finished:
+            message = _('Course ') + request.POST.get('course_name') + _(' created successfully')
+        else:
+            message = _('Course ') + request.POST.get('course_name') + _(' is being created')
+        return {'message': message, 'job': job.get_data()}
 
 
 class CreateCourseFormWidget(FormWidget):
@@ -514,7 +518,8 @@ class AddMembersFromCSVForm(CourseActionForm):
 
         :param request: POST request containing the CSV file.
         :type request: HttpRequest
-        :return: Dictionary containing a success message.
+        :return: Dictionary containing a success message and data of the background job adding
+            the members.
         :rtype: Dict[str, Any]
         """
         course = cls.get_context_course(request)
@@ -530,26 +535,17 @@ class AddMembersFromCSVForm(CourseActionForm):
                                                     ignore_first_line=True)
         file.validate()
 
-        users_to_add = []
-        for member in members_to_add:
-            users_to_add.append(User.objects.get_or_create(
-                email=member['E-mail'],
-                first_name=member['Imię'],
-                last_name=member['Nazwisko']
-            ))
-        course.add_members(users_to_add,
-                           role,
-                           ignore_errors=True)
+        members = [{'email': member['E-mail'],
+                    'first_name': member['Imię'],
+                    'last_name': member['Nazwisko']} for member in members_to_add]
+        job = Job.objects.enqueue('course.add_members',
+                                  {'role_id': role, 'members': members},
+                                  user=request.user,
+                                  course=course)
 
-        mailer = TemplateMailer(
-            mail_to=[user.email for user in users_to_add],
-            subject=_('You have been added to a course'),
-            template='add_to_course',
-            context={'course_name': course.name}
-        )
-        mailer.send()
-
-        return {'message': _('Members added successfully')}
+        if job.is_finished:
+            return {'message': _('Members added successfully'), 'job': job.get_data()}
+        return {'message': _('Members are being added'), 'job': job.get_data()}
 
     @classmethod
     def is_permissible(cls, request) -> bool:
@@ -1163,15 +1159,16 @@ class EditRoundForm(CourseModelForm):
         self.fields['round_id'].initial = round_obj.pk
 
     @classmethod
-    def handle_valid_request(cls, request) -> Dict[str, str]:
+    def handle_valid_request(cls, request) -> Dict[str, Any]:
         """
         Updates the :class:`Round` record with the ID provided in the request based on the submitted
         form data.
 
         :param request: POST request containing the form data.
         :type request: HttpRequest
-        :return: Dictionary containing a success message.
-        :rtype: Dict[str, str]
+        :return: Dictionary containing a success message and, if submits have to be rescored, data
+            of the background job rescoring them.
+        :rtype: Dict[str, Any]
         """
         round_ = ModelsRegistry.get_round(int(request.POST.get('round_id')))
         end_date = request.POST.get('end_date')
@@ -1187,7 +1184,8 @@ class EditRoundForm(CourseModelForm):
         fall_off_policy = request.POST.get('fall_off_policy')
         fall_off_policy = FallOffPolicy[fall_off_policy]
 
-        round_.update(
+        rescore_planned = round_.update(
+            rescore=False,
             name=request.POST.get('round_name'),
             score_selection_policy=score_selection_policy,
             fall_off_policy=fall_off_policy,
@@ -1198,7 +1196,16 @@ class EditRoundForm(CourseModelForm):
         )
 
         message = _('Round ') + request.POST.get('round_name') + _(' edited successfully')
-        return {'message': message}
+        if not rescore_planned:
+            return {'message': message}
+
+        job = Job.objects.enqueue('course.rescore_round',
+                                  {'round_id': round_.pk},
+                                  user=request.user,
+                                  course=InCourse.get_context_course())
+        if job.is_finished:
+            return {'message': message + _(' - submits rescored'), 'job': job.get_data()}
+        return {'message': message + _(' - submits are being rescored'), 'job': job.get_data()}
 
 
 class EditRoundFormWidget(FormWidget):
@@ -1622,26 +1629,21 @@ class ReuploadTaskForm(CourseModelForm):
         task_id = int(request.POST.get('task_id'))
         course = InCourse.get_context_course()
         task = course.get_task(task_id)
-        file = UploadedFileHandler(settings.UPLOAD_DIR, 'zip', request.FILES['package'], )
+        # the package is deleted by the job, once it is processed
+        file = UploadedFileHandler(settings.UPLOAD_DIR,
+                                   'zip',
+                                   request.FILES['package'],
+                                   delete_on_exit=False)
         file.save()
-        new_package_instance = None
-        new_task = None
-        try:
-            new_package_instance = PackageInstance.objects.create_package_instance_from_zip(
-                package_source=task.package_instance.package_source,
-                zip_file=file.path,
-                permissions_from_instance=task.package_instance,
-                creator=request.user,
-            )
-            new_task = Task.objects.update_task(task,
-                                                new_package_instance=new_package_instance)
-        except Exception as e:
-            if new_package_instance is not None:
-                new_package_instance.delete(delete_files=True)
-            if new_task is not None:
-                new_task.delete()
-            raise e
-        return {'message': _('Task re-uploaded successfully')}
+        job = Job.objects.enqueue('course.reupload_task',
+                                  {'task_id': task.pk,
+                                   'zip_file': str(file.path),
+                                   'user_id': request.user.pk},
+                                  user=request.user,
+                                  course=course)
+        if job.is_finished:
+            return {'message': _('Task re-uploaded successfully'), 'job': job.get_data()}
+        return {'message': _('Task is being re-uploaded'), 'job': job.get_data()}
 
 
 class ReuploadTaskFormWidget(FormWidget):
@@ -2112,16 +2114,23 @@ class RejudgeTaskForm(CourseModelForm):
 
         :param request: POST request containing the task ID.
         :type request: HttpRequest
-        :return: Dictionary containing a success message.
+        :return: Dictionary containing a success message and data of the background job rejudging
+            the task.
         :rtype: Dict[str, Any]
         """
         task_id = int(request.POST.get('task_id'))
         course = InCourse.get_context_course()
         task = course.get_task(task_id)
         submits_to_rejudge = task.legacy_submits_amount
-        task.update_submits()
-        return {
-            'message': _(f'Task rejudged successfully - {submits_to_rejudge} submits affected.')}
+        job = Job.objects.enqueue('course.rejudge_task',
+                                  {'task_id': task.pk},
+                                  user=request.user,
+                                  course=course)
+        if job.is_finished:
+            message = _(f'Task rejudged successfully - {submits_to_rejudge} submits affected.')
+        else:
+            message = _(f'Task rejudging started - {submits_to_rejudge} submits affected.')
+        return {'message': message, 'job': job.get_data()}
 
 
 class RejudgeTaskFormWidget(FormWidget):
@@ -2237,7 +2246,7 @@ class CreateSubmitForm(CourseModelForm):
             )
         course = ModelsRegistry.get_course(course_id)
         task = course.get_task(task_id)
-        allowed_extensions = task.package_instance.package['allowedExtensions']
+        allowed_extensions = task.package_instance.metadata.allowed_extensions
         self.fields['source_code'].help_text = (
             f'{_("Allowed extensions:")} [{", ".join(allowed_extensions)}] '
             f'{_("and zips containing these files")}'
@@ -2270,16 +2279,23 @@ class CreateSubmitForm(CourseModelForm):
         :rtype: Dict[str, str]
         """
         file_extension = request.FILES['source_code'].name.split('.')[-1]
+        # the uploaded file is moved into the submit storage, so it is deleted only if the submit
+        # is rejected before it is created
         source_code_file = UploadedFileHandler(settings.UPLOAD_DIR,
                                                file_extension,
-                                               request.FILES['source_code'], )
+                                               request.FILES['source_code'],
+                                               delete_on_exit=False)
         source_code_file.save()
         task_id = int(request.POST.get('task_id'))
-        task = ModelsRegistry.get_task(task_id)
-        if not task:
-            raise ValueError('Task not found')
+        try:
+            task = ModelsRegistry.get_task(task_id)
+            if not task:
+                raise ValueError('Task not found')
 
-        task.package_instance.package.check_source(source_code_file.path)
+            task.package_instance.metadata.check_source(source_code_file.path)
+        except Exception:
+            source_code_file.delete()
+            raise
 
         user = request.user
 
@@ -2287,14 +2303,14 @@ class CreateSubmitForm(CourseModelForm):
         if settings.MOCK_BROKER:
             available_statuses = request.POST.getlist('result_types')
             available_statuses = [ResultStatus[status] for status in available_statuses]
-        with source_code_file.file as source_code:
-            Submit.objects.create_submit(
-                source_code=source_code,
-                task=task_id,
-                user=user,
-                auto_send=True,
-                available_statuses=available_statuses,
-            )
+        Submit.objects.create_submit(
+            source_code=source_code_file.path,
+            task=task_id,
+            user=user,
+            auto_send=True,
+            move_source=True,
+            available_statuses=available_statuses,
+        )
         return {'message': _('Submit created successfully')}
 
 
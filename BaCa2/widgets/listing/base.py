@@ -59,6 +59,7 @@ class TableWidget(Widget):
                  delete_form: BaCa2ModelForm = None,
                  data_post_url: str = '',
                  paging: TableWidgetPaging = None,
+                 server_side: bool = False,
                  table_height: int | None = None,
                  resizable_height: bool = False,
                  link_format_string: str = '',
@@ -115,6 +116,11 @@ class TableWidget(Widget):
         :type data_post_url: str
         :param paging: Paging options for the table. If not set, paging is disabled.
         :type paging: :class:`TableWidgetPaging`
+        :param server_side: Whether paging, sorting and searching of the table is performed by the
+            model view the table receives its data from (see
+            :meth:`util.views.BaCa2ModelView.get_page`), so that only the displayed page of
+            records is retrieved. Requires the data source to be an url.
+        :type server_side: bool
         :param table_height: The height of the table in percent of the viewport height. If not set,
             the table height is not limited.
         :type table_height: int | None
@@ -210,10 +216,13 @@ class TableWidget(Widget):
             self.data_source = json.dumps([])
             self.ajax = True
         else:
+            if server_side:
+                raise self.ParameterError('Server-side mode requires a data source url.')
             self.data_source_url = ''
             self.data_source = json.dumps(self.parse_static_data(data_source, self.cols),
                                           ensure_ascii=False)
             self.ajax = False
+        self.server_side = server_side
 
         self.allow_global_search = allow_global_search
         self.deselect_on_filter = deselect_on_filter
@@ -275,6 +284,7 @@ class TableWidget(Widget):
             'ajax': json.dumps(self.ajax),
             'data_source_url': self.data_source_url,
             'data_source': self.data_source,
+            'server_side': json.dumps(self.server_side),
             'link_format_string': self.link_format_string or json.dumps(False),
             'cols': [col.get_context() for col in self.cols],
             'DT_cols_data': [col.data_tables_context() for col in self.cols],
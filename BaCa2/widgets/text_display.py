@@ -3,8 +3,7 @@ from pathlib import Path
 
 from django.utils.translation import gettext_lazy as _
 
-from markdown import markdown
-from mdx_math import MathExtension
+from core.tools.rendered_markup import MARKDOWN_SUFFIX, rendered_markup
 from widgets.base import Widget
 
 
@@ -95,7 +94,7 @@ class MarkupDisplayer(Widget):
         Enum containing all the file formats supported by the widget.
         """
         HTML = '.html'
-        MARKDOWN = '.md'
+        MARKDOWN = MARKDOWN_SUFFIX
         TEXT = '.txt'
 
     def __init__(self,
@@ -135,13 +134,13 @@ class MarkupDisplayer(Widget):
         if suffix not in {extension.value for extension in self.AcceptedFormats}:
             raise self.ParameterError(f'File format {suffix} not supported.')
 
-        with file_path.open('r', encoding='utf-8') as file:
-            self.content = file.read()
-
         if suffix == self.AcceptedFormats.MARKDOWN.value:
-            self.content = markdown(self.content, extensions=[MathExtension()])
-        elif suffix == self.AcceptedFormats.TEXT.value:
-            self.content = self.content.replace('\n', '<br>')\
+            self.content = rendered_markup.get(file_path)
+        else:
+            with file_path.open('r', encoding='utf-8') as file:
+                self.content = file.read()
+            if suffix == self.AcceptedFormats.TEXT.value:
+                self.content = self.content.replace('\n', '<br>')
 
         if pdf_download:
             if not pdf_download.endswith('.pdf'):